@@ -1,33 +1,129 @@
 from view.vista import VistaStock
 from view.ventas import VistaVentas
+from view.dashboard import VistaDashboard
+from view.componentes import actualizar_control, en_interfaz
+from services.ejecutor import EjecutorTareas
+import threading
 import flet as ft
 
+# Como mucho un refresco del texto de métricas cada tantos segundos
+INTERVALO_METRICAS = 0.25
+
 class ControladorStock:
     def __init__(self, page: ft.Page):
         self.page = page
         self.vista_stock = None
         self.vista_ventas = None
+        self.vista_dashboard = None
         self.pantalla_actual = "stock"
         self.page.scroll = ft.ScrollMode.AUTO
         self.page.auto_scroll = True
+        
+        # Un solo pool para el trabajo bloqueante de todas las pantallas
+        self.ejecutor = EjecutorTareas()
+        self.txt_metricas = ft.Text("", size=12, color=ft.Colors.WHITE70)
+        self._metricas = None
+        self._timer_metricas = None
+        self._lock_metricas = threading.Lock()
+        self.ejecutor.suscribir(self.mostrar_metricas)
+
+    def mostrar_metricas(self, metricas):
+        """El ejecutor avisa en cada encolado y cada tarea terminada: se
+        guarda la última medición y el texto se refresca una vez por
+        INTERVALO_METRICAS con lo que haya para entonces."""
+        with self._lock_metricas:
+            self._metricas = metricas
+            if self._timer_metricas is not None:
+                return
+            self._timer_metricas = threading.Timer(INTERVALO_METRICAS, en_interfaz, (self._pintar_metricas,))
+            self._timer_metricas.daemon = True
+            self._timer_metricas.start()
+
+    def _pintar_metricas(self):
+        with self._lock_metricas:
+            metricas = self._metricas
+            self._timer_metricas = None
+
+        texto = (
+            f"Tareas: {metricas['en_cola']} en cola, {metricas['en_curso']} en curso · "
+            f"p95 {metricas['latencia_p95_ms']} ms"
+        )
+        if metricas['saturado']:
+            texto += " · ⚠️ saturado"
+        color = ft.Colors.ORANGE_300 if metricas['saturado'] else ft.Colors.WHITE70
+        if texto == self.txt_metricas.value and color == self.txt_metricas.color:
+            return
+        self.txt_metricas.value = texto
+        self.txt_metricas.color = color
+        actualizar_control(self.txt_metricas)
+
+    def mostrar_pantalla(self, pantalla):
+        """Muestra `pantalla` ("stock", "ventas" o "reportes").
+
+        Cada vista se construye la primera vez y después se conserva: cambiar
+        de pantalla solo alterna la visibilidad y refresca lo que cambió, sin
+        volver a crear managers, observadores ni conexiones al servidor de logs.
+        """
+        if pantalla == self.pantalla_actual and self.vista_actual() is not None:
+            return
+        
+        anterior = self.vista_actual()
+        if anterior is not None:
+            anterior.contenido.visible = False
+        
+        self.pantalla_actual = pantalla
+        self.actualizar_navegacion()
+        
+        vista = self.vista_actual()
+        if vista is None:
+            if pantalla == "stock":
+                self.vista_stock = VistaStock(self.page, self.ejecutor)
+                self.vista_stock.inicializar_formulario()
+            elif pantalla == "ventas":
+                self.vista_ventas = VistaVentas(self.page, self.ejecutor)
+                self.vista_ventas.inicializar_ventas()
+            else:
+                self.vista_dashboard = VistaDashboard(self.page, self.ejecutor)
+                self.vista_dashboard.inicializar_dashboard()
+        else:
+            vista.contenido.visible = True
+            self.page.update()
+            vista.al_volver()
+
+    def vista_actual(self):
+        if self.pantalla_actual == "stock":
+            return self.vista_stock
+        if self.pantalla_actual == "ventas":
+            return self.vista_ventas
+        return self.vista_dashboard
 
     def cambiar_a_stock(self, e):
-        if self.pantalla_actual != "stock":
-            self.page.clean()
-            self.vista_stock = VistaStock(self.page)
-            self.agregar_navegacion()
-            self.vista_stock.inicializar_formulario()
-            self.pantalla_actual = "stock"
+        self.mostrar_pantalla("stock")
 
     def cambiar_a_ventas(self, e):
-        if self.pantalla_actual != "ventas":
-            self.page.clean()
-            self.vista_ventas = VistaVentas(self.page)
-            self.agregar_navegacion()
-            self.vista_ventas.inicializar_ventas()
-            self.pantalla_actual = "ventas"
+        self.mostrar_pantalla("ventas")
+
+    def cambiar_a_reportes(self, e):
+        self.mostrar_pantalla("reportes")
 
     def agregar_navegacion(self):
+        self.btn_stock = ft.ElevatedButton(
+            "Gestión de Stock",
+            icon=ft.Icons.INVENTORY,
+            on_click=self.cambiar_a_stock,
+        )
+        self.btn_ventas = ft.ElevatedButton(
+            "Ventas",
+            icon=ft.Icons.POINT_OF_SALE,
+            on_click=self.cambiar_a_ventas,
+        )
+        self.btn_reportes = ft.ElevatedButton(
+            "Reportes",
+            icon=ft.Icons.INSIGHTS,
+            on_click=self.cambiar_a_reportes,
+        )
+        self.actualizar_navegacion()
+        
         nav_bar = ft.Container(
             content=ft.Row([
                 ft.Text("Sistema de Gestión", 
@@ -35,24 +131,10 @@ class ControladorStock:
                        weight=ft.FontWeight.BOLD,
                        color=ft.Colors.WHITE),
                 ft.Row([
-                    ft.ElevatedButton(
-                        "Gestión de Stock",
-                        icon=ft.Icons.INVENTORY,
-                        on_click=self.cambiar_a_stock,
-                        style=ft.ButtonStyle(
-                            bgcolor=ft.Colors.BLUE if self.pantalla_actual == "stock" else ft.Colors.BLUE_GREY,
-                            color=ft.Colors.WHITE
-                        )
-                    ),
-                    ft.ElevatedButton(
-                        "Ventas",
-                        icon=ft.Icons.POINT_OF_SALE,
-                        on_click=self.cambiar_a_ventas,
-                        style=ft.ButtonStyle(
-                            bgcolor=ft.Colors.PURPLE if self.pantalla_actual == "ventas" else ft.Colors.BLUE_GREY,
-                            color=ft.Colors.WHITE
-                        )
-                    ),
+                    self.txt_metricas,
+                    self.btn_stock,
+                    self.btn_ventas,
+                    self.btn_reportes,
                 ], spacing=10),
             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
             padding=ft.padding.all(15),
@@ -63,7 +145,20 @@ class ControladorStock:
         self.page.controls.insert(0, nav_bar)
         self.page.update()
 
+    def actualizar_navegacion(self):
+        self.btn_stock.style = ft.ButtonStyle(
+            bgcolor=ft.Colors.BLUE if self.pantalla_actual == "stock" else ft.Colors.BLUE_GREY,
+            color=ft.Colors.WHITE
+        )
+        self.btn_ventas.style = ft.ButtonStyle(
+            bgcolor=ft.Colors.PURPLE if self.pantalla_actual == "ventas" else ft.Colors.BLUE_GREY,
+            color=ft.Colors.WHITE
+        )
+        self.btn_reportes.style = ft.ButtonStyle(
+            bgcolor=ft.Colors.TEAL if self.pantalla_actual == "reportes" else ft.Colors.BLUE_GREY,
+            color=ft.Colors.WHITE
+        )
+
     def iniciar(self):
-        self.vista_stock = VistaStock(self.page)
         self.agregar_navegacion()
-        self.vista_stock.inicializar_formulario()
\ No newline at end of file
+        self.mostrar_pantalla("stock")
@@ -1,4 +1,5 @@
 import flet as ft
+from bootstrap import bootstrap
 from controller.controlador import ControladorStock
 
 def main(page: ft.Page):
@@ -10,4 +11,5 @@ def main(page: ft.Page):
     controlador = ControladorStock(page)
     controlador.iniciar()
 
+bootstrap(checkpoints=True)
 ft.app(target=main)
\ No newline at end of file
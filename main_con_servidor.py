@@ -1,4 +1,5 @@
 import flet as ft
+from bootstrap import bootstrap
 from controller.controlador import ControladorStock
 import threading
 import time
@@ -40,6 +41,7 @@ if __name__ == "__main__":
     print("🚀 INICIANDO SISTEMA DE GESTIÓN")
     print("=" * 60)
 
+    bootstrap(checkpoints=True)
     servidor = iniciar_servidor_logs()
     
     try:
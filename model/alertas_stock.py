@@ -0,0 +1,68 @@
+import datetime
+import threading
+from collections import deque
+from model.observers.observador import Sujeto
+
+
+class AlertaStock:
+    """Un producto cruzó su stock mínimo en una escritura."""
+
+    BAJO_MINIMO = 'bajo_minimo'
+    REPUESTO = 'repuesto'
+
+    def __init__(self, tipo, producto_id, nombre, stock, stock_minimo):
+        self.tipo = tipo
+        self.producto_id = producto_id
+        self.nombre = nombre
+        self.stock = stock
+        self.stock_minimo = stock_minimo
+        self.fecha = datetime.datetime.now()
+
+    @property
+    def faltante(self):
+        return max(self.stock_minimo - self.stock, 0)
+
+    def __str__(self):
+        if self.tipo == self.BAJO_MINIMO:
+            return f"Stock bajo: {self.nombre} quedó en {self.stock} (mínimo {self.stock_minimo})"
+        return f"Stock repuesto: {self.nombre} tiene {self.stock} (mínimo {self.stock_minimo})"
+
+
+class AlertasStock(Sujeto):
+    """Canal de alertas de reposición.
+
+    StockManager llama a `detectar` después de confirmar cada escritura, solo
+    con los productos que tocó: el costo depende de la cantidad de cambios y
+    no del tamaño del catálogo. Se notifica únicamente cuando un producto
+    cruza su mínimo (hacia abajo o de vuelta hacia arriba) y cada observador
+    recibe la AlertaStock como mensaje. Las últimas alertas quedan en
+    `recientes`.
+    """
+
+    def __init__(self, capacidad=100):
+        super().__init__()
+        self.recientes = deque(maxlen=capacidad)
+        self._lock = threading.Lock()
+
+    def detectar(self, cambios):
+        """`cambios` son tuplas (producto_id, nombre, estaba_bajo, stock, stock_minimo).
+
+        Devuelve las alertas emitidas.
+        """
+        alertas = []
+        for producto_id, nombre, estaba_bajo, stock, stock_minimo in cambios:
+            esta_bajo = stock < stock_minimo
+            if esta_bajo == estaba_bajo:
+                continue
+            tipo = AlertaStock.BAJO_MINIMO if esta_bajo else AlertaStock.REPUESTO
+            alertas.append(AlertaStock(tipo, producto_id, nombre, stock, stock_minimo))
+
+        for alerta in alertas:
+            with self._lock:
+                self.recientes.append(alerta)
+            for observador in list(self._observadores):
+                try:
+                    observador.actualizar(self, alerta)
+                except Exception as ex:
+                    print(f"⚠️ Error notificando alerta de stock: {ex}")
+        return alertas
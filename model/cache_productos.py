@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheProductos:
+    """Cache LRU con vencimiento para lecturas de Producto.
+
+    Solo sirve lecturas de presentación (detalles, exportaciones, búsquedas
+    en pantalla). StockManager la invalida en cada escritura; las
+    verificaciones de stock que deben ser exactas van siempre a la base.
+    """
+
+    def __init__(self, capacidad=2048, ttl=120):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._expirados = 0
+        self._invalidaciones = 0
+
+    def _leer(self, clave, ahora):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        valor, vence = entrada
+        if vence < ahora:
+            del self._entradas[clave]
+            self._expirados += 1
+            return None
+        self._entradas.move_to_end(clave)
+        return valor
+
+    def _guardar(self, clave, valor, ahora):
+        self._entradas[clave] = (valor, ahora + self.ttl)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+
+    def obtener(self, clave, cargar):
+        """Devuelve el valor cacheado o lo carga con `cargar(clave)`.
+
+        Las excepciones de `cargar` (por ejemplo DoesNotExist) se propagan y
+        no se guarda nada.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            valor = self._leer(clave, ahora)
+            if valor is not None:
+                self._aciertos += 1
+                return valor
+            self._fallos += 1
+
+        valor = cargar(clave)
+        with self._lock:
+            self._guardar(clave, valor, time.monotonic())
+        return valor
+
+    def obtener_varios(self, claves, cargar_varios):
+        """Como `obtener` para muchas claves: los faltantes se cargan juntos.
+
+        `cargar_varios(claves)` debe devolver un dict; las claves que no
+        devuelva (productos eliminados) quedan fuera del resultado.
+        """
+        resultado = {}
+        faltantes = []
+        ahora = time.monotonic()
+        with self._lock:
+            for clave in dict.fromkeys(claves):
+                valor = self._leer(clave, ahora)
+                if valor is None:
+                    faltantes.append(clave)
+                else:
+                    resultado[clave] = valor
+            self._aciertos += len(resultado)
+            self._fallos += len(faltantes)
+
+        if faltantes:
+            cargados = cargar_varios(faltantes)
+            with self._lock:
+                ahora = time.monotonic()
+                for clave, valor in cargados.items():
+                    self._guardar(clave, valor, ahora)
+            resultado.update(cargados)
+        return resultado
+
+    def invalidar(self, *claves):
+        with self._lock:
+            for clave in claves:
+                if self._entradas.pop(clave, None) is not None:
+                    self._invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._invalidaciones += len(self._entradas)
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'tasa_aciertos': round(self._aciertos / consultas, 3) if consultas else 0.0,
+                'expirados': self._expirados,
+                'invalidaciones': self._invalidaciones,
+                'tamaño': len(self._entradas),
+                'capacidad': self.capacidad,
+                'ttl': self.ttl,
+            }
@@ -0,0 +1,146 @@
+from decimal import Decimal
+
+CENTAVO = Decimal('0.01')
+
+
+class LineaCarrito:
+    """Una línea del carrito: un producto a un precio unitario."""
+
+    def __init__(self, producto_id, nombre, precio_unitario, cantidad=0):
+        self.producto_id = producto_id
+        self.nombre = nombre
+        self.precio_unitario = precio_unitario
+        self.cantidad = cantidad
+
+    @property
+    def clave(self):
+        return (self.producto_id, self.precio_unitario)
+
+    @property
+    def subtotal(self):
+        return self.precio_unitario * self.cantidad
+
+    def a_dict(self):
+        """Formato de ítem que recibe StockManager.registrar_venta."""
+        return {
+            'producto_id': self.producto_id,
+            'nombre': self.nombre,
+            'cantidad': self.cantidad,
+            'precio_unitario': self.precio_unitario,
+            'subtotal': self.subtotal,
+        }
+
+
+class Carrito:
+    """Carrito de venta con clave por (producto_id, precio).
+
+    Agregar el mismo producto al mismo precio suma a la línea existente;
+    a otro precio abre una línea nueva. La cantidad por producto (para
+    validar contra el stock), el total y las unidades se mantienen al
+    agregar o quitar, sin recorrer las líneas. Los importes son Decimal
+    redondeados a centavos.
+
+    Cada cambio queda en un registro que la vista consume con
+    tomar_cambios() para tocar solo las filas afectadas: tuplas
+    (accion, clave, linea) con accion 'alta', 'cambio', 'baja' o 'vaciado'.
+    """
+
+    def __init__(self):
+        self._lineas = {}
+        self._cantidades = {}
+        self.total = Decimal('0.00')
+        self.unidades = 0
+        self._cambios = []
+
+    def __len__(self):
+        return len(self._lineas)
+
+    def __iter__(self):
+        return iter(self._lineas.values())
+
+    def linea(self, clave):
+        return self._lineas.get(clave)
+
+    def cantidad_de(self, producto_id):
+        """Unidades de `producto_id` en el carrito, sumando todos sus precios."""
+        return self._cantidades.get(producto_id, 0)
+
+    def agregar(self, producto_id, nombre, cantidad, precio_unitario):
+        """Suma `cantidad` unidades y devuelve la línea afectada."""
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor a 0")
+        precio = Decimal(str(precio_unitario)).quantize(CENTAVO)
+        if precio < 0:
+            raise ValueError("El precio no puede ser negativo")
+
+        clave = (producto_id, precio)
+        linea = self._lineas.get(clave)
+        if linea is None:
+            linea = LineaCarrito(producto_id, nombre, precio)
+            self._lineas[clave] = linea
+            accion = 'alta'
+        else:
+            accion = 'cambio'
+
+        linea.cantidad += cantidad
+        self._cantidades[producto_id] = self._cantidades.get(producto_id, 0) + cantidad
+        self.unidades += cantidad
+        self.total += precio * cantidad
+        self._cambios.append((accion, clave, linea))
+        return linea
+
+    def quitar(self, clave):
+        """Quita la línea completa; devuelve la línea o None si no estaba."""
+        linea = self._lineas.pop(clave, None)
+        if linea is None:
+            return None
+
+        restante = self._cantidades[linea.producto_id] - linea.cantidad
+        if restante:
+            self._cantidades[linea.producto_id] = restante
+        else:
+            del self._cantidades[linea.producto_id]
+        self.unidades -= linea.cantidad
+        self.total -= linea.subtotal
+        self._cambios.append(('baja', clave, linea))
+        return linea
+
+    def vaciar(self):
+        self._lineas.clear()
+        self._cantidades.clear()
+        self.total = Decimal('0.00')
+        self.unidades = 0
+        # Los cambios previos ya no importan: la vista limpia todo
+        self._cambios = [('vaciado', None, None)]
+
+    def tomar_cambios(self):
+        """Devuelve y descarta los cambios pendientes de aplicar en la vista."""
+        cambios, self._cambios = self._cambios, []
+        return cambios
+
+    def items(self):
+        """Líneas en el formato de StockManager.registrar_venta."""
+        return [linea.a_dict() for linea in self._lineas.values()]
+
+    def a_dict(self):
+        """Forma serializable (JSON) para estacionar el carrito."""
+        return {
+            'lineas': [
+                {
+                    'producto_id': linea.producto_id,
+                    'nombre': linea.nombre,
+                    'cantidad': linea.cantidad,
+                    'precio_unitario': str(linea.precio_unitario),
+                }
+                for linea in self._lineas.values()
+            ],
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye un carrito estacionado con a_dict()."""
+        carrito = cls()
+        for linea in datos.get('lineas', []):
+            carrito.agregar(int(linea['producto_id']), linea['nombre'],
+                            int(linea['cantidad']), linea['precio_unitario'])
+        return carrito
@@ -0,0 +1,100 @@
+import os
+from peewee import SqliteDatabase
+from playhouse.pool import PooledSqliteDatabase
+
+# Variables de entorno que permiten elegir el perfil sin tocar el código
+VAR_PERFIL = 'SISTEMA_GESTION_DB_PERFIL'
+VAR_RUTA = 'SISTEMA_GESTION_DB_RUTA'
+
+RUTA_POR_DEFECTO = os.path.join('model', 'database', 'stock.db')
+
+PRAGMAS_WAL = {
+    'journal_mode': 'wal',       # lectores concurrentes mientras una caja escribe
+    'synchronous': 'normal',     # seguro con WAL, evita un fsync por commit
+    'cache_size': -64 * 1024,    # 64 MB (valor negativo = KiB)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+PERFILES = {
+    # Comportamiento original: journal de rollback y una conexión por hilo
+    'basico': {
+        'pool': False,
+        'pragmas': {},
+        'timeout': 5,
+    },
+    # Perfil recomendado para una sola caja
+    'wal': {
+        'pool': False,
+        'pragmas': PRAGMAS_WAL,
+        'timeout': 10,
+    },
+    # Varias sesiones de caja: conexiones reutilizables entre hilos
+    'pool': {
+        'pool': True,
+        'pragmas': PRAGMAS_WAL,
+        'timeout': 10,
+        'max_connections': 8,
+        'stale_timeout': 300,
+    },
+}
+
+PERFIL_POR_DEFECTO = 'wal'
+
+
+class ConfiguracionDB:
+    """Describe cómo abrir la base SQLite: ruta, pragmas y modo de conexión.
+
+    Peewee ya mantiene una conexión por hilo; el perfil 'pool' además las
+    reutiliza. Los hilos de trabajo que usen la base con ese perfil deben
+    envolver su tarea en `conexion_de_hilo()` (model.modelo) para devolver
+    la conexión; EjecutorTareas y BusquedaDiferida ya lo hacen.
+    """
+
+    def __init__(self, perfil=None, ruta=None, **ajustes):
+        perfil = perfil or PERFIL_POR_DEFECTO
+        if perfil not in PERFILES:
+            raise ValueError(
+                f"Perfil de base de datos desconocido: {perfil}. "
+                f"Opciones: {', '.join(PERFILES)}"
+            )
+        self.perfil = perfil
+        self.ruta = ruta or RUTA_POR_DEFECTO
+
+        opciones = dict(PERFILES[perfil])
+        opciones['pragmas'] = dict(opciones['pragmas'])
+        pragmas_extra = ajustes.pop('pragmas', None)
+        if pragmas_extra:
+            opciones['pragmas'].update(pragmas_extra)
+        opciones.update(ajustes)
+        self.opciones = opciones
+
+    @classmethod
+    def desde_entorno(cls):
+        return cls(perfil=os.environ.get(VAR_PERFIL), ruta=os.environ.get(VAR_RUTA))
+
+    def crear_base_datos(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        opciones = dict(self.opciones)
+        usar_pool = opciones.pop('pool')
+        pragmas = opciones.pop('pragmas')
+        timeout = opciones.pop('timeout')
+
+        if usar_pool:
+            # En el pool `timeout` es la espera por una conexión libre; la
+            # espera por el bloqueo de SQLite va como pragma
+            return PooledSqliteDatabase(
+                self.ruta,
+                pragmas=dict(pragmas, busy_timeout=int(timeout * 1000)),
+                timeout=timeout,
+                max_connections=opciones.get('max_connections'),
+                stale_timeout=opciones.get('stale_timeout'),
+                check_same_thread=False,
+            )
+        return SqliteDatabase(self.ruta, pragmas=pragmas, timeout=timeout)
+
+    def __repr__(self):
+        return f"ConfiguracionDB(perfil={self.perfil!r}, ruta={self.ruta!r})"
@@ -0,0 +1,175 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+from decimal import Decimal
+from model.modelo import VentasManager
+
+FORMATOS = ('txt', 'csv', 'jsonl')
+
+PRODUCTO_ELIMINADO = 'Producto eliminado'
+
+
+class ExportacionCancelada(Exception):
+    """La exportación se canceló antes de terminar; no queda archivo."""
+
+
+def _importe(valor):
+    return f"{valor:.2f}"
+
+
+class ExportadorVentas:
+    """Exporta el historial de ventas a un archivo sin armarlo en memoria.
+
+    Recorre VentasManager.ventas_con_lineas (una sola consulta con JOIN,
+    iterada sin cache) y escribe cada venta apenas se leen sus líneas: la
+    memoria usada no depende de cuántas ventas haya. Formatos: 'txt' (el
+    reporte de siempre), 'csv' (una fila por línea) y 'jsonl' (un objeto
+    por venta con sus productos).
+    """
+
+    def __init__(self, ventas_manager=None):
+        self.ventas_manager = ventas_manager or VentasManager()
+
+    def contar(self, desde=None, hasta=None, vendedor=None):
+        """Ventas que exportaría `exportar` con esos filtros (para el progreso)."""
+        return self.ventas_manager.contar_ventas(desde, hasta, vendedor)
+
+    def exportar(self, destino, formato='txt', desde=None, hasta=None, vendedor=None,
+                 al_avanzar=None, cancelado=None, cada=200):
+        """Escribe el historial en `destino` (ruta o archivo de texto abierto).
+
+        Con una ruta se escribe primero a un temporal y se renombra al
+        terminar, así nunca queda un archivo a medio escribir. Cada `cada`
+        ventas se llama `al_avanzar(ventas_escritas)` y se consulta
+        `cancelado()`: si devuelve True se lanza ExportacionCancelada.
+        Devuelve {'ventas', 'lineas', 'total', 'archivo'}.
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportación no soportado: {formato}")
+        seguimiento = (al_avanzar, cancelado, cada)
+
+        if not isinstance(destino, str):
+            resumen = self._escribir(destino, formato, desde, hasta, vendedor, seguimiento)
+            resumen['archivo'] = getattr(destino, 'name', None)
+            return resumen
+
+        temporal = destino + '.tmp'
+        try:
+            with open(temporal, 'w', encoding='utf-8', newline='') as archivo:
+                resumen = self._escribir(archivo, formato, desde, hasta, vendedor, seguimiento)
+            os.replace(temporal, destino)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        resumen['archivo'] = destino
+        return resumen
+
+    def _escribir(self, archivo, formato, desde, hasta, vendedor, seguimiento):
+        al_avanzar, cancelado, cada = seguimiento
+        escribir_venta = {
+            'txt': self._venta_txt,
+            'csv': self._venta_csv,
+            'jsonl': self._venta_jsonl,
+        }[formato]
+
+        resumen = {'ventas': 0, 'lineas': 0, 'total': Decimal('0')}
+        salida = archivo
+        if formato == 'txt':
+            archivo.write("HISTORIAL DE VENTAS\n")
+            archivo.write("=" * 50 + "\n\n")
+        elif formato == 'csv':
+            salida = csv.writer(archivo)
+            salida.writerow(['numero_venta', 'fecha', 'cliente', 'vendedor', 'total_venta',
+                             'producto_id', 'producto', 'cantidad', 'precio_unitario', 'subtotal'])
+
+        for venta, lineas in self.ventas_manager.ventas_con_lineas(desde, hasta, vendedor):
+            escribir_venta(salida, venta, lineas)
+            resumen['ventas'] += 1
+            resumen['lineas'] += len(lineas)
+            resumen['total'] += venta.total
+            if resumen['ventas'] % cada == 0:
+                if cancelado and cancelado():
+                    raise ExportacionCancelada()
+                if al_avanzar:
+                    al_avanzar(resumen['ventas'])
+
+        if formato == 'txt':
+            archivo.write(f"TOTAL GENERAL: ${resumen['total']:.2f}\n")
+            archivo.write(f"Total de ventas: {resumen['ventas']}\n")
+        if al_avanzar:
+            al_avanzar(resumen['ventas'])
+        return resumen
+
+    @staticmethod
+    def _nombre(linea):
+        if linea.producto is None:
+            return f"{PRODUCTO_ELIMINADO} (ID: {linea.producto_id})"
+        return linea.producto
+
+    def _venta_txt(self, archivo, venta, lineas):
+        partes = [
+            f"Venta: {venta.numero_venta}\n",
+            f"Fecha: {venta.fecha.strftime('%d/%m/%Y %H:%M')}\n",
+            f"Cliente: {venta.cliente}\n",
+            f"Vendedor: {venta.vendedor}\n",
+            f"Total: ${venta.total:.2f}\n",
+            "Productos:\n",
+        ]
+        for linea in lineas:
+            partes.append(f"  - {self._nombre(linea)} x{linea.cantidad} = ${linea.subtotal:.2f}\n")
+        partes.append("-" * 30 + "\n\n")
+        archivo.write(''.join(partes))
+
+    def _venta_csv(self, escritor, venta, lineas):
+        comunes = [venta.numero_venta, venta.fecha.isoformat(sep=' ', timespec='seconds'),
+                   venta.cliente, venta.vendedor, _importe(venta.total)]
+        if not lineas:
+            escritor.writerow(comunes + ['', '', '', '', ''])
+        for linea in lineas:
+            escritor.writerow(comunes + [
+                linea.producto_id,
+                linea.producto if linea.producto is not None else PRODUCTO_ELIMINADO,
+                linea.cantidad,
+                _importe(linea.precio_unitario),
+                _importe(linea.subtotal),
+            ])
+
+    def _venta_jsonl(self, archivo, venta, lineas):
+        registro = {
+            'numero_venta': venta.numero_venta,
+            'fecha': venta.fecha.isoformat(timespec='seconds'),
+            'cliente': venta.cliente,
+            'vendedor': venta.vendedor,
+            'total': _importe(venta.total),
+            'productos': [
+                {
+                    'producto_id': linea.producto_id,
+                    'nombre': linea.producto if linea.producto is not None else PRODUCTO_ELIMINADO,
+                    'cantidad': linea.cantidad,
+                    'precio_unitario': _importe(linea.precio_unitario),
+                    'subtotal': _importe(linea.subtotal),
+                }
+                for linea in lineas
+            ],
+        }
+        archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    from bootstrap import bootstrap
+
+    parser = argparse.ArgumentParser(description="Exporta el historial de ventas")
+    parser.add_argument('destino', help="Archivo de salida")
+    parser.add_argument('--formato', choices=FORMATOS, help="Por defecto, la extensión del destino")
+    parser.add_argument('--desde', type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument('--hasta', type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument('--vendedor')
+    argumentos = parser.parse_args()
+
+    formato = argumentos.formato or os.path.splitext(argumentos.destino)[1].lstrip('.').lower()
+    bootstrap()
+    resumen = ExportadorVentas().exportar(argumentos.destino, formato or 'txt',
+                                          argumentos.desde, argumentos.hasta, argumentos.vendedor)
+    print(f"📤 {resumen['ventas']} ventas ({resumen['lineas']} líneas) exportadas a {resumen['archivo']}")
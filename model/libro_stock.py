@@ -0,0 +1,205 @@
+import datetime
+import os
+import threading
+import time
+from peewee import Case, JOIN, Value, fn
+from model.modelo import db, conexion_de_hilo, Producto, MovimientoStock, CheckpointStock
+
+# Cada cuántas horas se crean checkpoints mientras corre la aplicación
+# (0 lo desactiva)
+VAR_INTERVALO_CHECKPOINTS = 'SISTEMA_GESTION_CHECKPOINT_HORAS'
+INTERVALO_CHECKPOINTS_HORAS = 24
+
+
+def cantidad_con_signo():
+    return Case(None, [(MovimientoStock.tipo == 'salida', MovimientoStock.cantidad * -1)],
+                MovimientoStock.cantidad)
+
+
+class LibroStock:
+    """Libro de stock: checkpoints por producto sobre el log de MovimientoStock.
+
+    Un checkpoint guarda el stock de un producto tras aplicar todos sus
+    movimientos con id <= `movimiento_id`. Las consultas históricas y la
+    verificación solo recorren los movimientos posteriores al checkpoint
+    más cercano.
+    """
+
+    def _neto(self, producto_id, condicion):
+        neto = (MovimientoStock
+                .select(fn.COALESCE(fn.SUM(cantidad_con_signo()), 0))
+                .where((MovimientoStock.producto == producto_id) & condicion)
+                .scalar())
+        return neto or 0
+
+    def stock_at(self, producto_id, fecha):
+        """Stock del producto al momento `fecha`.
+
+        Avanza desde el checkpoint anterior más cercano; si no lo hay,
+        retrocede desde el primer checkpoint posterior (o desde el stock
+        actual si el producto todavía no tiene checkpoints).
+        """
+        anterior = (CheckpointStock
+                    .select()
+                    .where((CheckpointStock.producto == producto_id) &
+                           (CheckpointStock.fecha <= fecha))
+                    .order_by(CheckpointStock.fecha.desc(), CheckpointStock.id.desc())
+                    .first())
+        if anterior:
+            return anterior.stock + self._neto(
+                producto_id,
+                (MovimientoStock.id > anterior.movimiento_id) & (MovimientoStock.fecha <= fecha))
+
+        posterior = (CheckpointStock
+                     .select()
+                     .where((CheckpointStock.producto == producto_id) &
+                            (CheckpointStock.fecha > fecha))
+                     .order_by(CheckpointStock.fecha, CheckpointStock.id)
+                     .first())
+        if posterior:
+            return posterior.stock - self._neto(
+                producto_id,
+                (MovimientoStock.id <= posterior.movimiento_id) & (MovimientoStock.fecha > fecha))
+
+        producto = Producto.get_by_id(producto_id)
+        return producto.stock - self._neto(producto_id, MovimientoStock.fecha > fecha)
+
+    def _ultimos_checkpoints(self):
+        return (CheckpointStock
+                .select(CheckpointStock.producto, fn.MAX(CheckpointStock.id).alias('checkpoint_id'))
+                .group_by(CheckpointStock.producto))
+
+    def crear_checkpoints(self, min_movimientos=1):
+        """Crea checkpoints nuevos y devuelve cuántos se insertaron.
+
+        Los productos sin checkpoint se anclan con su stock actual; el resto
+        recibe uno nuevo solo si acumuló al menos `min_movimientos` desde el
+        último. Son consultas por conjunto: no se recorre producto por producto.
+        """
+        ahora = datetime.datetime.now()
+        with db.atomic():
+            ultimo_movimiento = MovimientoStock.select(fn.COALESCE(fn.MAX(MovimientoStock.id), 0))
+
+            sin_checkpoint = (Producto
+                              .select(Producto.id, Value(ahora), Producto.stock, ultimo_movimiento)
+                              .join(CheckpointStock, JOIN.LEFT_OUTER,
+                                    on=(CheckpointStock.producto == Producto.id))
+                              .where(CheckpointStock.id.is_null()))
+
+            ultimos = self._ultimos_checkpoints()
+            con_movimientos = (CheckpointStock
+                               .select(CheckpointStock.producto,
+                                       CheckpointStock.stock + fn.SUM(cantidad_con_signo()),
+                                       fn.MAX(MovimientoStock.id))
+                               .join(ultimos, on=(CheckpointStock.id == ultimos.c.checkpoint_id))
+                               .switch(CheckpointStock)
+                               .join(MovimientoStock,
+                                     on=((MovimientoStock.producto == CheckpointStock.producto) &
+                                         (MovimientoStock.id > CheckpointStock.movimiento_id)))
+                               .group_by(CheckpointStock.id)
+                               .having(fn.COUNT(MovimientoStock.id) >= min_movimientos))
+
+            campos = [CheckpointStock.producto, CheckpointStock.fecha,
+                      CheckpointStock.stock, CheckpointStock.movimiento_id]
+            # Se calcula el segundo antes de anclar para no volver a procesar
+            # los checkpoints recién creados.
+            nuevos = [(producto_id, ahora, stock, movimiento_id)
+                      for producto_id, stock, movimiento_id in con_movimientos.tuples()]
+            anclados = db.execute(CheckpointStock.insert_from(sin_checkpoint, campos)).rowcount
+            if nuevos:
+                CheckpointStock.insert_many(nuevos, fields=campos).execute()
+
+        return max(anclados, 0) + len(nuevos)
+
+    def ultimo_checkpoint(self):
+        """Fecha del checkpoint más nuevo, o None si no hay ninguno."""
+        return (CheckpointStock
+                .select(CheckpointStock.fecha)
+                .order_by(CheckpointStock.fecha.desc())
+                .limit(1)
+                .scalar())
+
+    def crear_checkpoints_si_vencen(self, intervalo, min_movimientos=1):
+        """Crea checkpoints solo si el más nuevo tiene más de `intervalo`
+        (un timedelta). Devuelve cuántos se insertaron."""
+        ultimo = self.ultimo_checkpoint()
+        if ultimo is not None and datetime.datetime.now() - ultimo < intervalo:
+            return 0
+        return self.crear_checkpoints(min_movimientos)
+
+    def verificar_consistencia(self):
+        """Compara Producto.stock con el libro y devuelve las diferencias.
+
+        Solo suma los movimientos posteriores al último checkpoint de cada
+        producto; los productos sin checkpoint no se verifican.
+        """
+        ultimos = self._ultimos_checkpoints()
+        neto = fn.COALESCE(fn.SUM(cantidad_con_signo()), 0)
+        consulta = (Producto
+                    .select(Producto.id, Producto.nombre, Producto.stock,
+                            (CheckpointStock.stock + neto).alias('stock_libro'))
+                    .join(ultimos, on=(ultimos.c.producto_id == Producto.id))
+                    .join(CheckpointStock, on=(CheckpointStock.id == ultimos.c.checkpoint_id))
+                    .join(MovimientoStock, JOIN.LEFT_OUTER,
+                          on=((MovimientoStock.producto == Producto.id) &
+                              (MovimientoStock.id > CheckpointStock.movimiento_id)))
+                    .group_by(Producto.id)
+                    .having(Producto.stock != (CheckpointStock.stock + neto))
+                    .tuples())
+
+        return [
+            {
+                'producto_id': producto_id,
+                'nombre': nombre,
+                'stock_registrado': stock,
+                'stock_libro': stock_libro,
+                'diferencia': stock - stock_libro,
+            }
+            for producto_id, nombre, stock, stock_libro in consulta
+        ]
+
+
+def iniciar_checkpoints_periodicos(horas=None):
+    """Hilo de fondo que crea checkpoints al arrancar (si el último venció)
+    y después cada `horas`, así stock_at no recorre todo el libro.
+
+    Sin `horas` se toma VAR_INTERVALO_CHECKPOINTS; con 0 no se inicia.
+    Devuelve el hilo, o None si quedó desactivado.
+    """
+    if horas is None:
+        horas = float(os.environ.get(VAR_INTERVALO_CHECKPOINTS, INTERVALO_CHECKPOINTS_HORAS))
+    if horas <= 0:
+        return None
+    intervalo = datetime.timedelta(hours=horas)
+    libro = LibroStock()
+
+    def bucle():
+        while True:
+            try:
+                with conexion_de_hilo():
+                    creados = libro.crear_checkpoints_si_vencen(intervalo)
+                if creados:
+                    print(f"📒 Checkpoints creados: {creados}")
+            except Exception as ex:
+                print(f"⚠️ No se pudieron crear checkpoints de stock: {ex}")
+            time.sleep(intervalo.total_seconds())
+
+    hilo = threading.Thread(target=bucle, name='checkpoints-stock', daemon=True)
+    hilo.start()
+    return hilo
+
+
+if __name__ == "__main__":
+    from bootstrap import bootstrap
+    bootstrap()
+
+    libro = LibroStock()
+    creados = libro.crear_checkpoints()
+    print(f"📒 Checkpoints creados: {creados}")
+
+    diferencias = libro.verificar_consistencia()
+    if not diferencias:
+        print("✅ El stock coincide con el libro de movimientos")
+    for d in diferencias:
+        print(f"⚠️ {d['nombre']} (ID {d['producto_id']}): "
+              f"stock {d['stock_registrado']}, libro {d['stock_libro']}")
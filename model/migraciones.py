@@ -0,0 +1,139 @@
+"""Migraciones versionadas del esquema de stock.db.
+
+La versión aplicada se guarda en `PRAGMA user_version`. Cada migración se
+ejecuta una sola vez, en orden, dentro de su propia transacción, y debe ser
+idempotente porque también corre sobre bases recién creadas por
+`create_tables`. En bases existentes se aplican antes de `create_tables`,
+así que no pueden depender de tablas que este todavía no creó.
+"""
+
+MIGRACIONES = []
+
+
+def migracion(version, descripcion):
+    def registrar(func):
+        MIGRACIONES.append((version, descripcion, func))
+        MIGRACIONES.sort(key=lambda m: m[0])
+        return func
+    return registrar
+
+
+def version_actual(db):
+    return db.execute_sql('PRAGMA user_version').fetchone()[0]
+
+
+def migrar(db):
+    """Aplica las migraciones pendientes y devuelve la lista de versiones aplicadas."""
+    aplicadas = []
+    actual = version_actual(db)
+
+    for version, descripcion, func in MIGRACIONES:
+        if version <= actual:
+            continue
+        with db.atomic():
+            func(db)
+            db.execute_sql(f'PRAGMA user_version = {int(version)}')
+        print(f"🔧 Migración {version} aplicada: {descripcion}")
+        aplicadas.append(version)
+
+    return aplicadas
+
+
+@migracion(1, "Índices para listados, búsquedas e historial")
+def _indices_consultas(db):
+    sentencias = [
+        'CREATE INDEX IF NOT EXISTS "producto_nombre" ON "producto" ("nombre")',
+        'CREATE INDEX IF NOT EXISTS "producto_categoria" ON "producto" ("categoria")',
+        'CREATE INDEX IF NOT EXISTS "movimientostock_producto_id_fecha" '
+        'ON "movimientostock" ("producto_id", "fecha")',
+        'CREATE INDEX IF NOT EXISTS "venta_fecha" ON "venta" ("fecha")',
+        'CREATE INDEX IF NOT EXISTS "venta_cliente" ON "venta" ("cliente")',
+        'CREATE INDEX IF NOT EXISTS "detalleventa_venta_id" ON "detalleventa" ("venta_id")',
+    ]
+    for sql in sentencias:
+        db.execute_sql(sql)
+
+
+def fts5_disponible(db):
+    try:
+        db.execute_sql('CREATE VIRTUAL TABLE temp._prueba_fts5 USING fts5(x)')
+        db.execute_sql('DROP TABLE temp._prueba_fts5')
+        return True
+    except Exception:
+        return False
+
+
+@migracion(2, "Índice de texto completo (FTS5) para la búsqueda de productos")
+def _busqueda_productos_fts(db):
+    if not fts5_disponible(db):
+        print("⚠️ SQLite sin FTS5: la búsqueda de productos usará LIKE")
+        return
+
+    # Tabla de contenido externo: no duplica los datos, solo el índice.
+    # remove_diacritics hace que "cafe" encuentre "café"; prefix acelera
+    # las búsquedas mientras se escribe.
+    db.execute_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts USING fts5("
+        "nombre, descripcion, categoria, "
+        "content='producto', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    db.execute_sql(
+        "CREATE TRIGGER IF NOT EXISTS producto_fts_ai AFTER INSERT ON producto BEGIN "
+        "INSERT INTO producto_fts(rowid, nombre, descripcion, categoria) "
+        "VALUES (new.id, new.nombre, new.descripcion, new.categoria); "
+        "END"
+    )
+    db.execute_sql(
+        "CREATE TRIGGER IF NOT EXISTS producto_fts_ad AFTER DELETE ON producto BEGIN "
+        "INSERT INTO producto_fts(producto_fts, rowid, nombre, descripcion, categoria) "
+        "VALUES ('delete', old.id, old.nombre, old.descripcion, old.categoria); "
+        "END"
+    )
+    # Solo las columnas indexadas: los cambios de stock no tocan el índice
+    db.execute_sql(
+        "CREATE TRIGGER IF NOT EXISTS producto_fts_au "
+        "AFTER UPDATE OF nombre, descripcion, categoria ON producto BEGIN "
+        "INSERT INTO producto_fts(producto_fts, rowid, nombre, descripcion, categoria) "
+        "VALUES ('delete', old.id, old.nombre, old.descripcion, old.categoria); "
+        "INSERT INTO producto_fts(rowid, nombre, descripcion, categoria) "
+        "VALUES (new.id, new.nombre, new.descripcion, new.categoria); "
+        "END"
+    )
+    db.execute_sql("INSERT INTO producto_fts(producto_fts) VALUES ('rebuild')")
+
+
+@migracion(3, "Columna sku en producto para importaciones")
+def _sku_producto(db):
+    columnas = [c.name for c in db.get_columns('producto')]
+    if 'sku' not in columnas:
+        db.execute_sql('ALTER TABLE "producto" ADD COLUMN "sku" VARCHAR(255)')
+    db.execute_sql('CREATE UNIQUE INDEX IF NOT EXISTS "producto_sku" ON "producto" ("sku")')
+
+
+@migracion(4, "Índice de fecha_actualizacion para refrescar pantallas")
+def _indice_fecha_actualizacion(db):
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "producto_fecha_actualizacion" '
+                   'ON "producto" ("fecha_actualizacion")')
+
+
+@migracion(5, "Resúmenes diarios de ventas por producto, categoría y vendedor")
+def _resumenes_ventas(db):
+    # Las tablas se crean acá (en bases existentes create_tables corre
+    # después) y se cargan con las ventas que ya había.
+    from model.modelo import RESUMENES
+    from model.resumen_ventas import ResumenVentas
+    db.create_tables(RESUMENES)
+    ResumenVentas().reconstruir()
+
+
+@migracion(6, "Stock mínimo por producto e índice de productos bajo el mínimo")
+def _stock_minimo(db):
+    columnas = [c.name for c in db.get_columns('producto')]
+    if 'stock_minimo' not in columnas:
+        # 5 era el umbral fijo con el que las pantallas marcaban stock bajo
+        db.execute_sql('ALTER TABLE "producto" ADD COLUMN "stock_minimo" INTEGER NOT NULL DEFAULT 5')
+    # Índice sobre la expresión que usa productos_bajo_minimo: la consulta
+    # lee solo el tramo negativo
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "producto_stock_bajo_minimo" '
+                   'ON "producto" ("stock" - "stock_minimo")')
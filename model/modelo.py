@@ -1,14 +1,28 @@
 from peewee import *
+from playhouse.pool import PooledDatabase
+from playhouse.sqlite_ext import FTS5Model, SearchField
+from contextlib import contextmanager
 import datetime
+from itertools import count, groupby
 import os
+import re
+import csv
+import json
+from decimal import Decimal, InvalidOperation
 from services.decoradores import log_operacion
 from model.observers.observador import Sujeto
-import flet as ft
-# db = SqliteDatabase('stock.db')
-db_directory = os.path.join('model', 'database')
-os.makedirs(db_directory, exist_ok=True)
-db_path = os.path.join(db_directory, 'stock.db')
-db = SqliteDatabase(db_path)
+from model.configuracion_db import ConfiguracionDB
+from model.migraciones import migrar
+from model.cache_productos import CacheProductos
+from model.alertas_stock import AlertasStock
+
+# La base real se asigna en inicializar_base_datos(), llamada por bootstrap();
+# importar este módulo no abre conexiones ni toca el disco.
+db = DatabaseProxy()
+
+# Stock mínimo de los productos que no definen uno (el umbral que antes
+# estaba fijo en las pantallas)
+STOCK_MINIMO_PREDETERMINADO = 5
 
 class BaseModel(Model):
     class Meta:
@@ -18,12 +32,14 @@ class Producto(BaseModel, Sujeto):
     def __init__(self, *args, **kwargs):
         BaseModel.__init__(self, *args, **kwargs)
         Sujeto.__init__(self)
-    nombre = CharField()
+    nombre = CharField(index=True)
     descripcion = TextField()
     precio = DecimalField(max_digits=10, decimal_places=2)
     stock = IntegerField()
-    categoria = CharField()
-    fecha_actualizacion = DateTimeField(default=datetime.datetime.now)
+    stock_minimo = IntegerField(default=STOCK_MINIMO_PREDETERMINADO)
+    categoria = CharField(index=True)
+    sku = CharField(null=True, unique=True)
+    fecha_actualizacion = DateTimeField(default=datetime.datetime.now, index=True)
 
 class MovimientoStock(BaseModel):
     producto = ForeignKeyField(Producto, backref='movimientos')
@@ -32,8 +48,156 @@ class MovimientoStock(BaseModel):
     fecha = DateTimeField(default=datetime.datetime.now)
     usuario = CharField()
 
-db.connect()
-db.create_tables([Producto, MovimientoStock])
+    class Meta:
+        indexes = (
+            (('producto', 'fecha'), False),
+        )
+
+class CheckpointStock(BaseModel):
+    """Foto del stock de un producto tras aplicar hasta `movimiento_id`."""
+    producto = ForeignKeyField(Producto, backref='checkpoints')
+    fecha = DateTimeField(default=datetime.datetime.now)
+    stock = IntegerField()
+    movimiento_id = IntegerField(default=0)
+
+    class Meta:
+        indexes = (
+            (('producto', 'fecha'), False),
+        )
+
+class Venta(BaseModel):
+    numero_venta = CharField(unique=True)
+    fecha = DateTimeField(default=datetime.datetime.now, index=True)
+    cliente = CharField(index=True)
+    total = DecimalField(max_digits=10, decimal_places=2)
+    vendedor = CharField()
+
+class DetalleVenta(BaseModel):
+    venta = ForeignKeyField(Venta, backref='detalles', index=True)
+    producto = ForeignKeyField(Producto)
+    cantidad = IntegerField()
+    precio_unitario = DecimalField(max_digits=10, decimal_places=2)
+    subtotal = DecimalField(max_digits=10, decimal_places=2)
+
+class ResumenDiarioProducto(BaseModel):
+    """Unidades e importe vendidos por día y producto.
+
+    Las tres tablas de resumen las mantiene registrar_venta dentro de la
+    transacción de la venta; model/resumen_ventas.py las reconstruye.
+    producto_id no es clave foránea para conservar lo vendido de productos
+    que después se eliminan. Son tablas WITHOUT ROWID: las filas quedan
+    ordenadas por (fecha, clave) y un rango de fechas se lee de corrido.
+    """
+    fecha = DateField()
+    producto_id = IntegerField()
+    unidades = IntegerField(default=0)
+    importe = DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        primary_key = CompositeKey('fecha', 'producto_id')
+        without_rowid = True
+
+class ResumenDiarioCategoria(BaseModel):
+    fecha = DateField()
+    categoria = CharField()
+    unidades = IntegerField(default=0)
+    importe = DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        primary_key = CompositeKey('fecha', 'categoria')
+        without_rowid = True
+
+class ResumenDiarioVendedor(BaseModel):
+    fecha = DateField()
+    vendedor = CharField()
+    ventas = IntegerField(default=0)
+    importe = DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        primary_key = CompositeKey('fecha', 'vendedor')
+        without_rowid = True
+
+RESUMENES = [ResumenDiarioProducto, ResumenDiarioCategoria, ResumenDiarioVendedor]
+
+class ProductoBusqueda(FTS5Model):
+    """Índice FTS5 de Producto; lo crea y sincroniza la migración 2."""
+    nombre = SearchField()
+    descripcion = SearchField()
+    categoria = SearchField()
+
+    class Meta:
+        database = db
+        table_name = 'producto_fts'
+
+MODELOS = [Producto, MovimientoStock, CheckpointStock, Venta, DetalleVenta] + RESUMENES
+
+def inicializar_base_datos(configuracion=None):
+    """Abre la base según `configuracion` (o el entorno) y aplica el esquema."""
+    configuracion = configuracion or ConfiguracionDB.desde_entorno()
+    base = configuracion.crear_base_datos()
+    db.initialize(base)
+    StockManager._fts_disponible = None
+    cache_productos.limpiar()
+
+    db.connect(reuse_if_open=True)
+    # En una base existente las migraciones van primero: create_tables crearía
+    # los índices declarados sobre columnas que todavía no se agregaron.
+    if db.table_exists(Producto._meta.table_name):
+        migrar(db)
+    db.create_tables(MODELOS)
+    migrar(db)
+    return base
+
+@contextmanager
+def conexion_de_hilo():
+    """Envuelve el trabajo de un hilo que no es el principal.
+
+    Con el perfil 'pool' la conexión del hilo se toma al entrar y se
+    devuelve al pool al salir; si no, cada hilo de trabajo (ejecutor,
+    búsqueda, exportaciones) retendría la suya y el pool se agotaría. Con
+    los demás perfiles no hace nada: peewee ya mantiene una conexión por
+    hilo y cerrarla obligaría a reabrirla en cada tarea.
+    """
+    if not isinstance(db.obj, PooledDatabase) or not db.is_closed():
+        # Sin pool, o el hilo ya tiene su conexión (tarea anidada)
+        yield
+        return
+    db.connect()
+    try:
+        yield
+    finally:
+        db.close()
+
+# Lecturas de presentación de Producto; StockManager la invalida al escribir
+cache_productos = CacheProductos()
+
+# Cruces del stock mínimo; StockManager las emite al confirmar cada escritura
+alertas_stock = AlertasStock()
+
+def sumar_en_resumen(modelo, clave, filas, campos):
+    """Upsert de `filas` en una tabla de resumen: si (fecha, clave) ya existe
+    se suman `campos` en lugar de reemplazarlos."""
+    objetivo = [modelo.fecha, getattr(modelo, clave)]
+    suma = {getattr(modelo, campo): getattr(modelo, campo) + getattr(EXCLUDED, campo)
+            for campo in campos}
+    for lote in chunked(filas, 100):
+        modelo.insert_many(lote).on_conflict(conflict_target=objetivo, update=suma).execute()
+
+class StockInsuficiente(ValueError):
+    """Error de stock con el detalle estructurado de las líneas que no alcanzan.
+
+    `faltantes` es una lista de dicts con producto_id, nombre, requerido y
+    disponible (None si el producto no existe).
+    """
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        detalle = ", ".join(
+            f"{f['nombre']} (disponible: {f['disponible']}, requerido: {f['requerido']})"
+            for f in faltantes
+        )
+        super().__init__(f"Stock insuficiente: {detalle}")
+
+_secuencia_ventas = count()
 
 class StockManager:
     def __init__(self):
@@ -43,20 +207,31 @@ class StockManager:
         self.log_file_path = os.path.join(self.log_dir, 'log_stock.txt')
     
     @log_operacion
-    def agregar_producto(self, nombre, descripcion, precio, stock, categoria):
-        producto = Producto.create(
-            nombre=nombre,
-            descripcion=descripcion,
-            precio=precio,
-            stock=stock,
-            categoria=categoria
-        )
+    def agregar_producto(self, nombre, descripcion, precio, stock, categoria, stock_minimo=None, usuario='admin'):
+        with db.atomic():
+            producto = Producto.create(
+                nombre=nombre,
+                descripcion=descripcion,
+                precio=precio,
+                stock=stock,
+                categoria=categoria,
+                stock_minimo=STOCK_MINIMO_PREDETERMINADO if stock_minimo is None else stock_minimo
+            )
+            # Movimiento de apertura: el libro de stock parte de 0 al crear
+            # el producto, así stock_at antes del alta da 0
+            if producto.stock:
+                MovimientoStock.create(producto=producto, tipo='entrada', cantidad=producto.stock,
+                                       fecha=producto.fecha_actualizacion, usuario=usuario)
         producto.notificar(f"Nuevo producto agregado: {nombre}")
+        alertas_stock.detectar([
+            (producto.id, producto.nombre, False, producto.stock, producto.stock_minimo)
+        ])
         return producto
     @log_operacion
     def actualizar_stock(self, producto_id, cantidad, usuario, tipo='entrada'):
         
         producto = Producto.get(Producto.id == producto_id)
+        estaba_bajo = producto.stock < producto.stock_minimo
         if tipo == 'entrada':
             producto.stock += cantidad
         elif tipo == 'salida':
@@ -72,10 +247,464 @@ class StockManager:
             cantidad=cantidad,
             usuario=usuario
         )
+        cache_productos.invalidar(producto.id)
         producto.notificar(f"Stock actualizado: {producto.nombre} - {tipo} de {cantidad} unidades")
+        alertas_stock.detectar([
+            (producto.id, producto.nombre, estaba_bajo, producto.stock, producto.stock_minimo)
+        ])
         
         return producto
 
+    @log_operacion
+    def registrar_venta(self, cliente, vendedor, items):
+        """Registra una venta completa en una sola transacción.
+
+        `items` son dicts con producto_id, cantidad y precio_unitario (el mismo
+        formato que usa el carrito). El stock se descuenta con un único UPDATE
+        condicionado; si alguna línea no alcanza se revierte todo y se lanza
+        StockInsuficiente con la lista de líneas faltantes.
+
+        La venta devuelta lleva en `stock_resultante` el stock de cada producto
+        vendido tras el descuento ({producto_id: stock}), para que la interfaz
+        pueda actualizarse sin volver a consultar.
+        """
+        if not items:
+            raise ValueError("La venta no tiene productos")
+
+        # Todo se valida antes de abrir la transacción: una cantidad negativa
+        # pasaría el control de stock y terminaría sumando unidades
+        requeridos = {}
+        lineas = []
+        total = Decimal('0')
+        for item in items:
+            producto_id = int(item['producto_id'])
+            cantidad = int(item['cantidad'])
+            precio = Decimal(str(item['precio_unitario']))
+            if cantidad <= 0:
+                raise ValueError("La cantidad debe ser mayor a 0")
+            if precio < 0:
+                raise ValueError("El precio no puede ser negativo")
+            requeridos[producto_id] = requeridos.get(producto_id, 0) + cantidad
+            subtotal = precio * cantidad
+            total += subtotal
+            lineas.append((producto_id, cantidad, precio, subtotal))
+
+        ahora = datetime.datetime.now()
+
+        deltas = {producto_id: -cantidad for producto_id, cantidad in requeridos.items()}
+
+        with db.atomic() as transaccion:
+            productos = self._aplicar_deltas(deltas, ahora, transaccion)
+
+            venta = Venta.create(
+                numero_venta=self._numero_venta(ahora),
+                fecha=ahora,
+                cliente=cliente,
+                total=total,
+                vendedor=vendedor
+            )
+
+            filas_detalle = [
+                {
+                    'venta': venta.id,
+                    'producto': producto_id,
+                    'cantidad': cantidad,
+                    'precio_unitario': precio,
+                    'subtotal': subtotal,
+                }
+                for producto_id, cantidad, precio, subtotal in lineas
+            ]
+            for lote in chunked(filas_detalle, 100):
+                DetalleVenta.insert_many(lote).execute()
+
+            filas_movimiento = [
+                {
+                    'producto': producto_id,
+                    'tipo': 'salida',
+                    'cantidad': cantidad,
+                    'fecha': ahora,
+                    'usuario': vendedor,
+                }
+                for producto_id, cantidad in requeridos.items()
+            ]
+            for lote in chunked(filas_movimiento, 100):
+                MovimientoStock.insert_many(lote).execute()
+
+            venta.stock_resultante = {pid: p.stock for pid, p in productos.items()}
+            categorias = {pid: p.categoria for pid, p in productos.items()}
+
+            self._acumular_resumenes(ahora.date(), vendedor, lineas, total, categorias)
+
+        cache_productos.invalidar(*requeridos)
+        alertas_stock.detectar(self._cambios_stock(deltas, productos))
+        return venta
+
+    @staticmethod
+    def _numero_venta(ahora):
+        """V + fecha y hora con microsegundos + secuencia del proceso: dos
+        ventas en el mismo instante (o el mismo segundo) no chocan."""
+        return f"V{ahora.strftime('%Y%m%d%H%M%S%f')}{next(_secuencia_ventas) % 100:02d}"
+
+    def _acumular_resumenes(self, dia, vendedor, lineas, total, categorias):
+        """Suma una venta a los resúmenes diarios con INSERT ... ON CONFLICT.
+
+        Corre dentro de la transacción de registrar_venta: si la venta se
+        revierte, los resúmenes también.
+        """
+        por_producto = {}
+        por_categoria = {}
+        for producto_id, cantidad, _, subtotal in lineas:
+            categoria = categorias.get(producto_id, 'Sin categoría')
+            for acumulado, clave in ((por_producto, producto_id), (por_categoria, categoria)):
+                unidades, importe = acumulado.get(clave, (0, Decimal('0')))
+                acumulado[clave] = (unidades + cantidad, importe + subtotal)
+
+        sumar_en_resumen(ResumenDiarioProducto, 'producto_id', [
+            {'fecha': dia, 'producto_id': producto_id, 'unidades': unidades, 'importe': importe}
+            for producto_id, (unidades, importe) in por_producto.items()
+        ], ('unidades', 'importe'))
+        sumar_en_resumen(ResumenDiarioCategoria, 'categoria', [
+            {'fecha': dia, 'categoria': categoria, 'unidades': unidades, 'importe': importe}
+            for categoria, (unidades, importe) in por_categoria.items()
+        ], ('unidades', 'importe'))
+        sumar_en_resumen(ResumenDiarioVendedor, 'vendedor', [
+            {'fecha': dia, 'vendedor': vendedor, 'ventas': 1, 'importe': total}
+        ], ('ventas', 'importe'))
+
+    @log_operacion
+    def actualizar_stock_lote(self, movimientos, usuario):
+        """Aplica muchos movimientos de stock de una vez, todos o ninguno.
+
+        `movimientos` son dicts con producto_id, cantidad y tipo ('entrada' o
+        'salida'). Los deltas se agrupan por producto y se aplican con un solo
+        UPDATE condicionado; si algún producto no existe o quedaría con stock
+        negativo se lanza StockInsuficiente y no se modifica nada.
+        """
+        if not movimientos:
+            raise ValueError("El lote no tiene movimientos")
+
+        deltas = {}
+        filas_movimiento = []
+        ahora = datetime.datetime.now()
+        for movimiento in movimientos:
+            producto_id = int(movimiento['producto_id'])
+            cantidad = int(movimiento['cantidad'])
+            tipo = movimiento.get('tipo', 'entrada')
+            if tipo not in ('entrada', 'salida'):
+                raise ValueError(f"Tipo de movimiento inválido: {tipo}")
+            if cantidad < 0:
+                raise ValueError("La cantidad no puede ser negativa")
+
+            signo = 1 if tipo == 'entrada' else -1
+            deltas[producto_id] = deltas.get(producto_id, 0) + signo * cantidad
+            filas_movimiento.append({
+                'producto': producto_id,
+                'tipo': tipo,
+                'cantidad': cantidad,
+                'fecha': ahora,
+                'usuario': usuario,
+            })
+
+        with db.atomic() as transaccion:
+            productos = self._aplicar_deltas(deltas, ahora, transaccion)
+            for lote in chunked(filas_movimiento, 100):
+                MovimientoStock.insert_many(lote).execute()
+
+        cache_productos.invalidar(*deltas)
+        alertas_stock.detectar(self._cambios_stock(deltas, productos))
+        return len(deltas)
+
+    def _aplicar_deltas(self, deltas, ahora, transaccion):
+        """Suma `deltas` {producto_id: delta} al stock con un UPDATE ... CASE.
+
+        El WHERE exige que ningún stock quede negativo. `transaccion` es el
+        db.atomic() que la envuelve: si no se actualizan todas las filas se
+        revierte y se lanza StockInsuficiente.
+
+        Devuelve {producto_id: Producto} con id, nombre, stock (ya
+        actualizado), stock_minimo y categoria de los productos tocados.
+        """
+        ids = list(deltas)
+        delta = Case(Producto.id, list(deltas.items()), 0)
+        actualizados = (Producto
+                        .update(stock=Producto.stock + delta,
+                                fecha_actualizacion=ahora)
+                        .where(Producto.id.in_(ids) &
+                               (Producto.stock + delta >= 0))
+                        .execute())
+
+        if actualizados != len(ids):
+            # Se revierte antes de leer para informar el stock real y no
+            # el ya modificado por las filas que sí alcanzaban.
+            transaccion.rollback()
+            raise StockInsuficiente(self._lineas_faltantes(deltas))
+
+        return {
+            p.id: p for p in
+            Producto.select(Producto.id, Producto.nombre, Producto.stock,
+                            Producto.stock_minimo, Producto.categoria)
+                    .where(Producto.id.in_(ids))
+        }
+
+    @staticmethod
+    def _cambios_stock(deltas, productos):
+        # Tuplas para alertas_stock.detectar: el stock previo es el actual
+        # menos el delta aplicado
+        return [
+            (pid, p.nombre, p.stock - deltas[pid] < p.stock_minimo, p.stock, p.stock_minimo)
+            for pid, p in productos.items()
+        ]
+
+    def _lineas_faltantes(self, deltas):
+        productos = {
+            p.id: p for p in
+            Producto.select(Producto.id, Producto.nombre, Producto.stock)
+                    .where(Producto.id.in_(list(deltas)))
+        }
+        faltantes = []
+        for producto_id, delta in deltas.items():
+            producto = productos.get(producto_id)
+            if producto is None:
+                faltantes.append({
+                    'producto_id': producto_id,
+                    'nombre': f"ID {producto_id}",
+                    'requerido': max(-delta, 0),
+                    'disponible': None,
+                })
+            elif producto.stock + delta < 0:
+                faltantes.append({
+                    'producto_id': producto_id,
+                    'nombre': producto.nombre,
+                    'requerido': -delta,
+                    'disponible': producto.stock,
+                })
+        return faltantes
+
+    @log_operacion
+    def importar_productos(self, source, formato=None, usuario='admin', tamanio_lote=500):
+        """Importa un catálogo CSV o JSONL sin cargarlo entero en memoria.
+
+        `source` es una ruta o un archivo de texto abierto. Cada producto se
+        busca por sku o, si no tiene o su sku no está en la base, por nombre
+        entre los productos sin sku (que toman el sku de la fila): si existe
+        se actualiza y si no se inserta. Los cambios de stock de productos
+        existentes quedan registrados como movimientos, y el stock inicial de
+        los nuevos como movimiento de apertura. Las filas inválidas se
+        informan en 'errores' sin cortar la importación; cada lote va en su
+        transacción.
+        """
+        resumen = {'insertados': 0, 'actualizados': 0, 'errores': []}
+
+        filas = self._validar_filas(self._leer_filas(source, formato), resumen['errores'])
+        for lote in chunked(filas, tamanio_lote):
+            try:
+                with db.atomic():
+                    insertados, actualizados, cambios = self._aplicar_lote_importacion(lote, usuario)
+            except Exception:
+                # Se reintenta fila por fila para aislar la que falla
+                insertados, actualizados, cambios = 0, [], []
+                for numero, datos in lote:
+                    try:
+                        with db.atomic():
+                            i, a, c = self._aplicar_lote_importacion([(numero, datos)], usuario)
+                        insertados += i
+                        actualizados += a
+                        cambios += c
+                    except Exception as ex:
+                        resumen['errores'].append({'fila': numero, 'error': str(ex)})
+            cache_productos.invalidar(*actualizados)
+            alertas_stock.detectar(cambios)
+            resumen['insertados'] += insertados
+            resumen['actualizados'] += len(actualizados)
+
+        return resumen
+
+    def _leer_filas(self, source, formato):
+        if formato is None:
+            nombre = source if isinstance(source, str) else getattr(source, 'name', '')
+            formato = 'jsonl' if str(nombre).lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+        archivo = open(source, 'r', encoding='utf-8-sig', newline='') if isinstance(source, str) else source
+        try:
+            if formato == 'csv':
+                # La fila 1 es el encabezado
+                for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+                    yield numero, fila
+            elif formato == 'jsonl':
+                for numero, linea in enumerate(archivo, start=1):
+                    if not linea.strip():
+                        continue
+                    try:
+                        yield numero, json.loads(linea)
+                    except json.JSONDecodeError as ex:
+                        yield numero, ex
+            else:
+                raise ValueError(f"Formato de importación no soportado: {formato}")
+        finally:
+            if isinstance(source, str):
+                archivo.close()
+
+    def _validar_filas(self, filas, errores):
+        for numero, fila in filas:
+            if isinstance(fila, Exception):
+                errores.append({'fila': numero, 'error': f"JSON inválido: {fila}"})
+                continue
+            if not isinstance(fila, dict):
+                errores.append({'fila': numero, 'error': "La fila no es un objeto"})
+                continue
+
+            nombre = str(fila.get('nombre') or '').strip()
+            if not nombre:
+                errores.append({'fila': numero, 'error': "El nombre es obligatorio"})
+                continue
+            try:
+                precio = Decimal(str(fila.get('precio', '')).strip())
+                stock = int(str(fila.get('stock') or 0).strip())
+                # Opcional: sin la columna se conserva el mínimo actual
+                minimo = str(fila.get('stock_minimo') or '').strip()
+                stock_minimo = int(minimo) if minimo else None
+            except (InvalidOperation, ValueError):
+                errores.append({'fila': numero, 'error': "Precio y stock deben ser numéricos"})
+                continue
+            if precio < 0 or stock < 0 or (stock_minimo or 0) < 0:
+                errores.append({'fila': numero, 'error': "Precio y stock no pueden ser negativos"})
+                continue
+
+            sku = str(fila.get('sku') or '').strip() or None
+            yield numero, {
+                'nombre': nombre,
+                'descripcion': str(fila.get('descripcion') or '').strip(),
+                'precio': precio,
+                'stock': stock,
+                'categoria': str(fila.get('categoria') or '').strip() or 'Otros',
+                'sku': sku,
+                'stock_minimo': stock_minimo,
+            }
+
+    def _aplicar_lote_importacion(self, lote, usuario):
+        # Dentro del lote gana la última aparición de cada sku/nombre
+        por_clave = {}
+        for _, datos in lote:
+            clave = ('sku', datos['sku']) if datos['sku'] else ('nombre', datos['nombre'])
+            por_clave[clave] = datos
+
+        skus = [valor for tipo, valor in por_clave if tipo == 'sku']
+        # Una fila con sku que todavía no está en la base puede ser un
+        # producto cargado a mano, sin sku: también se busca por nombre
+        nombres = [datos['nombre'] for datos in por_clave.values()]
+        condicion = Producto.sku.in_(skus) | (Producto.sku.is_null() & Producto.nombre.in_(nombres))
+        existentes = {}
+        for producto in Producto.select(Producto.id, Producto.nombre, Producto.sku,
+                                        Producto.stock, Producto.stock_minimo).where(condicion):
+            if producto.sku in skus:
+                existentes[('sku', producto.sku)] = producto
+            else:
+                existentes.setdefault(('nombre', producto.nombre), producto)
+
+        ahora = datetime.datetime.now()
+        nuevos = []
+        cambios = {}
+        movimientos = []
+        alertas = []
+        asignados = set()
+        for clave, datos in por_clave.items():
+            producto = existentes.get(clave)
+            if producto is None and clave[0] == 'sku':
+                # El sku se guarda en el producto encontrado por nombre
+                producto = existentes.get(('nombre', datos['nombre']))
+            if producto is not None and producto.id in asignados:
+                producto = None
+            if producto is None:
+                if datos['stock_minimo'] is None:
+                    datos = dict(datos, stock_minimo=STOCK_MINIMO_PREDETERMINADO)
+                nuevos.append(dict(datos, fecha_actualizacion=ahora))
+                continue
+            if datos['stock_minimo'] is None:
+                datos = dict(datos, stock_minimo=producto.stock_minimo)
+            if datos['sku'] is None:
+                datos = dict(datos, sku=producto.sku)
+            asignados.add(producto.id)
+            cambios[producto.id] = datos
+            alertas.append((producto.id, datos['nombre'], producto.stock < producto.stock_minimo,
+                            datos['stock'], datos['stock_minimo']))
+            diferencia = datos['stock'] - producto.stock
+            if diferencia:
+                movimientos.append({
+                    'producto': producto.id,
+                    'tipo': 'entrada' if diferencia > 0 else 'salida',
+                    'cantidad': abs(diferencia),
+                    'fecha': ahora,
+                    'usuario': usuario,
+                })
+
+        for filas in chunked(nuevos, 100):
+            Producto.insert_many(filas).execute()
+        if nuevos:
+            # Movimiento de apertura de cada producto nuevo; todavía no tienen
+            # id en memoria: se toman de la base por la fecha de este lote
+            apertura = (Producto
+                        .select(Producto.id, Value('entrada'), Producto.stock, Value(ahora), Value(usuario))
+                        .where((Producto.fecha_actualizacion == ahora) & (Producto.stock > 0) &
+                               Producto.id.not_in(list(cambios))))
+            MovimientoStock.insert_from(apertura, [MovimientoStock.producto, MovimientoStock.tipo,
+                                                   MovimientoStock.cantidad, MovimientoStock.fecha,
+                                                   MovimientoStock.usuario]).execute()
+
+        ids = list(cambios)
+        for parte in chunked(ids, 100):
+            columnas = {
+                campo: Case(Producto.id, [(pid, cambios[pid][campo]) for pid in parte])
+                for campo in ('nombre', 'descripcion', 'precio', 'stock', 'stock_minimo', 'categoria', 'sku')
+            }
+            columnas['fecha_actualizacion'] = ahora
+            Producto.update(**columnas).where(Producto.id.in_(parte)).execute()
+
+        for filas in chunked(movimientos, 100):
+            MovimientoStock.insert_many(filas).execute()
+
+        if any(datos['stock'] < datos['stock_minimo'] for datos in nuevos):
+            # Los productos nuevos todavía no tienen id: se buscan, entre los
+            # que quedaron bajo el mínimo, por la fecha de este lote
+            for producto in (Producto
+                             .select(Producto.id, Producto.nombre, Producto.stock, Producto.stock_minimo)
+                             .where((Producto.stock - Producto.stock_minimo < 0) &
+                                    (Producto.fecha_actualizacion == ahora) &
+                                    Producto.id.not_in(ids))):
+                alertas.append((producto.id, producto.nombre, False, producto.stock, producto.stock_minimo))
+
+        return len(nuevos), ids, alertas
+
+    @log_operacion
+    def actualizar_stock_minimo(self, producto_id, stock_minimo):
+        """Cambia el umbral de reposición; si el stock actual queda del otro
+        lado del nuevo mínimo se emite la alerta correspondiente."""
+        if stock_minimo < 0:
+            raise ValueError("El stock mínimo no puede ser negativo")
+        producto = Producto.get(Producto.id == producto_id)
+        estaba_bajo = producto.stock < producto.stock_minimo
+        producto.stock_minimo = stock_minimo
+        producto.fecha_actualizacion = datetime.datetime.now()
+        producto.save()
+        cache_productos.invalidar(producto.id)
+        alertas_stock.detectar([
+            (producto.id, producto.nombre, estaba_bajo, producto.stock, producto.stock_minimo)
+        ])
+        return producto
+
+    def productos_bajo_minimo(self, limite=50):
+        """Productos con stock por debajo de su mínimo, los más urgentes primero.
+
+        Filtra y ordena por stock - stock_minimo, la expresión del índice
+        producto_stock_bajo_minimo: solo se leen las filas que están bajo el
+        mínimo, sin recorrer el catálogo. Devuelve {'elementos', 'total'}.
+        """
+        diferencia = Producto.stock - Producto.stock_minimo
+        consulta = Producto.select().where(diferencia < 0)
+        return {
+            'elementos': list(consulta.order_by(diferencia, Producto.id).limit(limite)),
+            'total': consulta.count(),
+        }
+
     def eliminar_producto(self, producto_id):
         from peewee import DoesNotExist
         try:
@@ -83,6 +712,7 @@ class StockManager:
             producto = Producto.get_by_id(producto_id)
             
             producto.delete_instance(recursive=True)
+            cache_productos.invalidar(producto_id)
             
             return True
         except DoesNotExist:
@@ -91,8 +721,233 @@ class StockManager:
         except Exception as ex:
             
             raise ex
+    def obtener_producto(self, producto_id, exacto=False):
+        """Producto desde la cache; `exacto=True` lee la base y la refresca.
+
+        Lanza DoesNotExist si el producto no existe.
+        """
+        if exacto:
+            cache_productos.invalidar(producto_id)
+        return cache_productos.obtener(producto_id, Producto.get_by_id)
+
+    def obtener_productos(self, ids):
+        """Dict {id: Producto} con una sola consulta para los que no están en cache."""
+        def cargar(faltantes):
+            return {p.id: p for p in Producto.select().where(Producto.id.in_(faltantes))}
+        return cache_productos.obtener_varios(ids, cargar)
+
+    def ids_existentes(self, ids):
+        """Cuáles de `ids` siguen en la base (sin pasar por la cache)."""
+        existentes = set()
+        for lote in chunked(list(ids), 500):
+            existentes.update(Producto.select(Producto.id).where(Producto.id.in_(lote)).tuples().iterator())
+        return {producto_id for (producto_id,) in existentes}
+
+    def estadisticas_cache(self):
+        return cache_productos.estadisticas()
+
     def listar_productos(self):
         return Producto.select().order_by(Producto.nombre)
 
-    def buscar_producto(self, nombre):
-        return Producto.select().where(Producto.nombre.contains(nombre))
\ No newline at end of file
+    def paginar_productos(self, cursor=None, tamanio=50):
+        """Página de productos ordenada por (nombre, id) usando keyset.
+
+        `cursor` es el 'siguiente' de la página anterior (None para la
+        primera). Devuelve {'elementos', 'siguiente', 'total'}; 'siguiente'
+        es None en la última página.
+        """
+        consulta = Producto.select().order_by(Producto.nombre, Producto.id)
+        if cursor:
+            consulta = consulta.where(Tuple(Producto.nombre, Producto.id) > Tuple(*cursor))
+
+        elementos = list(consulta.limit(tamanio + 1))
+        siguiente = None
+        if len(elementos) > tamanio:
+            elementos = elementos[:tamanio]
+            siguiente = (elementos[-1].nombre, elementos[-1].id)
+
+        return {
+            'elementos': elementos,
+            'siguiente': siguiente,
+            'total': Producto.select().count(),
+        }
+
+    def productos_modificados_desde(self, fecha):
+        """Productos creados o modificados después de `fecha`.
+
+        Todas las escrituras de StockManager actualizan fecha_actualizacion,
+        así una pantalla que vuelve a mostrarse trae solo lo que cambió.
+        Devuelve {'elementos', 'total'} como paginar_productos.
+        """
+        return {
+            'elementos': list(Producto
+                              .select()
+                              .where(Producto.fecha_actualizacion > fecha)
+                              .order_by(Producto.nombre, Producto.id)),
+            'total': Producto.select().count(),
+        }
+
+    def buscar_producto(self, nombre, limite=20):
+        """Busca por nombre, descripción y categoría, ordenado por relevancia.
+
+        Cada palabra se busca como prefijo y sin distinguir acentos. Si la base
+        no tiene FTS5 se usa el LIKE sobre el nombre.
+        """
+        terminos = re.findall(r'\w+', nombre or '')
+        if not terminos:
+            return Producto.select().order_by(Producto.nombre).limit(limite)
+
+        if not self._busqueda_fts_disponible():
+            return (Producto
+                    .select()
+                    .where(Producto.nombre.contains(nombre))
+                    .order_by(Producto.nombre)
+                    .limit(limite))
+
+        consulta = ' '.join(f'"{termino}"*' for termino in terminos)
+        return (Producto
+                .select()
+                .join(ProductoBusqueda, on=(Producto.id == ProductoBusqueda.rowid))
+                .where(ProductoBusqueda.match(consulta))
+                # Pesos bm25: el nombre pesa más que la categoría y la descripción
+                .order_by(ProductoBusqueda.bm25(10.0, 1.0, 3.0), Producto.id)
+                .limit(limite))
+
+    def sugerir_productos(self, texto, limite=10):
+        """Sugerencias para la búsqueda mientras se escribe.
+
+        Primero el producto con ese ID (si el texto es un número), después los
+        SKU que empiezan con el texto y por último los resultados por nombre
+        de buscar_producto, sin repetir productos.
+        """
+        texto = (texto or '').strip()
+        if not texto:
+            return []
+
+        encontrados = {}
+        if texto.isdigit():
+            producto = Producto.get_or_none(Producto.id == int(texto))
+            if producto:
+                encontrados[producto.id] = producto
+
+        # Rango en lugar de LIKE para que use el índice único de sku
+        por_sku = (Producto
+                   .select()
+                   .where((Producto.sku >= texto) & (Producto.sku < texto + '\uffff'))
+                   .order_by(Producto.sku)
+                   .limit(limite))
+        for producto in por_sku:
+            encontrados.setdefault(producto.id, producto)
+
+        if len(encontrados) < limite:
+            for producto in self.buscar_producto(texto, limite):
+                encontrados.setdefault(producto.id, producto)
+
+        return list(encontrados.values())[:limite]
+
+    _fts_disponible = None
+
+    @classmethod
+    def _busqueda_fts_disponible(cls):
+        if cls._fts_disponible is None:
+            cls._fts_disponible = db.table_exists(ProductoBusqueda._meta.table_name)
+        return cls._fts_disponible
+
+
+class VentasManager:
+    def _filtrar(self, consulta, cliente=None, fecha=None):
+        if cliente:
+            consulta = consulta.where(Venta.cliente.contains(cliente))
+        if fecha:
+            consulta = consulta.where(
+                (Venta.fecha >= fecha) &
+                (Venta.fecha < fecha + datetime.timedelta(days=1))
+            )
+        return consulta
+
+    def paginar_ventas(self, cursor=None, tamanio=50, cliente=None, fecha=None):
+        """Página del historial, de la venta más reciente a la más antigua.
+
+        Keyset sobre (fecha, id) descendente: cada página cuesta lo mismo sin
+        importar cuántas ventas haya antes. `fecha` es un date para filtrar
+        un día. Devuelve {'elementos', 'siguiente', 'total'}.
+        """
+        consulta = self._filtrar(
+            Venta.select().order_by(Venta.fecha.desc(), Venta.id.desc()), cliente, fecha)
+        if cursor:
+            consulta = consulta.where(Tuple(Venta.fecha, Venta.id) < Tuple(*cursor))
+
+        elementos = list(consulta.limit(tamanio + 1))
+        siguiente = None
+        if len(elementos) > tamanio:
+            elementos = elementos[:tamanio]
+            siguiente = (elementos[-1].fecha, elementos[-1].id)
+
+        return {
+            'elementos': elementos,
+            'siguiente': siguiente,
+            'total': self._filtrar(Venta.select(), cliente, fecha).count(),
+        }
+
+    def _consulta_con_lineas(self):
+        # Una fila por línea con los datos de la venta repetidos; una venta
+        # sin líneas sale una vez con los campos de línea en None. El nombre
+        # llega por LEFT JOIN: es None si el producto ya no existe.
+        return (Venta
+                .select(Venta.id, Venta.numero_venta, Venta.fecha, Venta.cliente,
+                        Venta.vendedor, Venta.total,
+                        DetalleVenta.producto.alias('producto_id'),
+                        Producto.nombre.alias('producto'),
+                        DetalleVenta.cantidad, DetalleVenta.precio_unitario,
+                        DetalleVenta.subtotal)
+                .join(DetalleVenta, JOIN.LEFT_OUTER, on=(DetalleVenta.venta == Venta.id))
+                .join(Producto, JOIN.LEFT_OUTER, on=(DetalleVenta.producto == Producto.id)))
+
+    @staticmethod
+    def _agrupar_lineas(filas):
+        # Las filas de cada venta llegan consecutivas
+        for _, grupo in groupby(filas, key=lambda fila: fila.id):
+            grupo = list(grupo)
+            yield grupo[0], [fila for fila in grupo if fila.cantidad is not None]
+
+    def obtener_venta_con_lineas(self, venta_id):
+        """(venta, lineas) de una venta con una sola consulta.
+
+        `venta` y cada línea son namedtuples con numero_venta, fecha, cliente,
+        vendedor, total y producto_id, producto (None si fue eliminado),
+        cantidad, precio_unitario y subtotal. Lanza Venta.DoesNotExist si no
+        existe.
+        """
+        filas = (self._consulta_con_lineas()
+                 .where(Venta.id == venta_id)
+                 .order_by(DetalleVenta.id)
+                 .namedtuples())
+        for venta, lineas in self._agrupar_lineas(filas):
+            return venta, lineas
+        raise Venta.DoesNotExist(f"No existe la venta {venta_id}")
+
+    def ventas_con_lineas(self, desde=None, hasta=None, vendedor=None):
+        """Genera (venta, lineas) de la más reciente a la más antigua.
+
+        Es una sola consulta (la de obtener_venta_con_lineas sin filtrar por
+        id) recorrida con .iterator(): sirve para historiales grandes sin
+        cargarlos en memoria. `desde` y `hasta` son date inclusivos.
+        """
+        consulta = self._filtrar_periodo(
+            self._consulta_con_lineas().order_by(Venta.fecha.desc(), Venta.id.desc(), DetalleVenta.id),
+            desde, hasta, vendedor)
+        return self._agrupar_lineas(consulta.namedtuples().iterator())
+
+    def contar_ventas(self, desde=None, hasta=None, vendedor=None):
+        """Cantidad de ventas con los mismos filtros que ventas_con_lineas."""
+        return self._filtrar_periodo(Venta.select(), desde, hasta, vendedor).count()
+
+    def _filtrar_periodo(self, consulta, desde, hasta, vendedor):
+        if desde:
+            consulta = consulta.where(Venta.fecha >= datetime.datetime.combine(desde, datetime.time.min))
+        if hasta:
+            consulta = consulta.where(Venta.fecha < datetime.datetime.combine(
+                hasta + datetime.timedelta(days=1), datetime.time.min))
+        if vendedor:
+            consulta = consulta.where(Venta.vendedor == vendedor)
+        return consulta
@@ -1,5 +1,6 @@
 import datetime
-import os
+import time
+from services.logger.escritor_log import obtener_escritor
 
 class Sujeto:
     def __init__(self):
@@ -19,19 +20,20 @@ class Observador:
     def actualizar(self, sujeto, mensaje):
         raise NotImplementedError("Debe implementar este método")
 
+def linea_evento(mensaje, momento, tipo):
+    return (
+        f"Evento: {mensaje} | "
+        f"Fecha: {datetime.datetime.fromtimestamp(momento).strftime('%Y-%m-%d %H:%M:%S')} | "
+        f"Tipo: {tipo}\n"
+    )
+
+def registrar_evento(sujeto, mensaje):
+    """Encola el evento en log_usuarios.txt (escritor rotativo compartido)."""
+    obtener_escritor('log_usuarios.txt').escribir(linea_evento, mensaje, time.time(), type(sujeto).__name__)
+
 class LogObservador(Observador):
     def actualizar(self, sujeto, mensaje):
-        log_dir = os.path.join('services', 'logger')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        log_file_path = os.path.join(log_dir, 'log_usuarios.txt')
-        
-        with open(log_file_path, 'a', encoding='utf-8') as log_file:
-            log_file.write(
-                f"Evento: {mensaje} | "
-                f"Fecha: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
-                f"Tipo: {type(sujeto).__name__}\n"
-            )
+        registrar_evento(sujeto, mensaje)
 
 class ConsolaObservador(Observador):
     def actualizar(self, sujeto, mensaje):
@@ -0,0 +1,166 @@
+import argparse
+import datetime
+import heapq
+from decimal import Decimal
+from peewee import JOIN, fn
+from model.modelo import (db, Producto, Venta, DetalleVenta, ResumenDiarioProducto,
+                          ResumenDiarioCategoria, ResumenDiarioVendedor)
+
+
+class ResumenVentas:
+    """Reportes de ventas leídos solo de las tablas de resumen diario.
+
+    Las consultas recorren una fila por día y producto (o categoría, o
+    vendedor) en lugar de cada línea de venta, así que su costo depende del
+    rango de fechas y no de cuántas ventas haya.
+    """
+
+    @staticmethod
+    def _rango(modelo, desde, hasta):
+        return (modelo.fecha >= desde) & (modelo.fecha <= hasta)
+
+    def reconstruir(self, desde=None, hasta=None):
+        """Recalcula los resúmenes desde Venta y DetalleVenta.
+
+        Sin fechas reconstruye todo; con `desde`/`hasta` (date) solo esos
+        días. Las líneas de productos eliminados ya no existen (se borran en
+        cascada), por lo que un resumen reconstruido puede ser menor que el
+        acumulado en línea. La categoría es la actual del producto.
+        Devuelve la cantidad de filas escritas por tabla.
+        """
+        dia = fn.date(Venta.fecha)
+        condiciones = []
+        if desde:
+            condiciones.append(Venta.fecha >= datetime.datetime.combine(desde, datetime.time.min))
+        if hasta:
+            condiciones.append(Venta.fecha < datetime.datetime.combine(
+                hasta + datetime.timedelta(days=1), datetime.time.min))
+
+        def filtrar(consulta):
+            for condicion in condiciones:
+                consulta = consulta.where(condicion)
+            return consulta
+
+        por_producto = (DetalleVenta
+                        .select(dia, DetalleVenta.producto, fn.SUM(DetalleVenta.cantidad),
+                                fn.SUM(DetalleVenta.subtotal))
+                        .join(Venta)
+                        .group_by(dia, DetalleVenta.producto))
+
+        categoria = fn.COALESCE(Producto.categoria, 'Sin categoría')
+        por_categoria = (DetalleVenta
+                         .select(dia, categoria, fn.SUM(DetalleVenta.cantidad),
+                                 fn.SUM(DetalleVenta.subtotal))
+                         .join(Venta)
+                         .switch(DetalleVenta)
+                         .join(Producto, JOIN.LEFT_OUTER)
+                         .group_by(dia, categoria))
+
+        por_vendedor = (Venta
+                        .select(dia, Venta.vendedor, fn.COUNT(Venta.id), fn.SUM(Venta.total))
+                        .group_by(dia, Venta.vendedor))
+
+        destinos = [
+            (ResumenDiarioProducto, por_producto, ['fecha', 'producto_id', 'unidades', 'importe']),
+            (ResumenDiarioCategoria, por_categoria, ['fecha', 'categoria', 'unidades', 'importe']),
+            (ResumenDiarioVendedor, por_vendedor, ['fecha', 'vendedor', 'ventas', 'importe']),
+        ]
+
+        escritas = {}
+        with db.atomic():
+            for modelo, consulta, campos in destinos:
+                borrar = modelo.delete()
+                if desde:
+                    borrar = borrar.where(modelo.fecha >= desde)
+                if hasta:
+                    borrar = borrar.where(modelo.fecha <= hasta)
+                borrar.execute()
+
+                insertar = modelo.insert_from(filtrar(consulta), [getattr(modelo, c) for c in campos])
+                escritas[modelo._meta.table_name] = max(db.execute(insertar).rowcount, 0)
+        return escritas
+
+    def totales(self, desde, hasta):
+        fila = (ResumenDiarioVendedor
+                .select(fn.COALESCE(fn.SUM(ResumenDiarioVendedor.ventas), 0),
+                        fn.COALESCE(fn.SUM(ResumenDiarioVendedor.importe), 0))
+                .where(self._rango(ResumenDiarioVendedor, desde, hasta))
+                .tuples()
+                .get())
+        unidades = (ResumenDiarioCategoria
+                    .select(fn.COALESCE(fn.SUM(ResumenDiarioCategoria.unidades), 0))
+                    .where(self._rango(ResumenDiarioCategoria, desde, hasta))
+                    .scalar())
+        ventas, importe = fila
+        importe = Decimal(str(importe)).quantize(Decimal('0.01'))
+        return {
+            'ventas': ventas,
+            'importe': importe,
+            'unidades': unidades or 0,
+            'ticket_promedio': (importe / ventas).quantize(Decimal('0.01')) if ventas else Decimal('0.00'),
+        }
+
+    def por_dia(self, desde, hasta):
+        """[(fecha, ventas, importe)] de `hasta` hacia atrás."""
+        modelo = ResumenDiarioVendedor
+        return list(modelo
+                    .select(modelo.fecha, fn.SUM(modelo.ventas), fn.SUM(modelo.importe))
+                    .where(self._rango(modelo, desde, hasta))
+                    .group_by(modelo.fecha)
+                    .order_by(modelo.fecha.desc())
+                    .tuples())
+
+    def top_productos(self, desde, hasta, limite=10):
+        """[(producto_id, nombre, unidades, importe)] por importe vendido."""
+        modelo = ResumenDiarioProducto
+        sumas = (modelo
+                 .select(modelo.producto_id, fn.SUM(modelo.unidades), fn.SUM(modelo.importe))
+                 .where(self._rango(modelo, desde, hasta))
+                 .group_by(modelo.producto_id)
+                 .tuples())
+        top = heapq.nlargest(limite, sumas, key=lambda fila: fila[2])
+        # El nombre se busca solo para las filas del top
+        nombres = dict(Producto
+                       .select(Producto.id, Producto.nombre)
+                       .where(Producto.id.in_([producto_id for producto_id, _, _ in top]))
+                       .tuples())
+        return [
+            (producto_id, nombres.get(producto_id, 'Producto eliminado'), unidades, importe)
+            for producto_id, unidades, importe in top
+        ]
+
+    def por_categoria(self, desde, hasta):
+        """[(categoria, unidades, importe)] por importe vendido."""
+        modelo = ResumenDiarioCategoria
+        importe = fn.SUM(modelo.importe)
+        return list(modelo
+                    .select(modelo.categoria, fn.SUM(modelo.unidades), importe)
+                    .where(self._rango(modelo, desde, hasta))
+                    .group_by(modelo.categoria)
+                    .order_by(importe.desc())
+                    .tuples())
+
+    def por_vendedor(self, desde, hasta):
+        """[(vendedor, ventas, importe)] por importe vendido."""
+        modelo = ResumenDiarioVendedor
+        importe = fn.SUM(modelo.importe)
+        return list(modelo
+                    .select(modelo.vendedor, fn.SUM(modelo.ventas), importe)
+                    .where(self._rango(modelo, desde, hasta))
+                    .group_by(modelo.vendedor)
+                    .order_by(importe.desc())
+                    .tuples())
+
+
+if __name__ == "__main__":
+    from bootstrap import bootstrap
+
+    parser = argparse.ArgumentParser(description="Reconstruye los resúmenes diarios de ventas")
+    parser.add_argument('--desde', type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument('--hasta', type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    argumentos = parser.parse_args()
+
+    bootstrap()
+    escritas = ResumenVentas().reconstruir(argumentos.desde, argumentos.hasta)
+    for tabla, filas in escritas.items():
+        print(f"📊 {tabla}: {filas} filas")
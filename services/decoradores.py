@@ -1,42 +1,95 @@
 import datetime
 import os
+import time
 from functools import wraps
+from services.logger.escritor_log import obtener_escritor
+
+DEBUG = 10
+INFO = 20
+NIVELES = {'DEBUG': DEBUG, 'INFO': INFO}
+
+# Nivel del log de operaciones (DEBUG agrega las líneas de entrada/salida)
+# y cada cuántos segundos se baja el buffer a disco
+VAR_NIVEL = 'SISTEMA_GESTION_LOG_NIVEL'
+VAR_INTERVALO = 'SISTEMA_GESTION_LOG_INTERVALO'
+
+_config = {
+    'nivel': NIVELES.get(os.environ.get(VAR_NIVEL, 'INFO').upper(), INFO),
+    'intervalo': float(os.environ.get(VAR_INTERVALO, '1.0')),
+    'escritor': None,
+}
+
+
+def escritor_operaciones():
+    """EscritorLog compartido de log_stock.txt, creado con el primer registro."""
+    escritor = _config['escritor']
+    if escritor is None:
+        escritor = obtener_escritor('log_stock.txt', intervalo=_config['intervalo'])
+        _config['escritor'] = escritor
+    return escritor
+
+
+def configurar_log_operaciones(nivel=None, intervalo=None):
+    """Cambia el nivel ('DEBUG'/'INFO' o el número) o el intervalo de volcado."""
+    if nivel is not None:
+        _config['nivel'] = NIVELES[nivel.upper()] if isinstance(nivel, str) else nivel
+    if intervalo is not None:
+        _config['intervalo'] = intervalo
+        if _config['escritor'] is not None:
+            _config['escritor'].intervalo = intervalo
+
+
+def vaciar_log_operaciones(timeout=5.0):
+    if _config['escritor'] is None:
+        return True
+    return _config['escritor'].vaciar(timeout)
+
+
+# Las líneas se arman en el hilo escritor, no en el de la operación. Los
+# argumentos llegan ya convertidos con repr(): si se encolaran los objetos,
+# un cambio posterior (una lista de items que se vacía, un modelo que se
+# guarda) aparecería en el log en lugar del valor con que se llamó.
+
+def _linea_entrada(nombre_metodo, args, kwargs):
+    return f"[DEBUG] Entrando a {nombre_metodo} con args={args}, kwargs={kwargs}\n"
+
+
+def _linea_salida(nombre_metodo, resultado):
+    return f"[DEBUG] Saliendo de {nombre_metodo} ({resultado})\n"
+
+
+def _linea_operacion(nombre_metodo, momento, args, kwargs, error):
+    resultado = "Resultado: Éxito" if error is None else f"Error: {str(error)}"
+    return (
+        f"Operación: {nombre_metodo} | "
+        f"Fecha: {datetime.datetime.fromtimestamp(momento).strftime('%Y-%m-%d %H:%M:%S')} | "
+        f"Argumentos: {args} {kwargs} | "
+        f"{resultado}\n"
+    )
+
 
 def log_operacion(func):
+    nombre_metodo = func.__name__
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        log_dir = os.path.join('services', 'logger')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # Ruta del archivo de log
-        log_file_path = os.path.join(log_dir, 'log_stock.txt')
-        
-        instancia = args[0]
-        nombre_metodo = func.__name__
-        
-        with open(log_file_path, 'a', encoding='utf-8') as log_file:
-            log_file.write(f"[DEBUG] Entrando a {nombre_metodo} con args={args[1:]}, kwargs={kwargs}\n")
-        
+        escritor = escritor_operaciones()
+        debug = _config['nivel'] <= DEBUG
+        argumentos = repr(args[1:])
+        argumentos_nombrados = repr(kwargs)
+        if debug:
+            escritor.escribir(_linea_entrada, nombre_metodo, argumentos, argumentos_nombrados)
+
         try:
             resultado = func(*args, **kwargs)
-            with open(log_file_path, 'a', encoding='utf-8') as log_file:
-                log_file.write(
-                    f"Operación: {nombre_metodo} | "
-                    f"Fecha: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
-                    f"Argumentos: {args[1:]} {kwargs} | "
-                    f"Resultado: Éxito\n"
-                )
-            with open(log_file_path, 'a', encoding='utf-8') as log_file:
-                log_file.write(f"[DEBUG] Saliendo de {nombre_metodo} (éxito)\n")
-            return resultado
         except Exception as e:
-            with open(log_file_path, 'a', encoding='utf-8') as log_file:
-                log_file.write(
-                    f"Operación: {nombre_metodo} | "
-                    f"Fecha: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
-                    f"Argumentos: {args[1:]} {kwargs} | "
-                    f"Error: {str(e)}\n"
-                )
-                log_file.write(f"[DEBUG] Saliendo de {nombre_metodo} (error)\n")
+            escritor.escribir(_linea_operacion, nombre_metodo, time.time(), argumentos, argumentos_nombrados, e)
+            if debug:
+                escritor.escribir(_linea_salida, nombre_metodo, 'error')
             raise
-    return wrapper
\ No newline at end of file
+
+        escritor.escribir(_linea_operacion, nombre_metodo, time.time(), argumentos, argumentos_nombrados, None)
+        if debug:
+            escritor.escribir(_linea_salida, nombre_metodo, 'éxito')
+        return resultado
+    return wrapper
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from model.modelo import conexion_de_hilo
+
+
+class EjecutorTareas:
+    """Pool de hilos compartido para el trabajo bloqueante de las vistas.
+
+    Las vistas envían aquí las consultas, escrituras de log y envíos al
+    servidor de logs para no congelar la interfaz. Lleva métricas de
+    profundidad de cola y latencia; `saturado` indica que hay tantas tareas
+    esperando como hilos, es decir, que la caja va más rápido que la base.
+    """
+
+    def __init__(self, max_hilos=4, muestras=200):
+        self.max_hilos = max_hilos
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix='tareas')
+        self._lock = threading.Lock()
+        self._en_cola = 0
+        self._en_curso = 0
+        self._completadas = 0
+        self._fallidas = 0
+        # (espera en cola, duración total) en segundos de las últimas tareas
+        self._latencias = deque(maxlen=muestras)
+        self._suscriptores = []
+
+    def suscribir(self, funcion):
+        """`funcion(metricas)` se llama cada vez que cambia la cola."""
+        self._suscriptores.append(funcion)
+
+    def enviar(self, tarea, *args, al_terminar=None, al_fallar=None, **kwargs):
+        """Ejecuta `tarea(*args, **kwargs)` en el pool y devuelve el Future.
+
+        `al_terminar(resultado)` o `al_fallar(excepcion)` se llaman desde el
+        hilo de trabajo al finalizar.
+        """
+        encolada = time.perf_counter()
+        with self._lock:
+            self._en_cola += 1
+        self._avisar()
+        return self._pool.submit(self._correr, encolada, tarea, args, kwargs, al_terminar, al_fallar)
+
+    def _correr(self, encolada, tarea, args, kwargs, al_terminar, al_fallar):
+        inicio = time.perf_counter()
+        with self._lock:
+            self._en_cola -= 1
+            self._en_curso += 1
+
+        error = None
+        try:
+            # Con el perfil 'pool' la conexión vuelve al pool al terminar
+            with conexion_de_hilo():
+                resultado = tarea(*args, **kwargs)
+        except Exception as ex:
+            error = ex
+
+        with self._lock:
+            self._en_curso -= 1
+            if error is None:
+                self._completadas += 1
+            else:
+                self._fallidas += 1
+            self._latencias.append((inicio - encolada, time.perf_counter() - encolada))
+        self._avisar()
+
+        try:
+            if error is None:
+                if al_terminar:
+                    al_terminar(resultado)
+            elif al_fallar:
+                al_fallar(error)
+            else:
+                print(f"❌ Error en tarea {getattr(tarea, '__name__', tarea)}: {error}")
+        except Exception as ex:
+            print(f"❌ Error aplicando el resultado de la tarea: {ex}")
+
+        if error is not None:
+            raise error
+        return resultado
+
+    def _avisar(self):
+        if not self._suscriptores:
+            return
+        metricas = self.metricas()
+        for funcion in self._suscriptores:
+            try:
+                funcion(metricas)
+            except Exception as ex:
+                print(f"⚠️ Error notificando métricas: {ex}")
+
+    @staticmethod
+    def _percentil(valores, porcentaje):
+        if not valores:
+            return 0.0
+        ordenados = sorted(valores)
+        indice = min(len(ordenados) - 1, int(len(ordenados) * porcentaje))
+        return round(ordenados[indice] * 1000, 1)
+
+    def metricas(self):
+        with self._lock:
+            esperas = [espera for espera, _ in self._latencias]
+            totales = [total for _, total in self._latencias]
+            en_cola = self._en_cola
+            return {
+                'en_cola': en_cola,
+                'en_curso': self._en_curso,
+                'completadas': self._completadas,
+                'fallidas': self._fallidas,
+                'espera_p95_ms': self._percentil(esperas, 0.95),
+                'latencia_p50_ms': self._percentil(totales, 0.50),
+                'latencia_p95_ms': self._percentil(totales, 0.95),
+                'saturado': en_cola >= self.max_hilos,
+            }
+
+    def apagar(self, esperar=True):
+        self._pool.shutdown(wait=esperar)
@@ -0,0 +1,203 @@
+import datetime
+import itertools
+import os
+import threading
+import time
+from model.exportacion_ventas import ExportadorVentas, ExportacionCancelada, FORMATOS
+from services.ejecutor import EjecutorTareas
+
+# Carpeta donde quedan las exportaciones; por defecto ./exportaciones
+VAR_DIRECTORIO = 'SISTEMA_GESTION_EXPORTACIONES'
+DIRECTORIO_PREDETERMINADO = 'exportaciones'
+
+
+class TrabajoExportacion:
+    """Una exportación en segundo plano y su avance."""
+
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    TERMINADO = 'terminado'
+    CANCELADO = 'cancelado'
+    FALLIDO = 'fallido'
+
+    def __init__(self, trabajo_id, archivo, formato, desde=None, hasta=None, vendedor=None):
+        self.id = trabajo_id
+        self.archivo = archivo
+        self.formato = formato
+        self.desde = desde
+        self.hasta = hasta
+        self.vendedor = vendedor
+        self.estado = self.PENDIENTE
+        self.procesadas = 0
+        self.total = None
+        self.resumen = None
+        self.error = None
+        self.inicio = datetime.datetime.now()
+        self.fin = None
+        self._cancelar = threading.Event()
+
+    @property
+    def nombre(self):
+        return os.path.basename(self.archivo)
+
+    @property
+    def activo(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
+
+    @property
+    def progreso(self):
+        """Fracción de 0 a 1, o None mientras no se conoce el total."""
+        if self.estado == self.TERMINADO:
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.procesadas / self.total, 1.0)
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    def __str__(self):
+        if self.estado == self.TERMINADO:
+            if not self.resumen['ventas']:
+                return "No hay ventas para exportar"
+            return f"{self.resumen['ventas']} ventas exportadas"
+        if self.estado == self.CANCELADO:
+            return "Cancelada"
+        if self.estado == self.FALLIDO:
+            return f"Error: {self.error}"
+        if self.total is None:
+            return "En espera..."
+        return f"{self.procesadas} de {self.total} ventas"
+
+
+class GestorExportaciones:
+    """Corre las exportaciones de ventas fuera de la caja.
+
+    Tiene su propio pool de un hilo: una exportación de fin de mes no ocupa
+    los hilos de EjecutorTareas que usan las ventas, y varias exportaciones
+    pedidas juntas se hacen de a una. Cada trabajo informa las ventas
+    escritas con `al_avanzar(trabajo)` (como mucho cada `intervalo`
+    segundos) y se puede cancelar; al terminar, en cualquier estado, se
+    llama `al_terminar(trabajo)`. Los callbacks corren en el hilo del
+    trabajo.
+
+    Los archivos quedan en `directorio` y se conservan los `conservar` más
+    recientes; una exportación sin ventas no deja archivo.
+    """
+
+    def __init__(self, directorio=None, conservar=20, ventas_manager=None, intervalo=0.25):
+        self.directorio = directorio or os.environ.get(VAR_DIRECTORIO, DIRECTORIO_PREDETERMINADO)
+        self.conservar = conservar
+        self.intervalo = intervalo
+        self.exportador = ExportadorVentas(ventas_manager)
+        self.ejecutor = EjecutorTareas(max_hilos=1)
+        self.trabajos = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def iniciar(self, formato='txt', desde=None, hasta=None, vendedor=None,
+                al_avanzar=None, al_terminar=None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportación no soportado: {formato}")
+        os.makedirs(self.directorio, exist_ok=True)
+
+        with self._lock:
+            trabajo_id = next(self._ids)
+            marca = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            archivo = os.path.join(self.directorio, f"ventas_{marca}_{trabajo_id}.{formato}")
+            trabajo = TrabajoExportacion(trabajo_id, archivo, formato, desde, hasta, vendedor)
+            self.trabajos[trabajo_id] = trabajo
+
+        self.ejecutor.enviar(self._correr, trabajo, al_avanzar, al_terminar)
+        return trabajo
+
+    def cancelar(self, trabajo_id):
+        """Pide cancelar; el trabajo se detiene en el próximo aviso de avance."""
+        trabajo = self.trabajos.get(trabajo_id)
+        if trabajo is None or not trabajo.activo:
+            return False
+        trabajo.cancelar()
+        return True
+
+    def activos(self):
+        return [trabajo for trabajo in list(self.trabajos.values()) if trabajo.activo]
+
+    def _correr(self, trabajo, al_avanzar, al_terminar):
+        ultimo_aviso = 0.0
+
+        def avanzar(procesadas):
+            nonlocal ultimo_aviso
+            trabajo.procesadas = procesadas
+            ahora = time.monotonic()
+            if al_avanzar and ahora - ultimo_aviso >= self.intervalo:
+                ultimo_aviso = ahora
+                al_avanzar(trabajo)
+
+        try:
+            if trabajo.cancelado():
+                raise ExportacionCancelada()
+            trabajo.estado = TrabajoExportacion.EN_CURSO
+            trabajo.total = self.exportador.contar(trabajo.desde, trabajo.hasta, trabajo.vendedor)
+            if al_avanzar:
+                al_avanzar(trabajo)
+            resumen = self.exportador.exportar(
+                trabajo.archivo, trabajo.formato, trabajo.desde, trabajo.hasta, trabajo.vendedor,
+                al_avanzar=avanzar, cancelado=trabajo.cancelado)
+            if not resumen['ventas']:
+                os.remove(trabajo.archivo)
+            trabajo.resumen = resumen
+            trabajo.estado = TrabajoExportacion.TERMINADO
+            self.depurar()
+        except ExportacionCancelada:
+            trabajo.estado = TrabajoExportacion.CANCELADO
+        except Exception as ex:
+            trabajo.error = ex
+            trabajo.estado = TrabajoExportacion.FALLIDO
+            print(f"❌ Error exportando {trabajo.nombre}: {ex}")
+        finally:
+            trabajo.fin = datetime.datetime.now()
+
+        if al_terminar:
+            al_terminar(trabajo)
+        return trabajo
+
+    def archivos(self):
+        """Exportaciones guardadas, de la más reciente a la más antigua:
+        tuplas (nombre, ruta, tamaño en bytes, fecha de modificación)."""
+        if not os.path.isdir(self.directorio):
+            return []
+        encontrados = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                nombre = entrada.name
+                if not entrada.is_file() or not nombre.startswith('ventas_'):
+                    continue
+                if os.path.splitext(nombre)[1].lstrip('.') not in FORMATOS:
+                    continue
+                datos = entrada.stat()
+                encontrados.append((nombre, entrada.path, datos.st_size,
+                                    datetime.datetime.fromtimestamp(datos.st_mtime)))
+        encontrados.sort(key=lambda archivo: archivo[3], reverse=True)
+        return encontrados
+
+    def depurar(self):
+        """Borra las exportaciones más viejas que excedan `conservar`."""
+        if not self.conservar:
+            return []
+        borrados = []
+        for nombre, ruta, _, _ in self.archivos()[self.conservar:]:
+            try:
+                os.remove(ruta)
+                borrados.append(nombre)
+            except OSError as ex:
+                print(f"⚠️ No se pudo borrar la exportación {nombre}: {ex}")
+        return borrados
+
+    def apagar(self, esperar=True):
+        """Cancela lo pendiente y detiene el pool."""
+        for trabajo in self.activos():
+            trabajo.cancelar()
+        self.ejecutor.apagar(esperar)
@@ -1,28 +1,71 @@
 import socket
 import json
 import datetime
+import os
 import threading
 import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional
+from services.logger.protocolo import PREFIJO, LectorTramas, TramaInvalida, armar_trama, leer_trama
+
+# 'legacy' para hablar con un servidor de logs anterior al protocolo v1
+VAR_PROTOCOLO = 'SISTEMA_GESTION_LOG_PROTOCOLO'
 
 class ClienteLog:
-    def __init__(self, host='localhost', puerto=8888, nombre_cliente='Cliente-Stock'):
+    """Cliente del servidor de logs.
+    
+    Con protocolo 'v1' (por defecto) cada log viaja como una trama NDJSON
+    con id y `enviar_log` no espera la respuesta: hasta `ventana` tramas
+    pueden estar en vuelo y un hilo lector va recibiendo los acks
+    acumulativos del servidor. Lo no confirmado se reenvía al reconectar.
+    Con protocolo 'legacy' se usa el formato anterior (un JSON por envío y
+    una respuesta por cada uno), para servidores viejos.
+    
+    Un servidor viejo no confirma tramas v1: si lo primero que responde no
+    es una trama v1, o si la primera ventana se llena sin ningún ack, el
+    cliente se reconecta con el protocolo 'legacy' en lugar de bloquear
+    cada envío esperando confirmaciones.
+    """
+    
+    PROTOCOLOS = ('v1', 'legacy')
+    
+    def __init__(self, host='localhost', puerto=8888, nombre_cliente='Cliente-Stock', protocolo='v1', ventana=64):
+        if protocolo not in self.PROTOCOLOS:
+            raise ValueError(f"Protocolo no soportado: {protocolo}")
         self.host = host
         self.puerto = puerto
         self.nombre_cliente = nombre_cliente
+        self.protocolo = protocolo
+        self.ventana = ventana
         self.socket_cliente = None
         self.conectado = False
         self.auto_reconectar = True
         self.intervalo_heartbeat = 30
+        self.timeout_confirmacion = 5
+        
+        # Estado del protocolo v1
+        self._siguiente_id = 1
+        self._pendientes = OrderedDict()
+        self._confirmado = 0
+        self._ack_en_conexion = False
+        self._cond = threading.Condition()
+        self._lock_envio = threading.Lock()
     
     def conectar(self) -> bool:
         try:
             self.socket_cliente = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket_cliente.connect((self.host, self.puerto))
+            self._ack_en_conexion = False
             self.conectado = True
             
             print(f"🟢 Conectado al servidor de logs en {self.host}:{self.puerto}")
             
+            if self.protocolo == 'v1':
+                hilo_lector = threading.Thread(target=self._leer_confirmaciones, args=(self.socket_cliente,))
+                hilo_lector.daemon = True
+                hilo_lector.start()
+                self._reenviar_pendientes()
+            
             self.enviar_log({
                 "operacion": "CONEXION_INICIAL",
                 "usuario": "SISTEMA",
@@ -88,10 +131,13 @@ class ClienteLog:
             print("❌ No hay conexión con el servidor")
             return False
         
+        datos['timestamp'] = datetime.datetime.now().isoformat()
+        datos['cliente'] = self.nombre_cliente
+        
+        if self.protocolo == 'v1':
+            return self._enviar_trama(datos)
+        
         try:
-            datos['timestamp'] = datetime.datetime.now().isoformat()
-            datos['cliente'] = self.nombre_cliente
-            
             mensaje_json = json.dumps(datos, ensure_ascii=False)
             self.socket_cliente.send(mensaje_json.encode('utf-8'))
             
@@ -122,6 +168,9 @@ class ClienteLog:
             print("❌ No hay conexión con el servidor")
             return False
         
+        if self.protocolo == 'v1':
+            return self._enviar_trama(mensaje)
+        
         try:
             self.socket_cliente.send(mensaje.encode('utf-8'))
             respuesta = self.socket_cliente.recv(1024).decode('utf-8')
@@ -131,6 +180,128 @@ class ClienteLog:
             self.conectado = False
             return False
     
+    # --- protocolo v1 ---
+    
+    def _enviar_trama(self, datos) -> bool:
+        """Envía sin esperar el ack; solo se bloquea si la ventana está llena."""
+        try:
+            with self._lock_envio:
+                with self._cond:
+                    lleno = not self._cond.wait_for(
+                        lambda: len(self._pendientes) < self.ventana or not self.conectado,
+                        timeout=self.timeout_confirmacion)
+                    sin_acks = lleno and not self._ack_en_conexion
+                    if lleno and not sin_acks:
+                        print("⚠️ El servidor de logs no confirma los envíos")
+                        return False
+                    if not self.conectado:
+                        return False
+                    if not sin_acks:
+                        mensaje_id = self._siguiente_id
+                        self._siguiente_id += 1
+                        trama = armar_trama(id=mensaje_id, datos=datos)
+                        self._pendientes[mensaje_id] = trama
+                if not sin_acks:
+                    self.socket_cliente.sendall(trama)
+                    return True
+        except Exception as e:
+            print(f"❌ Error enviando log: {e}")
+            self.conectado = False
+            if self.auto_reconectar:
+                self._intentar_reconexion()
+            return False
+        
+        # Una ventana entera sin ningún ack: el servidor no habla v1
+        if self._pasar_a_legacy(self.socket_cliente):
+            return self.enviar_log(datos)
+        return False
+    
+    def _pasar_a_legacy(self, socket_cliente) -> bool:
+        """Reconecta con el protocolo anterior. Lo ya enviado no se reenvía:
+        el servidor lo recibió, solo que no lo confirma."""
+        with self._cond:
+            if socket_cliente is not self.socket_cliente or self.protocolo != 'v1':
+                return self.conectado
+            print("⚠️ El servidor de logs no confirma tramas v1: se usa el protocolo anterior")
+            self.protocolo = 'legacy'
+            self._pendientes.clear()
+            self.conectado = False
+            self._cond.notify_all()
+        with self._lock_envio:
+            try:
+                socket_cliente.close()
+            except OSError:
+                pass
+        return self.conectar()
+    
+    def _reenviar_pendientes(self):
+        with self._lock_envio:
+            with self._cond:
+                tramas = list(self._pendientes.values())
+            for trama in tramas:
+                self.socket_cliente.sendall(trama)
+        if tramas:
+            print(f"🔄 Reenviados {len(tramas)} logs sin confirmar")
+    
+    def _leer_confirmaciones(self, socket_cliente):
+        lector = LectorTramas()
+        # Lo primero que responde un servidor v1 es una trama; uno viejo
+        # contesta con su propio formato
+        inicio = b''
+        try:
+            while True:
+                datos = socket_cliente.recv(4096)
+                if not datos:
+                    break
+                if inicio is not None:
+                    inicio += datos
+                    if len(inicio) < len(PREFIJO) and PREFIJO.startswith(inicio):
+                        continue
+                    if not inicio.startswith(PREFIJO):
+                        self._pasar_a_legacy(socket_cliente)
+                        return
+                    datos, inicio = inicio, None
+                for linea in lector.alimentar(datos):
+                    try:
+                        trama = leer_trama(linea)
+                    except TramaInvalida as e:
+                        print(f"⚠️ Respuesta inválida del servidor: {e}")
+                        continue
+                    if 'ack' in trama:
+                        self._confirmar(int(trama['ack']))
+                    elif 'error' in trama:
+                        print(f"⚠️ Respuesta del servidor: {trama['error']}")
+        except (OSError, TramaInvalida):
+            pass
+        
+        # Si la conexión que se cayó sigue siendo la actual, hay que reconectar
+        if socket_cliente is self.socket_cliente and self.conectado:
+            print("🔴 El servidor de logs cerró la conexión")
+            self.conectado = False
+            with self._cond:
+                self._cond.notify_all()
+            if self.auto_reconectar:
+                self._intentar_reconexion()
+    
+    def _confirmar(self, ack):
+        with self._cond:
+            self._ack_en_conexion = True
+            self._confirmado = max(self._confirmado, ack)
+            while self._pendientes:
+                mensaje_id = next(iter(self._pendientes))
+                if mensaje_id > self._confirmado:
+                    break
+                del self._pendientes[mensaje_id]
+            self._cond.notify_all()
+    
+    def esperar_confirmacion(self, timeout=None) -> bool:
+        """Espera a que el servidor confirme todo lo enviado."""
+        if self.protocolo != 'v1':
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pendientes or not self.conectado,
+                                       timeout=timeout or self.timeout_confirmacion) and not self._pendientes
+    
     def log_operacion_stock(self, operacion: str, usuario: str, detalles: Dict[str, Any], nivel: str = "INFO"):
         return self.enviar_log({
             "operacion": f"STOCK_{operacion}",
@@ -179,6 +350,7 @@ class ClienteLog:
                 })
             except:
                 pass
+            self.esperar_confirmacion()
         
         self.conectado = False
         self.auto_reconectar = False
@@ -196,11 +368,13 @@ class LoggerCliente:
     def __new__(cls):
         if cls._instancia is None:
             cls._instancia = super(LoggerCliente, cls).__new__(cls)
-            cls._cliente_log = ClienteLog()
+            cls._cliente_log = ClienteLog(protocolo=os.environ.get(VAR_PROTOCOLO, 'v1'))
         return cls._instancia
     
     def conectar(self):
-        """Conectar al servidor de logs"""
+        """Conectar al servidor de logs (si ya hay conexión se reutiliza)"""
+        if self._cliente_log.conectado:
+            return True
         return self._cliente_log.conectar()
     
     def log_operacion_stock(self, operacion: str, usuario: str, detalles: Dict[str, Any], nivel: str = "INFO"):
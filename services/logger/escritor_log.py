@@ -0,0 +1,255 @@
+import atexit
+import datetime
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.logger.manifiesto_logs import DIRECTORIO_LOGS, ManifiestoLog, PoliticaRotacion
+
+_CERRAR = object()
+
+# Un solo hilo comprime los segmentos cerrados de todos los logs
+_compresor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-gzip')
+
+
+class EscritorLog:
+    """Escritura de un log en segundo plano.
+
+    `escribir(formatear, *datos)` solo encola: un hilo escritor toma los
+    registros por lotes, arma cada línea con `formatear(*datos)` y la escribe
+    en un archivo que queda abierto con buffer. El buffer se baja a disco
+    cada `intervalo` segundos, en `vaciar()` y al salir del programa, así el
+    costo para quien registra es un put en la cola y no un open/write/close.
+
+    Con una `politica` (PoliticaRotacion) el archivo rota por tamaño o
+    antigüedad: el activo se renombra como segmento, se comprime con gzip en
+    otro hilo y se aplica la retención. Todo queda anotado en el manifiesto
+    del log, que es lo que consulta obtener_tamaño_logs.
+    """
+
+    def __init__(self, ruta, intervalo=1.0, tamanio_lote=500, tamanio_buffer=64 * 1024, politica=None):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.tamanio_lote = tamanio_lote
+        self.tamanio_buffer = tamanio_buffer
+        self.politica = politica
+        self.manifiesto = None
+        self._cola = queue.SimpleQueue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._tamanio = 0
+        self.escritos = 0
+        self.errores = 0
+        self.rotaciones = 0
+
+    def escribir(self, formatear, *datos):
+        if self._hilo is None:
+            self._iniciar()
+        self._cola.put((formatear, datos))
+
+    def escribir_texto(self, texto):
+        self.escribir(str, texto)
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name=f"log-{os.path.basename(self.ruta)}",
+                                          daemon=True)
+            self._hilo.start()
+            atexit.register(self.cerrar)
+
+    def vaciar(self, timeout=5.0):
+        """Espera a que lo encolado hasta ahora quede escrito en disco."""
+        if self._hilo is None:
+            return True
+        listo = threading.Event()
+        self._cola.put((listo, None))
+        return listo.wait(timeout)
+
+    def cerrar(self, timeout=5.0):
+        hilo = self._hilo
+        if hilo is None or not hilo.is_alive():
+            return
+        self._cola.put((_CERRAR, None))
+        hilo.join(timeout)
+
+    def _abrir(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        try:
+            self._tamanio = os.path.getsize(self.ruta)
+        except OSError:
+            self._tamanio = 0
+        if self.politica is not None and self.manifiesto is None:
+            self.manifiesto = ManifiestoLog.cargar(self.ruta) or ManifiestoLog(self.ruta)
+            self.manifiesto.fijar_activo(self._tamanio)
+            self.manifiesto.guardar()
+            # Segmentos que quedaron sin comprimir en la ejecución anterior
+            for segmento in self.manifiesto.datos['segmentos']:
+                if not segmento['comprimido']:
+                    self._encolar_compresion(segmento['archivo'])
+        return open(self.ruta, 'a', encoding='utf-8', buffering=self.tamanio_buffer)
+
+    def _bucle(self):
+        archivo = self._abrir()
+        ultimo_volcado = time.monotonic()
+        try:
+            while True:
+                try:
+                    lote = [self._cola.get(timeout=self.intervalo)]
+                except queue.Empty:
+                    self._volcar(archivo)
+                    ultimo_volcado = time.monotonic()
+                    continue
+                while len(lote) < self.tamanio_lote:
+                    try:
+                        lote.append(self._cola.get_nowait())
+                    except queue.Empty:
+                        break
+
+                cerrar = False
+                for formatear, datos in lote:
+                    if formatear is _CERRAR:
+                        cerrar = True
+                    elif isinstance(formatear, threading.Event):
+                        self._volcar(archivo)
+                        formatear.set()
+                    else:
+                        try:
+                            linea = formatear(*datos)
+                            archivo.write(linea)
+                            self._tamanio += len(linea) if linea.isascii() else len(linea.encode('utf-8'))
+                            self.escritos += 1
+                        except Exception as ex:
+                            self.errores += 1
+                            print(f"⚠️ Error escribiendo en {self.ruta}: {ex}")
+                if cerrar:
+                    return
+                if self._debe_rotar():
+                    archivo = self._rotar(archivo)
+                    ultimo_volcado = time.monotonic()
+                elif time.monotonic() - ultimo_volcado >= self.intervalo:
+                    self._volcar(archivo)
+                    ultimo_volcado = time.monotonic()
+        finally:
+            self._volcar(archivo)
+            archivo.close()
+
+    def _volcar(self, archivo):
+        archivo.flush()
+        if self.manifiesto is not None and self.manifiesto.datos['activo']['bytes'] != self._tamanio:
+            self.manifiesto.fijar_activo(self._tamanio)
+            self._guardar_manifiesto()
+
+    def _guardar_manifiesto(self):
+        try:
+            self.manifiesto.guardar()
+        except OSError as ex:
+            print(f"⚠️ No se pudo guardar el manifiesto de {self.ruta}: {ex}")
+
+    # --- rotación ---
+
+    def _debe_rotar(self):
+        if self.politica is None or not self._tamanio:
+            return False
+        if self.politica.max_bytes and self._tamanio >= self.politica.max_bytes:
+            return True
+        if self.politica.max_segundos:
+            antiguedad = datetime.datetime.now() - self.manifiesto.inicio_activo
+            return antiguedad.total_seconds() >= self.politica.max_segundos
+        return False
+
+    def _rotar(self, archivo):
+        archivo.close()
+        fin = datetime.datetime.now()
+        base, extension = os.path.splitext(self.ruta)
+        segmento = f"{base}.{self.manifiesto.inicio_activo:%Y%m%d-%H%M%S}{extension}"
+        contador = 1
+        while os.path.exists(segmento) or os.path.exists(segmento + '.gz'):
+            segmento = f"{base}.{self.manifiesto.inicio_activo:%Y%m%d-%H%M%S}-{contador}{extension}"
+            contador += 1
+
+        os.replace(self.ruta, segmento)
+        nombre = os.path.basename(segmento)
+        self.manifiesto.agregar_segmento(nombre, self._tamanio, self.manifiesto.inicio_activo, fin)
+        self.manifiesto.fijar_activo(0, fin)
+        self._guardar_manifiesto()
+        self.rotaciones += 1
+        self._encolar_compresion(nombre)
+
+        self._tamanio = 0
+        return open(self.ruta, 'a', encoding='utf-8', buffering=self.tamanio_buffer)
+
+    def _encolar_compresion(self, nombre):
+        try:
+            _compresor.submit(self._comprimir, nombre)
+        except RuntimeError:
+            # El intérprete se está cerrando: se comprime en el próximo inicio
+            pass
+
+    def _comprimir(self, nombre):
+        directorio = os.path.dirname(self.ruta)
+        ruta = os.path.join(directorio, nombre)
+        try:
+            with open(ruta, 'rb') as origen, gzip.open(ruta + '.gz', 'wb') as destino:
+                shutil.copyfileobj(origen, destino)
+            os.remove(ruta)
+            self.manifiesto.segmento_comprimido(nombre, nombre + '.gz', os.path.getsize(ruta + '.gz'))
+        except FileNotFoundError:
+            # La retención lo borró antes de llegar a comprimirlo
+            pass
+        except OSError as ex:
+            print(f"⚠️ No se pudo comprimir {ruta}: {ex}")
+        aplicar_retencion(self.manifiesto, self.politica)
+
+
+def aplicar_retencion(manifiesto, politica):
+    """Borra los segmentos vencidos según `politica` y guarda el manifiesto."""
+    directorio = os.path.dirname(manifiesto.ruta_log)
+    borrados = []
+    for segmento in manifiesto.vencidos(politica):
+        try:
+            os.remove(os.path.join(directorio, segmento['archivo']))
+        except FileNotFoundError:
+            pass
+        except OSError as ex:
+            print(f"⚠️ No se pudo borrar el segmento {segmento['archivo']}: {ex}")
+            continue
+        borrados.append(segmento['archivo'])
+    if borrados:
+        manifiesto.quitar_segmentos(borrados)
+    try:
+        manifiesto.guardar()
+    except OSError as ex:
+        print(f"⚠️ No se pudo guardar el manifiesto de {manifiesto.ruta_log}: {ex}")
+    return borrados
+
+
+_escritores = {}
+_lock_escritores = threading.Lock()
+
+
+def obtener_escritor(nombre, intervalo=1.0):
+    """EscritorLog rotativo compartido de `nombre` dentro de DIRECTORIO_LOGS.
+
+    El decorador de operaciones, los observadores y ServidorLog piden el
+    suyo por nombre; hay uno solo por archivo y proceso.
+    """
+    escritor = _escritores.get(nombre)
+    if escritor is None:
+        with _lock_escritores:
+            escritor = _escritores.get(nombre)
+            if escritor is None:
+                escritor = EscritorLog(os.path.join(DIRECTORIO_LOGS, nombre), intervalo=intervalo,
+                                       politica=PoliticaRotacion.desde_entorno())
+                _escritores[nombre] = escritor
+    return escritor
+
+
+def escritores_activos():
+    return dict(_escritores)
@@ -1,22 +1,40 @@
 import datetime
+import threading
 from services.logger.cliente_log import LoggerCliente
+from model.observers.observador import registrar_evento
 
-class LogObservadorConServidor:
-    """Observador que escribe en archivo local Y envía al servidor de logs"""
+class ObservadorConServidor:
+    """Base de los observadores que envían al servidor de logs.
+    
+    La conexión no se abre al crear el observador (las vistas lo crean en
+    el hilo de la interfaz) sino con el primer evento, que llega desde el
+    hilo de trabajo que hizo la operación.
+    """
+    
+    aviso_sin_servidor = None
     
     def __init__(self):
         self.logger_cliente = LoggerCliente()
-        self.servidor_disponible = self.logger_cliente.conectar()
-        if not self.servidor_disponible:
-            print("⚠️ Servidor de logs no disponible, solo se guardará en archivo local")
+        self._servidor_disponible = None
+        self._lock_conexion = threading.Lock()
+    
+    @property
+    def servidor_disponible(self):
+        if self._servidor_disponible is None:
+            with self._lock_conexion:
+                if self._servidor_disponible is None:
+                    self._servidor_disponible = self.logger_cliente.conectar()
+                    if not self._servidor_disponible and self.aviso_sin_servidor:
+                        print(self.aviso_sin_servidor)
+        return self._servidor_disponible
+
+class LogObservadorConServidor(ObservadorConServidor):
+    """Observador que escribe en archivo local Y envía al servidor de logs"""
+    
+    aviso_sin_servidor = "⚠️ Servidor de logs no disponible, solo se guardará en archivo local"
     
     def actualizar(self, sujeto, mensaje):
-        with open('log_usuarios.txt', 'a', encoding='utf-8') as log_file:
-            log_file.write(
-                f"Evento: {mensaje} | "
-                f"Fecha: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
-                f"Tipo: {type(sujeto).__name__}\n"
-            )
+        registrar_evento(sujeto, mensaje)
         
         if self.servidor_disponible:
             try:
@@ -56,11 +74,7 @@ class LogObservadorConServidor:
             except Exception as e:
                 print(f"⚠️ Error enviando log al servidor: {e}")
 
-class ConsolaObservadorConServidor:
-    def __init__(self):
-        self.logger_cliente = LoggerCliente()
-        self.servidor_disponible = self.logger_cliente.conectar()
-    
+class ConsolaObservadorConServidor(ObservadorConServidor):
     def actualizar(self, sujeto, mensaje):
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
@@ -91,8 +105,8 @@ def log_venta_servidor(numero_venta, cliente, vendedor, total, productos):
                     "id": item.get('producto_id', 'N/A'),
                     "nombre": item.get('nombre', 'N/A'),
                     "cantidad": item.get('cantidad', 0),
-                    "precio_unitario": item.get('precio_unitario', 0),
-                    "subtotal": item.get('subtotal', 0)
+                    "precio_unitario": float(item.get('precio_unitario', 0)),
+                    "subtotal": float(item.get('subtotal', 0))
                 })
             
             logger.log_venta(
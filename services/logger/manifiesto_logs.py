@@ -0,0 +1,140 @@
+import datetime
+import json
+import os
+import threading
+
+DIRECTORIO_LOGS = os.path.join('services', 'logger')
+
+# Logs de la aplicación: los que reporta obtener_tamaño_logs
+LOGS = ('log_stock.txt', 'log_usuarios.txt', 'servidor_logs.txt')
+
+
+class PoliticaRotacion:
+    """Cuándo cerrar el archivo activo y cuántos segmentos guardar.
+
+    Se rota al superar `max_bytes` o `max_segundos` de antigüedad. De los
+    segmentos cerrados (comprimidos con gzip) se conservan los `conservar`
+    más nuevos y ninguno con más de `dias` días (None desactiva cada límite).
+    """
+
+    VAR_MAX_MB = 'SISTEMA_GESTION_LOG_MAX_MB'
+    VAR_CONSERVAR = 'SISTEMA_GESTION_LOG_SEGMENTOS'
+    VAR_DIAS = 'SISTEMA_GESTION_LOG_DIAS'
+
+    def __init__(self, max_bytes=5 * 1024 * 1024, max_segundos=24 * 3600, conservar=10, dias=30):
+        self.max_bytes = max_bytes
+        self.max_segundos = max_segundos
+        self.conservar = conservar
+        self.dias = dias
+
+    @classmethod
+    def desde_entorno(cls):
+        politica = cls()
+        if os.environ.get(cls.VAR_MAX_MB):
+            politica.max_bytes = int(float(os.environ[cls.VAR_MAX_MB]) * 1024 * 1024)
+        if os.environ.get(cls.VAR_CONSERVAR):
+            politica.conservar = int(os.environ[cls.VAR_CONSERVAR])
+        if os.environ.get(cls.VAR_DIAS):
+            politica.dias = int(os.environ[cls.VAR_DIAS])
+        return politica
+
+
+def _fecha(momento):
+    # Con microsegundos: varios segmentos pueden cerrarse en el mismo segundo
+    # y la retención los ordena por `fin`
+    return momento.isoformat(timespec='microseconds')
+
+
+class ManifiestoLog:
+    """Estado en disco de un log: archivo activo y segmentos cerrados.
+
+    Se guarda como `<log>.manifiesto.json` junto al log (uno por log, así
+    el servidor de logs y la aplicación no se pisan). Cada proceso es dueño
+    de los manifiestos de los logs que escribe; los demás solo los leen.
+    """
+
+    def __init__(self, ruta_log, datos=None):
+        self.ruta_log = ruta_log
+        self.ruta = os.path.splitext(ruta_log)[0] + '.manifiesto.json'
+        self._lock = threading.Lock()
+        self.datos = datos or {
+            'log': os.path.basename(ruta_log),
+            'activo': {'bytes': 0, 'inicio': _fecha(datetime.datetime.now())},
+            'segmentos': [],
+        }
+
+    @classmethod
+    def cargar(cls, ruta_log):
+        manifiesto = cls(ruta_log)
+        try:
+            with open(manifiesto.ruta, encoding='utf-8') as archivo:
+                manifiesto.datos = json.load(archivo)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as ex:
+            print(f"⚠️ Manifiesto de log ilegible {manifiesto.ruta}: {ex}")
+            return None
+        return manifiesto
+
+    def guardar(self):
+        # Lo guardan el hilo escritor y el compresor: el lock cubre también
+        # el temporal, que es uno solo por manifiesto
+        with self._lock:
+            temporal = self.ruta + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(self.datos, archivo, ensure_ascii=False, indent=1)
+            os.replace(temporal, self.ruta)
+
+    @property
+    def inicio_activo(self):
+        return datetime.datetime.fromisoformat(self.datos['activo']['inicio'])
+
+    def fijar_activo(self, tamanio, inicio=None):
+        with self._lock:
+            self.datos['activo']['bytes'] = tamanio
+            if inicio is not None:
+                self.datos['activo']['inicio'] = _fecha(inicio)
+
+    def agregar_segmento(self, archivo, tamanio, inicio, fin):
+        with self._lock:
+            self.datos['segmentos'].append({
+                'archivo': archivo,
+                'bytes': tamanio,
+                'inicio': _fecha(inicio),
+                'fin': _fecha(fin),
+                'comprimido': False,
+            })
+
+    def segmento_comprimido(self, archivo, archivo_gz, tamanio):
+        with self._lock:
+            for segmento in self.datos['segmentos']:
+                if segmento['archivo'] == archivo:
+                    segmento.update(archivo=archivo_gz, bytes=tamanio, comprimido=True)
+
+    def vencidos(self, politica, ahora=None):
+        """Segmentos que la política manda borrar (los más viejos primero)."""
+        ahora = ahora or datetime.datetime.now()
+        with self._lock:
+            # Por fecha y no por texto: los manifiestos viejos guardaban `fin`
+            # sin microsegundos; a igual fecha queda el orden de cierre
+            segmentos = sorted(self.datos['segmentos'], key=lambda s: datetime.datetime.fromisoformat(s['fin']))
+        sobrantes = len(segmentos) - politica.conservar if politica.conservar is not None else 0
+        limite = ahora - datetime.timedelta(days=politica.dias) if politica.dias is not None else None
+        vencidos = []
+        for indice, segmento in enumerate(segmentos):
+            if indice < sobrantes or (limite is not None and datetime.datetime.fromisoformat(segmento['fin']) < limite):
+                vencidos.append(segmento)
+        return vencidos
+
+    def quitar_segmentos(self, archivos):
+        archivos = set(archivos)
+        with self._lock:
+            self.datos['segmentos'] = [s for s in self.datos['segmentos'] if s['archivo'] not in archivos]
+
+    def archivos(self):
+        """{nombre: bytes} del activo y de cada segmento."""
+        with self._lock:
+            tamanios = {self.datos['log']: self.datos['activo']['bytes']}
+            for segmento in self.datos['segmentos']:
+                tamanios[segmento['archivo']] = segmento['bytes']
+        return tamanios
@@ -0,0 +1,63 @@
+import json
+
+# Protocolo v1 entre ClienteLog y ServidorLog: JSON delimitado por saltos de
+# línea (NDJSON). Cada trama del cliente es {"v": 1, "id": n, "datos": ...}
+# con ids crecientes; el servidor responde con acks acumulativos
+# {"v": 1, "ack": n} que confirman todas las tramas hasta n, así el cliente
+# puede enviar varias seguidas sin esperar una respuesta por cada una.
+# Los clientes anteriores mandan el JSON (o texto) sin marco y esperan una
+# respuesta por envío; el servidor los reconoce porque no empiezan con
+# PREFIJO.
+VERSION = 1
+PREFIJO = b'{"v":'
+TAMANIO_MAXIMO_TRAMA = 1024 * 1024
+
+
+class TramaInvalida(ValueError):
+    """Una línea que no es una trama v1 válida."""
+
+
+def armar_trama(**campos):
+    """Trama lista para enviar: `v` va primero, que es lo que reconoce el servidor."""
+    contenido = json.dumps({'v': VERSION, **campos}, ensure_ascii=False)
+    return (contenido + "\n").encode('utf-8')
+
+
+def leer_trama(linea):
+    try:
+        trama = json.loads(linea)
+    except ValueError as ex:
+        raise TramaInvalida(f"JSON inválido: {ex}") from ex
+    if not isinstance(trama, dict) or trama.get('v') != VERSION:
+        raise TramaInvalida(f"Versión de protocolo no soportada: {str(linea[:40])}")
+    return trama
+
+
+class LectorTramas:
+    """Arma líneas completas a partir de lo que llega del socket.
+
+    Un recv puede traer media trama, varias juntas o cortar un carácter
+    UTF-8 al medio: lo incompleto queda en el buffer hasta el próximo
+    `alimentar`, que devuelve solo las líneas terminadas (en bytes).
+    """
+
+    def __init__(self, tamanio_maximo=TAMANIO_MAXIMO_TRAMA):
+        self.buffer = bytearray()
+        self.tamanio_maximo = tamanio_maximo
+
+    def alimentar(self, datos):
+        self.buffer += datos
+        lineas = []
+        inicio = 0
+        while True:
+            fin = self.buffer.find(b'\n', inicio)
+            if fin < 0:
+                break
+            linea = bytes(self.buffer[inicio:fin]).strip()
+            if linea:
+                lineas.append(linea)
+            inicio = fin + 1
+        del self.buffer[:inicio]
+        if len(self.buffer) > self.tamanio_maximo:
+            raise TramaInvalida(f"Trama de más de {self.tamanio_maximo} bytes")
+        return lineas
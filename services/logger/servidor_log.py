@@ -1,88 +1,131 @@
 import socket
+import selectors
 import threading
 import json
 import datetime
 import os
+import time
+from collections import OrderedDict
 from typing import Dict, Any
+from services.logger.escritor_log import obtener_escritor
+from services.logger.protocolo import PREFIJO, LectorTramas, TramaInvalida, armar_trama, leer_trama
+
+TAMANIO_LECTURA = 64 * 1024
+
+class ConexionCliente:
+    """Estado de un cliente: protocolo detectado, tramas a medio llegar y,
+    en el modo selectors, lo que falta enviarle."""
+    
+    def __init__(self, socket_cliente, cliente_info):
+        self.socket = socket_cliente
+        self.info = cliente_info
+        self.salida = bytearray()
+        self.ultimo_uso = time.monotonic()
+        # None hasta ver los primeros bytes; después 'v1' o 'legacy'
+        self.protocolo = None
+        self.inicio = b''
+        self.lector = None
+        self.confirmado = 0
 
 class ServidorLog:
-    def __init__(self, host='localhost', puerto=8888):
+    """Servidor de logs por TCP.
+    
+    En el modo 'selectors' (por defecto) un solo hilo atiende a todos los
+    clientes con sockets no bloqueantes; en el modo 'hilos' se usa un hilo
+    por cliente, como antes. En ambos se cierran las conexiones sin
+    actividad durante `inactividad` segundos (None las deja abiertas) y
+    `backlog` es la cola de conexiones pendientes de listen().
+    """
+    
+    MODOS = ('selectors', 'hilos')
+    
+    def __init__(self, host='localhost', puerto=8888, modo='selectors', backlog=128, inactividad=120):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de servidor no soportado: {modo}")
         self.host = host
         self.puerto = puerto
+        self.modo = modo
+        self.backlog = backlog
+        self.inactividad = inactividad
         self.socket_servidor = None
+        self.selector = None
         self.ejecutando = False
         
-        log_dir = os.path.join('services', 'logger')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        self.archivo_log = os.path.join(log_dir, 'servidor_logs.txt')
+        # Archivo rotativo compartido: la escritura no bloquea a los clientes
+        self.log = obtener_escritor('servidor_logs.txt')
+        self.archivo_log = self.log.ruta
         self.clientes_conectados = []
+        # Modo selectors: conexiones de la menos a la más recientemente usada
+        self.conexiones = OrderedDict()
 
         if not os.path.exists(self.archivo_log):
-            with open(self.archivo_log, 'w', encoding='utf-8') as f:
-                f.write(f"=== SERVIDOR DE LOGS INICIADO ===\n")
-                f.write(f"Fecha de inicio: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 50 + "\n\n")
+            self.log.escribir_texto(
+                f"=== SERVIDOR DE LOGS INICIADO ===\n"
+                f"Fecha de inicio: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                + "=" * 50 + "\n\n"
+            )
 
     def iniciar_servidor(self):
         try:
             self.socket_servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket_servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket_servidor.bind((self.host, self.puerto))
-            self.socket_servidor.listen(5)
+            self.socket_servidor.listen(self.backlog)
             self.ejecutando = True
             
-            print(f"🟢 Servidor de logs iniciado en {self.host}:{self.puerto}")
-            self.escribir_log_servidor(f"Servidor iniciado en {self.host}:{self.puerto}")
+            print(f"🟢 Servidor de logs iniciado en {self.host}:{self.puerto} (modo {self.modo})")
+            self.escribir_log_servidor(f"Servidor iniciado en {self.host}:{self.puerto} (modo {self.modo})")
             
-            while self.ejecutando:
-                try:
-                    cliente_socket, direccion_cliente = self.socket_servidor.accept()
-                    print(f"🔵 Cliente conectado desde: {direccion_cliente}")
-                    self.escribir_log_servidor(f"Cliente conectado: {direccion_cliente}")
-                    
-                    hilo_cliente = threading.Thread(
-                        target=self.manejar_cliente, 
-                        args=(cliente_socket, direccion_cliente)
-                    )
-                    hilo_cliente.daemon = True
-                    hilo_cliente.start()
-                    
-                except socket.error as e:
-                    if self.ejecutando:
-                        print(f"❌ Error al aceptar conexión: {e}")
-                        self.escribir_log_servidor(f"Error al aceptar conexión: {e}")
+            if self.modo == 'hilos':
+                self._servir_con_hilos()
+            else:
+                self._servir_con_selectors()
                         
         except Exception as e:
             print(f"❌ Error al iniciar servidor: {e}")
             self.escribir_log_servidor(f"Error al iniciar servidor: {e}")
 
+    # --- modo hilos: un hilo por cliente ---
+
+    def _servir_con_hilos(self):
+        while self.ejecutando:
+            try:
+                cliente_socket, direccion_cliente = self.socket_servidor.accept()
+                print(f"🔵 Cliente conectado desde: {direccion_cliente}")
+                self.escribir_log_servidor(f"Cliente conectado: {direccion_cliente}")
+                
+                cliente_socket.settimeout(self.inactividad)
+                hilo_cliente = threading.Thread(
+                    target=self.manejar_cliente, 
+                    args=(cliente_socket, direccion_cliente)
+                )
+                hilo_cliente.daemon = True
+                hilo_cliente.start()
+                
+            except socket.error as e:
+                if self.ejecutando:
+                    print(f"❌ Error al aceptar conexión: {e}")
+                    self.escribir_log_servidor(f"Error al aceptar conexión: {e}")
+
     def manejar_cliente(self, cliente_socket, direccion_cliente):
         cliente_info = f"{direccion_cliente[0]}:{direccion_cliente[1]}"
+        conexion = ConexionCliente(cliente_socket, cliente_info)
         self.clientes_conectados.append(cliente_info)
+        motivo = "desconectado"
         
         try:
             while self.ejecutando:
-                datos = cliente_socket.recv(1024).decode('utf-8')
+                datos = cliente_socket.recv(TAMANIO_LECTURA)
                 
                 if not datos:
                     break
                 
-                try:
-                    mensaje_json = json.loads(datos)
-                    self.procesar_mensaje_cliente(mensaje_json, cliente_info)
-                    
-                    respuesta = {
-                        "status": "ok",
-                        "mensaje": "Log recibido correctamente",
-                        "timestamp": datetime.datetime.now().isoformat()
-                    }
-                    cliente_socket.send(json.dumps(respuesta).encode('utf-8'))
-                    
-                except json.JSONDecodeError:
-                    self.procesar_mensaje_texto(datos, cliente_info)
-                    cliente_socket.send(b"Mensaje recibido")
+                respuesta = self.procesar_entrada(conexion, datos)
+                if respuesta:
+                    cliente_socket.sendall(respuesta)
                 
+        except socket.timeout:
+            motivo = "desconectado por inactividad"
         except ConnectionResetError:
             print(f"🔴 Cliente {cliente_info} desconectado inesperadamente")
             self.escribir_log_servidor(f"Cliente {cliente_info} desconectado inesperadamente")
@@ -92,8 +135,189 @@ class ServidorLog:
         finally:
             self.clientes_conectados.remove(cliente_info)
             cliente_socket.close()
-            print(f"🔴 Cliente {cliente_info} desconectado")
-            self.escribir_log_servidor(f"Cliente {cliente_info} desconectado")
+            print(f"🔴 Cliente {cliente_info} {motivo}")
+            self.escribir_log_servidor(f"Cliente {cliente_info} {motivo}")
+
+    # --- modo selectors: todos los clientes en un hilo ---
+
+    def _servir_con_selectors(self):
+        self.selector = selectors.DefaultSelector()
+        self.socket_servidor.setblocking(False)
+        self.selector.register(self.socket_servidor, selectors.EVENT_READ)
+        try:
+            while self.ejecutando:
+                for clave, eventos in self.selector.select(timeout=1.0):
+                    if clave.data is None:
+                        self._aceptar()
+                        continue
+                    conexion = clave.data
+                    if eventos & selectors.EVENT_READ:
+                        self._leer(conexion)
+                    if eventos & selectors.EVENT_WRITE and conexion.info in self.conexiones:
+                        self._escribir(conexion)
+                self._cerrar_inactivas()
+        finally:
+            for conexion in list(self.conexiones.values()):
+                self._cerrar_conexion(conexion, "desconectado")
+            self.selector.close()
+            self.socket_servidor.close()
+
+    def _aceptar(self):
+        # Se aceptan todas las pendientes de una vez (hasta vaciar el backlog)
+        while True:
+            try:
+                cliente_socket, direccion_cliente = self.socket_servidor.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if self.ejecutando:
+                    print(f"❌ Error al aceptar conexión: {e}")
+                    self.escribir_log_servidor(f"Error al aceptar conexión: {e}")
+                return
+            
+            cliente_socket.setblocking(False)
+            cliente_info = f"{direccion_cliente[0]}:{direccion_cliente[1]}"
+            conexion = ConexionCliente(cliente_socket, cliente_info)
+            self.conexiones[cliente_info] = conexion
+            self.clientes_conectados.append(cliente_info)
+            self.selector.register(cliente_socket, selectors.EVENT_READ, conexion)
+            print(f"🔵 Cliente conectado desde: {direccion_cliente}")
+            self.escribir_log_servidor(f"Cliente conectado: {direccion_cliente}")
+
+    def _leer(self, conexion):
+        try:
+            datos = conexion.socket.recv(TAMANIO_LECTURA)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionResetError:
+            print(f"🔴 Cliente {conexion.info} desconectado inesperadamente")
+            self.escribir_log_servidor(f"Cliente {conexion.info} desconectado inesperadamente")
+            self._cerrar_conexion(conexion, "desconectado")
+            return
+        except OSError as e:
+            self._fallo_conexion(conexion, e)
+            return
+        
+        if not datos:
+            self._cerrar_conexion(conexion, "desconectado")
+            return
+        
+        conexion.ultimo_uso = time.monotonic()
+        self.conexiones.move_to_end(conexion.info)
+        try:
+            respuesta = self.procesar_entrada(conexion, datos)
+        except Exception as e:
+            self._fallo_conexion(conexion, e)
+            return
+        conexion.salida += respuesta
+        self._escribir(conexion)
+
+    def _escribir(self, conexion):
+        if conexion.salida:
+            try:
+                enviados = conexion.socket.send(conexion.salida)
+                del conexion.salida[:enviados]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError as e:
+                self._fallo_conexion(conexion, e)
+                return
+        # Se escucha EVENT_WRITE solo mientras quede algo por enviar
+        eventos = selectors.EVENT_READ | (selectors.EVENT_WRITE if conexion.salida else 0)
+        if self.selector.get_key(conexion.socket).events != eventos:
+            self.selector.modify(conexion.socket, eventos, conexion)
+
+    def _fallo_conexion(self, conexion, error):
+        print(f"❌ Error manejando cliente {conexion.info}: {error}")
+        self.escribir_log_servidor(f"Error manejando cliente {conexion.info}: {error}")
+        self._cerrar_conexion(conexion, "desconectado")
+
+    def _cerrar_inactivas(self):
+        if not self.inactividad:
+            return
+        limite = time.monotonic() - self.inactividad
+        while self.conexiones:
+            conexion = next(iter(self.conexiones.values()))
+            if conexion.ultimo_uso > limite:
+                break
+            self._cerrar_conexion(conexion, "desconectado por inactividad")
+
+    def _cerrar_conexion(self, conexion, motivo):
+        if self.conexiones.pop(conexion.info, None) is None:
+            return
+        self.clientes_conectados.remove(conexion.info)
+        try:
+            self.selector.unregister(conexion.socket)
+        except (KeyError, ValueError):
+            pass
+        conexion.socket.close()
+        print(f"🔴 Cliente {conexion.info} {motivo}")
+        self.escribir_log_servidor(f"Cliente {conexion.info} {motivo}")
+
+    # --- mensajes ---
+
+    def procesar_entrada(self, conexion: ConexionCliente, datos: bytes) -> bytes:
+        """Registra lo recibido y devuelve lo que hay que responder (b'' si
+        todavía no llegó una trama completa)."""
+        if conexion.protocolo is None:
+            recibido = conexion.inicio + datos
+            if len(recibido) < len(PREFIJO) and PREFIJO.startswith(recibido):
+                conexion.inicio = recibido
+                return b''
+            conexion.inicio = b''
+            if recibido.startswith(PREFIJO):
+                conexion.protocolo = 'v1'
+                conexion.lector = LectorTramas()
+            else:
+                conexion.protocolo = 'legacy'
+            datos = recibido
+        
+        if conexion.protocolo == 'legacy':
+            return self.procesar_datos(datos, conexion.info)
+        return self.procesar_tramas(conexion, conexion.lector.alimentar(datos))
+
+    def procesar_tramas(self, conexion: ConexionCliente, lineas) -> bytes:
+        """Protocolo v1: procesa las tramas completas y responde con un solo
+        ack acumulativo por lectura."""
+        respuestas = []
+        confirmar = False
+        for linea in lineas:
+            try:
+                trama = leer_trama(linea)
+                mensaje_id = int(trama['id'])
+            except (TramaInvalida, KeyError, TypeError, ValueError) as e:
+                self.escribir_log_servidor(f"Trama inválida de {conexion.info}: {e}")
+                respuestas.append(armar_trama(error=str(e)))
+                continue
+            
+            datos = trama.get('datos')
+            if isinstance(datos, dict):
+                self.procesar_mensaje_cliente(datos, conexion.info)
+            else:
+                self.procesar_mensaje_texto(str(datos), conexion.info)
+            conexion.confirmado = max(conexion.confirmado, mensaje_id)
+            confirmar = True
+        
+        if confirmar:
+            respuestas.append(armar_trama(ack=conexion.confirmado))
+        return b''.join(respuestas)
+
+    def procesar_datos(self, datos: bytes, cliente_info: str) -> bytes:
+        """Clientes sin marco: cada lectura es un mensaje y lleva su respuesta."""
+        texto = datos.decode('utf-8')
+        try:
+            mensaje_json = json.loads(texto)
+        except json.JSONDecodeError:
+            self.procesar_mensaje_texto(texto, cliente_info)
+            return b"Mensaje recibido"
+        
+        self.procesar_mensaje_cliente(mensaje_json, cliente_info)
+        respuesta = {
+            "status": "ok",
+            "mensaje": "Log recibido correctamente",
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+        return json.dumps(respuesta).encode('utf-8')
 
     def procesar_mensaje_cliente(self, mensaje: Dict[str, Any], cliente_info: str):
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -116,8 +340,7 @@ class ServidorLog:
         
         entrada_log += "-" * 60 + "\n"
         
-        with open(self.archivo_log, 'a', encoding='utf-8') as f:
-            f.write(entrada_log)
+        self.log.escribir_texto(entrada_log)
         
         print(f"📝 Log recibido de {cliente_info}: {tipo_operacion}")
 
@@ -130,8 +353,7 @@ class ServidorLog:
             f"{'-' * 60}\n"
         )
         
-        with open(self.archivo_log, 'a', encoding='utf-8') as f:
-            f.write(entrada_log)
+        self.log.escribir_texto(entrada_log)
         
         print(f"📝 Mensaje texto de {cliente_info}: {mensaje.strip()[:50]}...")
 
@@ -139,8 +361,7 @@ class ServidorLog:
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         entrada_log = f"[{timestamp}] [SERVIDOR] {mensaje}\n"
         
-        with open(self.archivo_log, 'a', encoding='utf-8') as f:
-            f.write(entrada_log)
+        self.log.escribir_texto(entrada_log)
 
     def obtener_estadisticas(self):
         return {
@@ -155,13 +376,32 @@ class ServidorLog:
         self.escribir_log_servidor("Servidor detenido por el usuario")
         self.ejecutando = False
         
-        if self.socket_servidor:
+        # En modo selectors el propio bucle cierra el socket al salir del select
+        if self.socket_servidor and self.modo == 'hilos':
             self.socket_servidor.close()
         
+        self.log.vaciar()
         print("🔴 Servidor detenido")
 
 def main():
-    servidor = ServidorLog()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Servidor de logs")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--puerto', type=int, default=8888)
+    parser.add_argument('--hilos', action='store_true', help="Un hilo por cliente (modo anterior)")
+    parser.add_argument('--backlog', type=int, default=128, help="Conexiones pendientes de aceptar")
+    parser.add_argument('--inactividad', type=float, default=120,
+                        help="Segundos sin actividad antes de cerrar una conexión (0 = nunca)")
+    argumentos = parser.parse_args()
+    
+    servidor = ServidorLog(
+        argumentos.host,
+        argumentos.puerto,
+        modo='hilos' if argumentos.hilos else 'selectors',
+        backlog=argumentos.backlog,
+        inactividad=argumentos.inactividad or None,
+    )
     
     try:
         hilo_servidor = threading.Thread(target=servidor.iniciar_servidor)
@@ -197,6 +437,7 @@ def main():
                     print(f"  • {cliente}")
             elif comando == 'log':
                 try:
+                    servidor.log.vaciar()
                     with open(servidor.archivo_log, 'r', encoding='utf-8') as f:
                         lineas = f.readlines()
                         print(f"\n📋 ÚLTIMAS 10 ENTRADAS DEL LOG:")
@@ -1,5 +1,7 @@
 import os
 import datetime
+from services.logger.escritor_log import aplicar_retencion, escritores_activos
+from services.logger.manifiesto_logs import DIRECTORIO_LOGS, LOGS, ManifiestoLog, PoliticaRotacion
 
 def crear_directorio_logs():
     log_dir = os.path.join('services', 'logger')
@@ -10,23 +12,28 @@ def obtener_ruta_log(nombre_archivo):
     log_dir = crear_directorio_logs()
     return os.path.join(log_dir, nombre_archivo)
 
+def _manifiesto(nombre):
+    """Manifiesto vivo si este proceso escribe el log, si no el guardado."""
+    escritor = escritores_activos().get(nombre)
+    if escritor is not None and escritor.manifiesto is not None:
+        return escritor.manifiesto
+    return ManifiestoLog.cargar(obtener_ruta_log(nombre))
+
 def limpiar_logs_antiguos(dias_antiguedad=30):
-    import datetime
-    import glob
-    
-    log_dir = crear_directorio_logs()
-    patron_logs = os.path.join(log_dir, '*.txt')
-    
-    fecha_limite = datetime.datetime.now() - datetime.timedelta(days=dias_antiguedad)
-    
-    for archivo_log in glob.glob(patron_logs):
-        try:
-            fecha_modificacion = datetime.datetime.fromtimestamp(os.path.getmtime(archivo_log))
-            if fecha_modificacion < fecha_limite:
-                os.remove(archivo_log)
-                print(f"📁 Archivo de log eliminado: {archivo_log}")
-        except Exception as e:
-            print(f"⚠️ Error eliminando archivo {archivo_log}: {e}")
+    """Borra los segmentos rotados con más de `dias_antiguedad` días.
+
+    Los archivos activos no se tocan; la retención sale de los manifiestos.
+    """
+    politica = PoliticaRotacion(conservar=None, dias=dias_antiguedad)
+    borrados = []
+    for nombre in LOGS:
+        manifiesto = _manifiesto(nombre)
+        if manifiesto is None:
+            continue
+        for archivo in aplicar_retencion(manifiesto, politica):
+            print(f"📁 Archivo de log eliminado: {archivo}")
+            borrados.append(archivo)
+    return borrados
 
 def listar_archivos_log():
     import glob
@@ -37,28 +44,35 @@ def listar_archivos_log():
     return glob.glob(patron_logs)
 
 def obtener_tamaño_logs():
-    archivos = listar_archivos_log()
+    """Tamaños de los logs y sus segmentos según los manifiestos, sin
+    recorrer el directorio."""
     tamaño_total = 0
     info_archivos = {}
     
-    for archivo in archivos:
-        try:
-            tamaño = os.path.getsize(archivo)
+    for nombre in LOGS:
+        manifiesto = _manifiesto(nombre)
+        if manifiesto is not None:
+            tamaños = manifiesto.archivos()
+        else:
+            # Log que todavía no pasó por el escritor rotativo
+            try:
+                tamaños = {nombre: os.path.getsize(obtener_ruta_log(nombre))}
+            except OSError:
+                continue
+        
+        for nombre_archivo, tamaño in tamaños.items():
             tamaño_total += tamaño
-            nombre_archivo = os.path.basename(archivo)
             info_archivos[nombre_archivo] = {
                 'tamaño_bytes': tamaño,
                 'tamaño_kb': round(tamaño / 1024, 2),
-                'ruta': archivo
+                'ruta': os.path.join(DIRECTORIO_LOGS, nombre_archivo)
             }
-        except Exception as e:
-            print(f"⚠️ Error obteniendo tamaño de {archivo}: {e}")
     
     return {
         'tamaño_total_bytes': tamaño_total,
         'tamaño_total_kb': round(tamaño_total / 1024, 2),
         'tamaño_total_mb': round(tamaño_total / (1024 * 1024), 2),
-        'cantidad_archivos': len(archivos),
+        'cantidad_archivos': len(info_archivos),
         'archivos': info_archivos
     }
 
@@ -68,9 +82,7 @@ def inicializar_sistema_logs():
     log_dir = crear_directorio_logs()
     print(f"📁 Directorio de logs: {log_dir}")
     
-    archivos_base = ['log_stock.txt', 'log_usuarios.txt', 'servidor_logs.txt']
-    
-    for archivo in archivos_base:
+    for archivo in LOGS:
         ruta_archivo = obtener_ruta_log(archivo)
         if not os.path.exists(ruta_archivo):
             with open(ruta_archivo, 'w', encoding='utf-8') as f:
@@ -0,0 +1,21 @@
+import pytest
+from model.configuracion_db import ConfiguracionDB
+from model.modelo import db, inicializar_base_datos
+
+
+@pytest.fixture(autouse=True, scope='session')
+def directorio_trabajo(tmp_path_factory):
+    """Los logs se escriben relativos al directorio actual: que no toquen
+    los del repositorio."""
+    anterior = pytest.MonkeyPatch()
+    anterior.chdir(tmp_path_factory.mktemp('trabajo'))
+    yield
+    anterior.undo()
+
+
+@pytest.fixture
+def base(tmp_path):
+    """Base nueva por test, con el perfil por defecto."""
+    inicializar_base_datos(ConfiguracionDB(ruta=str(tmp_path / 'stock.db')))
+    yield db
+    db.close()
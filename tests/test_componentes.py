@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import flet as ft
+from model.modelo import StockManager
+from services.ejecutor import EjecutorTareas
+from view.componentes import ListaProductos, TareasVista, en_interfaz
+
+
+def crear_lista(gestor):
+    return ListaProductos(
+        gestor,
+        lambda producto: ft.Text(producto.nombre),
+        lambda card, producto: setattr(card, 'value', producto.nombre),
+    )
+
+
+def test_sincronizar_quita_los_productos_eliminados_en_otra_pantalla(base):
+    gestor = StockManager()
+    productos = [gestor.agregar_producto(f"Producto {i}", "", "1.00", 10, "General") for i in range(3)]
+    lista = crear_lista(gestor)
+    lista.cargar()
+
+    # Otra vista (Gestión de Stock) borra uno mientras esta está oculta
+    StockManager().eliminar_producto(productos[1].id)
+    lista.sincronizar()
+
+    assert set(lista.cards) == {productos[0].id, productos[2].id}
+    assert productos[1].id not in lista.productos
+    assert lista.total == 2
+    assert [c.value for c in lista.vista.controls] == ["Producto 0", "Producto 2"]
+
+
+def test_sincronizar_aplica_altas_y_cambios(base):
+    gestor = StockManager()
+    producto = gestor.agregar_producto("Arroz", "", "1.00", 10, "General")
+    lista = crear_lista(gestor)
+    lista.cargar()
+
+    gestor.actualizar_stock(producto.id, 4, "admin")
+    nuevo = gestor.agregar_producto("Azúcar", "", "1.00", 10, "General")
+    lista.sincronizar()
+
+    assert lista.productos[producto.id].stock == 14
+    assert nuevo.id in lista.cards
+    assert lista.total == 2
+
+
+def test_cambios_desde_varios_hilos_mantienen_el_orden(base):
+    gestor = StockManager()
+    productos = [gestor.agregar_producto(f"Producto {i:02d}", "", "1.00", 10, "General") for i in range(40)]
+    lista = crear_lista(gestor)
+    lista.cargar()
+
+    def renombrar(producto):
+        producto.nombre = f"Renombrado {49 - producto.id:02d}"
+        lista.actualizar(producto)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(renombrar, productos))
+
+    nombres = [c.value for c in lista.vista.controls]
+    assert nombres == sorted(nombres)
+    assert len(nombres) == 40
+
+
+def test_altas_bajas_y_renombres_entre_paginas_mantienen_el_orden(base):
+    gestor = StockManager()
+    productos = [gestor.agregar_producto(f"M{i}", "", "1.00", 10, "General") for i in range(8)]
+    lista = ListaProductos(gestor, lambda p: ft.Text(p.nombre),
+                           lambda card, p: setattr(card, 'value', p.nombre), tamanio_pagina=4)
+    lista.cargar()
+
+    lista.actualizar(gestor.agregar_producto("A", "", "1.00", 10, "General"))
+    # Después de la página cargada: aparece recién al cargar más
+    lista.actualizar(gestor.agregar_producto("Z", "", "1.00", 10, "General"))
+    productos[0].nombre = "M2b"
+    lista.actualizar(productos[0])
+    lista.quitar(productos[1].id)
+
+    cards = [c.value for c in lista.vista.controls if c in lista.cards.values()]
+    assert cards == ["A", "M2", "M2b", "M3"]
+    assert lista.vista.controls[-1] is lista.boton_mas
+    assert lista.orden == sorted(lista.claves.values())
+
+    lista.cargar_mas()
+    lista.cargar_mas()
+    assert [c.value for c in lista.vista.controls] == ["A", "M2", "M2b", "M3", "M4", "M5", "M6", "M7", "Z"]
+    assert lista.orden == sorted(lista.claves.values())
+
+
+class PaginaFalsa:
+    def __init__(self):
+        self.hilos = []
+
+    def update(self):
+        self.hilos.append(threading.current_thread().name)
+
+
+def test_con_tareas_los_resultados_se_aplican_en_el_hilo_de_la_interfaz(base):
+    gestor = StockManager()
+    gestor.agregar_producto("Arroz", "", "1.00", 10, "General")
+    pagina = PaginaFalsa()
+    ejecutor = EjecutorTareas(max_hilos=2)
+    lista = ListaProductos(gestor, lambda producto: ft.Text(producto.nombre),
+                           lambda card, producto: setattr(card, 'value', producto.nombre),
+                           tareas=TareasVista(pagina, ejecutor))
+
+    lista.cargar().result()
+    en_interfaz(lambda: None).result()
+    ejecutor.apagar()
+
+    assert [c.value for c in lista.vista.controls] == ["Arroz"]
+    assert pagina.hilos and all(h.startswith('interfaz') for h in pagina.hilos)
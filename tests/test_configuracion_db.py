@@ -0,0 +1,54 @@
+import threading
+import pytest
+from model.configuracion_db import ConfiguracionDB
+from model.modelo import StockManager, conexion_de_hilo, db, inicializar_base_datos
+from services.ejecutor import EjecutorTareas
+
+
+@pytest.fixture
+def base_pool(tmp_path):
+    inicializar_base_datos(ConfiguracionDB('pool', ruta=str(tmp_path / 'stock.db'), max_connections=4))
+    gestor = StockManager()
+    for i in range(20):
+        gestor.agregar_producto(f"Producto {i}", "", "1.00", 10, "General")
+    # La conexión del hilo principal vuelve al pool: solo quedan las de los tests
+    db.close()
+    yield db
+    db.close()
+    db.obj.close_all()
+
+
+def test_ejecutor_devuelve_las_conexiones_al_pool(base_pool):
+    ejecutor = EjecutorTareas(max_hilos=10)
+    futuros = [ejecutor.enviar(StockManager().paginar_productos) for _ in range(50)]
+    paginas = [futuro.result(timeout=30) for futuro in futuros]
+    ejecutor.apagar()
+
+    assert all(pagina['total'] == 20 for pagina in paginas)
+    assert not db.obj._in_use
+
+
+def test_hilos_sueltos_con_conexion_de_hilo(base_pool):
+    errores = []
+
+    def trabajar():
+        try:
+            with conexion_de_hilo():
+                StockManager().paginar_productos()
+        except Exception as ex:
+            errores.append(ex)
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(10)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert not db.obj._in_use
+
+
+def test_conexion_de_hilo_no_cierra_la_conexion_sin_pool(base):
+    with conexion_de_hilo():
+        StockManager().paginar_productos()
+    assert not db.is_closed()
@@ -0,0 +1,23 @@
+from services.decoradores import escritor_operaciones, log_operacion, vaciar_log_operaciones
+
+
+class Gestor:
+    @log_operacion
+    def registrar(self, items, vendedor=None):
+        return len(items)
+
+
+def test_log_guarda_los_argumentos_con_que_se_llamo():
+    items = [{'producto_id': 1, 'cantidad': 2}]
+    opciones = {'vendedor': 'admin'}
+    Gestor().registrar(items, **opciones)
+
+    # Se modifican antes de que el hilo escritor arme la línea
+    items.clear()
+    opciones['vendedor'] = 'otro'
+    assert vaciar_log_operaciones()
+
+    with open(escritor_operaciones().ruta, encoding='utf-8') as archivo:
+        linea = archivo.read().splitlines()[-1]
+    assert "Operación: registrar" in linea
+    assert "Argumentos: ([{'producto_id': 1, 'cantidad': 2}],) {'vendedor': 'admin'}" in linea
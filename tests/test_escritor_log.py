@@ -0,0 +1,121 @@
+import datetime
+import gzip
+import os
+from services.logger import escritor_log, utils_logger
+from services.logger.escritor_log import EscritorLog, aplicar_retencion
+from services.logger.manifiesto_logs import DIRECTORIO_LOGS, ManifiestoLog, PoliticaRotacion
+
+
+def politica(**opciones):
+    valores = dict(max_bytes=100, max_segundos=None, conservar=None, dias=None)
+    valores.update(opciones)
+    return PoliticaRotacion(**valores)
+
+
+def escribir_lotes(escritor, lotes):
+    """Dos líneas de 50 bytes por lote: cada lote llena el activo y rota."""
+    lineas = []
+    for lote in range(lotes):
+        for numero in range(2):
+            linea = f"lote {lote:02d} linea {numero}".ljust(49) + "\n"
+            escritor.escribir_texto(linea)
+            lineas.append(linea)
+        assert escritor.vaciar()
+    # El último lote rota después de atender el vaciar: uno más lo asegura
+    assert escritor.vaciar()
+    # Un solo hilo comprime: cuando corre esto ya se comprimió lo anterior
+    escritor_log._compresor.submit(int).result(timeout=5)
+    return lineas
+
+
+def contenido(directorio, manifiesto):
+    """Texto de los segmentos (del más viejo al más nuevo) y del activo."""
+    texto = ""
+    for segmento in manifiesto.datos['segmentos']:
+        with gzip.open(os.path.join(directorio, segmento['archivo']), 'rt', encoding='utf-8') as archivo:
+            texto += archivo.read()
+    with open(manifiesto.ruta_log, encoding='utf-8') as archivo:
+        return texto + archivo.read()
+
+
+def test_rota_por_tamanio_y_comprime_los_segmentos(tmp_path):
+    escritor = EscritorLog(str(tmp_path / 'app.txt'), politica=politica())
+    try:
+        lineas = escribir_lotes(escritor, 4)
+    finally:
+        escritor.cerrar()
+
+    manifiesto = ManifiestoLog.cargar(str(tmp_path / 'app.txt'))
+    segmentos = manifiesto.datos['segmentos']
+    assert escritor.rotaciones == len(segmentos) == 4
+    assert all(s['comprimido'] and s['archivo'].endswith('.txt.gz') for s in segmentos)
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ['app.txt', 'app.manifiesto.json'] + [s['archivo'] for s in segmentos])
+    assert contenido(str(tmp_path), manifiesto) == "".join(lineas)
+
+    # Los totales del manifiesto son los de disco después de rotar
+    assert manifiesto.archivos() == {nombre: os.path.getsize(tmp_path / nombre)
+                                     for nombre in manifiesto.archivos()}
+
+
+def test_la_retencion_conserva_los_segmentos_mas_nuevos(tmp_path):
+    escritor = EscritorLog(str(tmp_path / 'app.txt'), politica=politica(conservar=2))
+    try:
+        lineas = escribir_lotes(escritor, 5)
+    finally:
+        escritor.cerrar()
+
+    manifiesto = ManifiestoLog.cargar(str(tmp_path / 'app.txt'))
+    assert len(manifiesto.datos['segmentos']) == 2
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.gz')]) == 2
+    # Los cinco lotes se cerraron en el mismo segundo: quedan los dos últimos
+    assert contenido(str(tmp_path), manifiesto) == "".join(lineas[-4:])
+
+
+def test_vencidos_ordena_por_fin_dentro_del_mismo_segundo(tmp_path):
+    manifiesto = ManifiestoLog(str(tmp_path / 'app.txt'))
+    inicio = datetime.datetime(2026, 1, 1, 10, 0, 0)
+    # Anotados fuera de orden, cerrados en el mismo segundo
+    for archivo, microsegundos in (('b', 600000), ('a', 200000), ('c', 900000)):
+        fin = inicio.replace(microsecond=microsegundos)
+        manifiesto.agregar_segmento(archivo, 10, inicio, fin)
+
+    vencidos = manifiesto.vencidos(politica(conservar=1), ahora=inicio)
+    assert [s['archivo'] for s in vencidos] == ['a', 'b']
+
+    # Manifiestos anteriores, sin microsegundos, se siguen leyendo
+    manifiesto.datos['segmentos'].insert(0, {'archivo': 'viejo', 'bytes': 10, 'comprimido': True,
+                                             'inicio': '2025-12-31T09:00:00',
+                                             'fin': '2025-12-31T10:00:00'})
+    vencidos = manifiesto.vencidos(politica(dias=0), ahora=inicio)
+    assert [s['archivo'] for s in vencidos] == ['viejo']
+    assert aplicar_retencion(manifiesto, politica(conservar=1)) == ['viejo', 'a', 'b']
+    assert [s['archivo'] for s in ManifiestoLog.cargar(manifiesto.ruta_log).datos['segmentos']] == ['c']
+
+
+def test_obtener_tamanio_logs_lee_los_manifiestos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    escritor = EscritorLog(os.path.join(DIRECTORIO_LOGS, 'log_stock.txt'), politica=politica())
+    try:
+        escribir_lotes(escritor, 3)
+        escritor.escribir_texto("sin rotar\n")
+        assert escritor.vaciar()
+
+        # Mientras el proceso escribe el log, el manifiesto vivo
+        monkeypatch.setattr(utils_logger, 'escritores_activos', lambda: {'log_stock.txt': escritor})
+        vivo = utils_logger.obtener_tamaño_logs()
+    finally:
+        escritor.cerrar()
+
+    # Desde otro proceso, el guardado en disco
+    monkeypatch.setattr(utils_logger, 'escritores_activos', dict)
+    guardado = utils_logger.obtener_tamaño_logs()
+
+    en_disco = {nombre: os.path.getsize(os.path.join(DIRECTORIO_LOGS, nombre))
+                for nombre in os.listdir(DIRECTORIO_LOGS) if nombre.startswith('log_stock.')
+                and not nombre.endswith('.json')}
+    assert len(en_disco) == 4
+    for resultado in (vivo, guardado):
+        assert {nombre: datos['tamaño_bytes'] for nombre, datos in resultado['archivos'].items()} == en_disco
+        assert resultado['tamaño_total_bytes'] == sum(en_disco.values())
+        assert resultado['cantidad_archivos'] == 4
@@ -0,0 +1,43 @@
+import io
+from model.modelo import MovimientoStock, Producto, StockManager
+
+
+def importar(texto):
+    return StockManager().importar_productos(io.StringIO(texto), formato='csv')
+
+
+def test_primera_importacion_con_sku_adopta_los_productos_cargados_sin_sku(base):
+    gestor = StockManager()
+    yerba = gestor.agregar_producto("Yerba", "1 kg", "2.50", 10, "Almacén")
+    gestor.agregar_producto("Azúcar", "1 kg", "1.20", 5, "Almacén")
+
+    resumen = importar(
+        "sku,nombre,descripcion,precio,stock,categoria\n"
+        "YER-1,Yerba,1 kg,2.80,12,Almacén\n"
+        "ARR-1,Arroz,1 kg,1.10,7,Almacén\n"
+    )
+
+    assert resumen == {'insertados': 1, 'actualizados': 1, 'errores': []}
+    assert Producto.select().where(Producto.nombre == "Yerba").count() == 1
+    actualizado = Producto.get_by_id(yerba.id)
+    assert actualizado.sku == "YER-1"
+    assert actualizado.stock == 12
+    assert Producto.get(Producto.nombre == "Arroz").sku == "ARR-1"
+    # El que no vino en el archivo sigue sin sku
+    assert Producto.get(Producto.nombre == "Azúcar").sku is None
+    assert MovimientoStock.select().where(MovimientoStock.producto == yerba.id,
+                                          MovimientoStock.tipo == 'entrada',
+                                          MovimientoStock.cantidad == 2).exists()
+
+
+def test_el_nombre_no_se_reasigna_a_dos_skus(base):
+    StockManager().agregar_producto("Yerba", "", "2.50", 10, "Almacén")
+
+    resumen = importar(
+        "sku,nombre,precio,stock\n"
+        "YER-1,Yerba,2.80,12\n"
+        "YER-2,Yerba,3.00,4\n"
+    )
+
+    assert resumen['insertados'] == 1 and resumen['actualizados'] == 1
+    assert sorted(p.sku for p in Producto.select()) == ["YER-1", "YER-2"]
@@ -0,0 +1,39 @@
+import datetime
+import io
+from model.libro_stock import LibroStock
+from model.modelo import CheckpointStock, Producto, StockManager
+
+
+def test_stock_antes_del_alta_es_cero(base):
+    antes = datetime.datetime.now() - datetime.timedelta(seconds=1)
+    gestor = StockManager()
+    producto = gestor.agregar_producto("Yerba", "", "2.50", 10, "Almacén")
+    gestor.importar_productos(io.StringIO("nombre,precio,stock\nArroz,1.10,7\n"), formato='csv')
+    arroz = Producto.get(Producto.nombre == "Arroz")
+    gestor.actualizar_stock(producto.id, 5, "admin")
+
+    libro = LibroStock()
+    assert libro.stock_at(producto.id, antes) == 0
+    assert libro.stock_at(arroz.id, antes) == 0
+    assert libro.stock_at(producto.id, datetime.datetime.now()) == 15
+
+    # Anclado en el alta, el libro cuadra con el stock registrado
+    libro.crear_checkpoints()
+    gestor.actualizar_stock(arroz.id, 3, "admin", tipo='salida')
+    assert libro.verificar_consistencia() == []
+    assert libro.stock_at(arroz.id, antes) == 0
+
+
+def test_checkpoints_periodicos_solo_cuando_vencen(base):
+    gestor = StockManager()
+    producto = gestor.agregar_producto("Yerba", "", "2.50", 10, "Almacén")
+    libro = LibroStock()
+    dia = datetime.timedelta(days=1)
+
+    assert libro.crear_checkpoints_si_vencen(dia) == 1
+    assert isinstance(libro.ultimo_checkpoint(), datetime.datetime)
+
+    gestor.actualizar_stock(producto.id, 5, "admin")
+    assert libro.crear_checkpoints_si_vencen(dia) == 0
+    assert libro.crear_checkpoints_si_vencen(datetime.timedelta(0)) == 1
+    assert CheckpointStock.select().count() == 2
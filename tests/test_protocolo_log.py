@@ -0,0 +1,155 @@
+import json
+import socket
+import threading
+import time
+import pytest
+from services.logger.cliente_log import ClienteLog
+from services.logger.protocolo import LectorTramas, armar_trama, leer_trama
+from services.logger.servidor_log import ConexionCliente, ServidorLog
+
+
+def esperar(condicion, timeout=3.0):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture(params=['selectors', 'hilos'])
+def servidor(request):
+    servidor = ServidorLog(puerto=0, modo=request.param)
+    hilo = threading.Thread(target=servidor.iniciar_servidor, daemon=True)
+    hilo.start()
+    assert esperar(lambda: servidor.ejecutando)
+    servidor.puerto = servidor.socket_servidor.getsockname()[1]
+    yield servidor
+    servidor.detener_servidor()
+
+
+def crear_cliente(puerto, **opciones):
+    cliente = ClienteLog(puerto=puerto, **opciones)
+    cliente.auto_reconectar = False
+    return cliente
+
+
+def log(numero):
+    return {"operacion": f"PRUEBA_{numero}", "usuario": "test", "nivel": "INFO", "detalles": {}}
+
+
+def test_lector_arma_tramas_cortadas_y_juntas():
+    lector = LectorTramas()
+    trama = armar_trama(id=1, datos={"texto": "cañón"})
+    corte = trama.index("ñ".encode('utf-8')) + 1
+
+    assert lector.alimentar(trama[:corte]) == []
+    lineas = lector.alimentar(trama[corte:] + armar_trama(id=2, datos="x") + b'{"v":1,')
+    assert [leer_trama(linea)['id'] for linea in lineas] == [1, 2]
+    assert leer_trama(lineas[0])['datos'] == {"texto": "cañón"}
+    assert lector.buffer == b'{"v":1,'
+
+
+def test_servidor_responde_un_ack_acumulativo_por_lectura():
+    servidor = ServidorLog(puerto=0)
+    conexion = ConexionCliente(None, "prueba")
+
+    respuesta = servidor.procesar_entrada(conexion, armar_trama(id=1, datos=log(1)) + armar_trama(id=2, datos=log(2)))
+
+    assert [leer_trama(linea) for linea in LectorTramas().alimentar(respuesta)] == [{'v': 1, 'ack': 2}]
+    assert conexion.protocolo == 'v1'
+
+
+def test_clientes_v1_y_legacy_en_el_mismo_servidor(servidor):
+    v1 = crear_cliente(servidor.puerto)
+    legacy = crear_cliente(servidor.puerto, protocolo='legacy')
+    try:
+        assert v1.conectar() and legacy.conectar()
+        for numero in range(20):
+            assert v1.enviar_log(log(numero))
+            assert legacy.enviar_log(log(numero))
+        assert v1.esperar_confirmacion(3)
+        assert v1._confirmado == v1._siguiente_id - 1
+    finally:
+        v1.desconectar()
+        legacy.desconectar()
+
+
+def test_lo_no_confirmado_se_reenvia_al_reconectar(servidor):
+    # Un servidor que recibe pero nunca confirma (la ventana no llega a llenarse)
+    mudo = socket.create_server(('localhost', 0))
+    cliente = crear_cliente(mudo.getsockname()[1])
+    try:
+        assert cliente.conectar()
+        aceptado, _ = mudo.accept()
+        for numero in range(3):
+            assert cliente.enviar_log(log(numero))
+        assert len(cliente._pendientes) == 4
+
+        cliente.puerto = servidor.puerto
+        assert cliente.conectar()
+        assert cliente.esperar_confirmacion(3)
+        assert cliente.protocolo == 'v1'
+        assert servidor.log.vaciar()
+        with open(servidor.archivo_log, encoding='utf-8') as archivo:
+            contenido = archivo.read()
+        assert all(f"PRUEBA_{numero}" in contenido for numero in range(3))
+        aceptado.close()
+    finally:
+        cliente.desconectar()
+        mudo.close()
+
+
+class ServidorViejo:
+    """Servidor anterior al protocolo v1: una respuesta JSON por lectura.
+    Con `ignorar_v1` no contesta lo que parece una trama (nunca hay acks)."""
+
+    def __init__(self, ignorar_v1=False):
+        self.ignorar_v1 = ignorar_v1
+        self.socket = socket.create_server(('localhost', 0))
+        self.puerto = self.socket.getsockname()[1]
+        threading.Thread(target=self._aceptar, daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion, _ = self.socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _atender(self, conexion):
+        with conexion:
+            while True:
+                try:
+                    datos = conexion.recv(4096)
+                except OSError:
+                    return
+                if not datos:
+                    return
+                if self.ignorar_v1 and datos.startswith(b'{"v":'):
+                    continue
+                conexion.sendall(json.dumps({"status": "ok"}).encode('utf-8'))
+
+    def cerrar(self):
+        self.socket.close()
+
+
+@pytest.mark.parametrize('ignorar_v1', [False, True])
+def test_con_un_servidor_viejo_pasa_a_legacy_sin_bloquear(ignorar_v1):
+    viejo = ServidorViejo(ignorar_v1)
+    cliente = crear_cliente(viejo.puerto, ventana=2)
+    cliente.timeout_confirmacion = 0.3
+    try:
+        assert cliente.conectar()
+        inicio = time.monotonic()
+        for numero in range(10):
+            cliente.enviar_log(log(numero))
+        assert esperar(lambda: cliente.protocolo == 'legacy' and cliente.conectado)
+        assert cliente.enviar_log(log(99))
+        # Como mucho una espera de ventana, no una por envío
+        assert time.monotonic() - inicio < 2
+        assert not cliente._pendientes
+    finally:
+        cliente.desconectar()
+        viejo.cerrar()
@@ -0,0 +1,100 @@
+import datetime
+from decimal import Decimal
+import pytest
+from model.modelo import (Producto, ResumenDiarioProducto, StockManager, Venta, VentasManager, db,
+                          sumar_en_resumen)
+from model.resumen_ventas import ResumenVentas
+
+
+@pytest.fixture
+def producto(base):
+    return StockManager().agregar_producto("Yerba", "1 kg", "2.50", 2, "Almacén")
+
+
+@pytest.mark.parametrize('cantidad, precio', [(-5, '1.00'), (0, '1.00'), (1, '-1.00')])
+def test_registrar_venta_rechaza_cantidad_o_precio_invalidos(producto, cantidad, precio):
+    with pytest.raises(ValueError):
+        StockManager().registrar_venta("Ana", "admin", [
+            {'producto_id': producto.id, 'cantidad': cantidad, 'precio_unitario': precio},
+        ])
+
+    assert Producto.get_by_id(producto.id).stock == 2
+    assert Venta.select().count() == 0
+    assert ResumenDiarioProducto.select().count() == 0
+
+
+def test_ventas_en_el_mismo_segundo_tienen_numeros_distintos(producto):
+    gestor = StockManager()
+    item = [{'producto_id': producto.id, 'cantidad': 1, 'precio_unitario': '2.50'}]
+
+    primera = gestor.registrar_venta("Ana", "admin", item)
+    segunda = gestor.registrar_venta("Beto", "admin", item)
+
+    assert primera.numero_venta != segunda.numero_venta
+    assert Producto.get_by_id(producto.id).stock == 0
+
+
+@pytest.fixture
+def consultas(base, monkeypatch):
+    """Cuenta las sentencias que llegan a la base."""
+    ejecutadas = []
+    execute_sql = db.obj.execute_sql
+
+    def contar(sql, *args, **kwargs):
+        ejecutadas.append(sql)
+        return execute_sql(sql, *args, **kwargs)
+
+    monkeypatch.setattr(db.obj, 'execute_sql', contar)
+    return ejecutadas
+
+
+def registrar_ventas(cantidad_ventas, lineas_por_venta):
+    gestor = StockManager()
+    productos = [gestor.agregar_producto(f"Producto {i}", "", "1.00", 1000, "General")
+                 for i in range(lineas_por_venta)]
+    items = [{'producto_id': p.id, 'cantidad': 1, 'precio_unitario': '1.00'} for p in productos]
+    return [gestor.registrar_venta("Ana", "admin", items) for _ in range(cantidad_ventas)]
+
+
+def consultas_de(consultas, funcion):
+    consultas.clear()
+    funcion()
+    return len(consultas)
+
+
+@pytest.mark.parametrize('lineas', [1, 25])
+def test_detalle_de_venta_usa_una_consulta_sin_importar_las_lineas(consultas, lineas):
+    venta = registrar_ventas(1, lineas)[0]
+
+    assert consultas_de(consultas, lambda: VentasManager().obtener_venta_con_lineas(venta.id)) == 1
+    assert len(VentasManager().obtener_venta_con_lineas(venta.id)[1]) == lineas
+
+
+@pytest.mark.parametrize('ventas, lineas', [(1, 1), (30, 4)])
+def test_ventas_con_lineas_usa_una_consulta_sin_importar_el_volumen(consultas, ventas, lineas):
+    registrar_ventas(ventas, lineas)
+
+    assert consultas_de(consultas, lambda: list(VentasManager().ventas_con_lineas())) == 1
+    recorridas = list(VentasManager().ventas_con_lineas())
+    assert len(recorridas) == ventas
+    assert all(len(detalle) == lineas for _, detalle in recorridas)
+
+
+def test_top_productos_ve_los_cambios_en_dias_anteriores(producto):
+    hoy = datetime.date.today()
+    ayer = hoy - datetime.timedelta(days=1)
+    resumen = ResumenVentas()
+    StockManager().registrar_venta("Ana", "admin", [
+        {'producto_id': producto.id, 'cantidad': 1, 'precio_unitario': '2.50'},
+    ])
+    assert resumen.top_productos(ayer, hoy) == [(producto.id, "Yerba", 1, Decimal('2.50'))]
+
+    # Una venta empezada antes de medianoche suma en el resumen de ayer
+    sumar_en_resumen(ResumenDiarioProducto, 'producto_id', [
+        {'fecha': ayer, 'producto_id': producto.id, 'unidades': 1, 'importe': Decimal('2.50')},
+    ], ['unidades', 'importe'])
+    assert resumen.top_productos(ayer, hoy) == [(producto.id, "Yerba", 2, Decimal('5.00'))]
+
+    # Reconstruir (desde otra instancia, como la migración) descarta esa fila
+    ResumenVentas().reconstruir()
+    assert resumen.top_productos(ayer, hoy) == [(producto.id, "Yerba", 1, Decimal('2.50'))]
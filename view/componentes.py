@@ -0,0 +1,560 @@
+import bisect
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import flet as ft
+from model.cache_productos import CacheProductos
+from model.modelo import conexion_de_hilo
+from model.observers.observador import Observador
+
+
+# Las consultas corren en paralelo en EjecutorTareas, pero sus resultados se
+# aplican a los controles desde un solo hilo: dos callbacks que terminan
+# juntos no tocan la misma lista de controles a la vez
+_interfaz = ThreadPoolExecutor(max_workers=1, thread_name_prefix='interfaz')
+
+
+def actualizar_control(control):
+    """Envía solo `control` al cliente si ya está montado en la página."""
+    if control.page is not None:
+        control.update()
+
+
+def en_interfaz(funcion, *args):
+    """Encola `funcion(*args)` en el hilo que aplica cambios a los controles."""
+    return _interfaz.submit(_aplicar_en_interfaz, funcion, args)
+
+
+def _aplicar_en_interfaz(funcion, args):
+    try:
+        funcion(*args)
+    except Exception as ex:
+        print(f"❌ Error actualizando la interfaz: {ex}")
+
+
+class ListaProductos:
+    """Lista de productos con clave por id y carga perezosa por páginas.
+
+    Mantiene {producto_id: card} y el orden (nombre, id) de lo cargado, así
+    un alta, un cambio de stock o una baja modifican una sola card en lugar
+    de reconstruir la lista. `orden` es la lista ordenada de esas claves:
+    las cards van primero en la vista y en el mismo orden, así la posición
+    de una clave se busca con bisect. Las cards las arma la vista con `crear_card` y
+    se actualizan en el lugar con `actualizar_card(card, producto)`.
+
+    Con `tareas` (TareasVista) las consultas de `cargar`, `cargar_mas`,
+    `sincronizar` y `refrescar` corren en el pool y sus resultados se
+    aplican en el hilo de la interfaz; sin ella todo corre en el hilo
+    actual. Los cambios a las cards y al orden se hacen con `_lock`: las
+    alertas y los handlers pueden llegar desde otros hilos.
+    """
+
+    def __init__(self, stock_manager, crear_card, actualizar_card,
+                 mensaje_vacio="No hay productos registrados", tamanio_pagina=50, tareas=None,
+                 **opciones_lista):
+        self.stock_manager = stock_manager
+        self.crear_card = crear_card
+        self.actualizar_card = actualizar_card
+        self.tamanio_pagina = tamanio_pagina
+        self.tareas = tareas
+
+        self.cards = {}
+        self.productos = {}
+        self.claves = {}
+        self.orden = []
+        self.cursor = None
+        self.total = 0
+        self.cargando = False
+        self.sincronizado = None
+        self._lock = threading.RLock()
+
+        self.txt_vacio = ft.Text(mensaje_vacio,
+                                 style=ft.TextThemeStyle.BODY_LARGE,
+                                 color=ft.Colors.GREY)
+        self.txt_resumen = ft.Text("", color=ft.Colors.GREY)
+        self.boton_mas = ft.TextButton(
+            "Cargar más productos",
+            icon=ft.Icons.EXPAND_MORE,
+            on_click=lambda e: self.cargar_mas()
+        )
+        self.vista = ft.ListView(
+            on_scroll=self._al_desplazar,
+            on_scroll_interval=100,
+            **opciones_lista
+        )
+
+    # --- carga por páginas ---
+
+    def _en_segundo_plano(self, trabajo, aplicar, al_fallar=None, bloquear=None):
+        # Con tareas la consulta va al pool y `aplicar` al hilo de la
+        # interfaz; sin ellas todo corre en el hilo actual
+        if self.tareas is not None:
+            return self.tareas.ejecutar(trabajo, aplicar, al_fallar, bloquear)
+        aplicar(trabajo())
+
+    def _mostrar_cambios(self):
+        actualizar_control(self.vista)
+        actualizar_control(self.txt_resumen)
+
+    def cargar(self, al_fallar=None):
+        """Recarga completa: solo al iniciar la pantalla."""
+        momento = datetime.datetime.now()
+
+        def trabajo():
+            return self.stock_manager.paginar_productos(None, self.tamanio_pagina)
+
+        def aplicar(pagina):
+            with self._lock:
+                self.sincronizado = momento
+                self.cards.clear()
+                self.productos.clear()
+                self.claves.clear()
+                self.orden.clear()
+                self.vista.controls.clear()
+                self._agregar_pagina(pagina)
+            self._mostrar_cambios()
+
+        return self._en_segundo_plano(trabajo, aplicar, al_fallar)
+
+    def cargar_mas(self):
+        with self._lock:
+            if self.cargando or not self.cursor:
+                return
+            self.cargando = True
+            cursor = self.cursor
+
+        def trabajo():
+            return self.stock_manager.paginar_productos(cursor, self.tamanio_pagina)
+
+        def aplicar(pagina):
+            with self._lock:
+                self.cargando = False
+                # Una recarga completa en el medio deja esta página obsoleta
+                if self.cursor != cursor:
+                    return
+                self._agregar_pagina(pagina)
+            self._mostrar_cambios()
+
+        def al_fallar(ex):
+            self.cargando = False
+            print(f"❌ Error al cargar más productos: {ex}")
+
+        try:
+            self._en_segundo_plano(trabajo, aplicar, al_fallar, bloquear=self.boton_mas)
+        finally:
+            if self.tareas is None:
+                self.cargando = False
+
+    def _agregar_pagina(self, pagina):
+        self.cursor = pagina['siguiente']
+        self.total = pagina['total']
+        self._quitar_auxiliares()
+        for producto in pagina['elementos']:
+            if producto.id in self.cards:
+                continue
+            card = self.crear_card(producto)
+            self.cards[producto.id] = card
+            self.productos[producto.id] = producto
+            clave = (producto.nombre, producto.id)
+            self.claves[producto.id] = clave
+            bisect.insort(self.orden, clave)
+            self.vista.controls.append(card)
+        self._poner_auxiliares()
+
+    def _al_desplazar(self, e):
+        # Carga la página siguiente al acercarse al final de lo visible
+        if self.cursor and e.max_scroll_extent and e.pixels >= e.max_scroll_extent - 200:
+            self.cargar_mas()
+
+    def _quitar_auxiliares(self):
+        for control in (self.txt_vacio, self.boton_mas):
+            if control in self.vista.controls:
+                self.vista.controls.remove(control)
+
+    def _poner_auxiliares(self):
+        if not self.cards:
+            self.vista.controls.append(self.txt_vacio)
+        elif self.cursor:
+            self.vista.controls.append(self.boton_mas)
+        self.txt_resumen.value = f"Mostrando {len(self.cards)} de {self.total}" if self.total else ""
+
+    # --- cambios puntuales ---
+
+    def _posicion(self, clave):
+        # Índice de la primera card cargada que va después de `clave`
+        posicion = bisect.bisect_right(self.orden, clave)
+        return posicion if posicion < len(self.orden) else None
+
+    def _sacar_clave(self, producto_id):
+        clave = self.claves.pop(producto_id)
+        del self.orden[bisect.bisect_left(self.orden, clave)]
+
+    def actualizar(self, producto):
+        """Alta o modificación de un producto: toca una sola card."""
+        with self._lock:
+            card = self._actualizar(producto)
+        if card is not None:
+            actualizar_control(card)
+        else:
+            self._mostrar_cambios()
+
+    def _actualizar(self, producto):
+        # Devuelve la card si solo cambió su contenido; None si cambió la lista
+        card = self.cards.get(producto.id)
+        clave = (producto.nombre, producto.id)
+
+        if card is not None and self.claves[producto.id] == clave:
+            self.productos[producto.id] = producto
+            self.actualizar_card(card, producto)
+            return card
+
+        if card is not None:
+            # Cambió el nombre: se reubica la card para mantener el orden
+            self.vista.controls.remove(card)
+            del self.cards[producto.id]
+            del self.productos[producto.id]
+            self._sacar_clave(producto.id)
+        else:
+            self.total += 1
+
+        posicion = self._posicion(clave)
+        self._quitar_auxiliares()
+        if posicion is not None or not self.cursor or clave <= self.cursor:
+            card = self.crear_card(producto)
+            self.cards[producto.id] = card
+            self.productos[producto.id] = producto
+            self.claves[producto.id] = clave
+            bisect.insort(self.orden, clave)
+            if posicion is None:
+                self.vista.controls.append(card)
+            else:
+                self.vista.controls.insert(posicion, card)
+        # Si cae después de lo cargado aparecerá al cargar más
+        self._poner_auxiliares()
+        return None
+
+    def quitar(self, producto_id):
+        with self._lock:
+            quitado = self._quitar(producto_id)
+        if quitado:
+            self._mostrar_cambios()
+
+    def _quitar(self, producto_id):
+        card = self.cards.pop(producto_id, None)
+        if card is None:
+            return False
+        del self.productos[producto_id]
+        self._sacar_clave(producto_id)
+        self.total = max(self.total - 1, 0)
+        self.vista.controls.remove(card)
+        self._quitar_auxiliares()
+        self._poner_auxiliares()
+        return True
+
+    def sincronizar(self, margen=2):
+        """Aplica solo los productos que cambiaron desde la última carga.
+
+        Pensado para cuando la pantalla vuelve a mostrarse. `margen` (en
+        segundos) cubre escrituras que se confirmaron justo durante la
+        sincronización anterior; repetir un cambio no tiene efecto. Las bajas
+        no dejan fila que consultar: se comparan los ids cargados con la base
+        y se quitan las cards de los que ya no están.
+        """
+        with self._lock:
+            if self.sincronizado is None:
+                primera = True
+            else:
+                primera = False
+                desde = self.sincronizado - datetime.timedelta(seconds=margen)
+                self.sincronizado = datetime.datetime.now()
+                ids = list(self.cards)
+        if primera:
+            return self.cargar()
+
+        def trabajo():
+            cambios = self.stock_manager.productos_modificados_desde(desde)
+            return cambios, self.stock_manager.ids_existentes(ids)
+
+        def aplicar(resultado):
+            cambios, existentes = resultado
+            with self._lock:
+                for producto in cambios['elementos']:
+                    # Los que caen después de lo cargado aparecerán al cargar más
+                    if (producto.id in self.cards or not self.cursor
+                            or (producto.nombre, producto.id) <= self.cursor):
+                        self._actualizar(producto)
+
+                for producto_id in ids:
+                    if producto_id not in existentes:
+                        self._quitar(producto_id)
+
+                self.total = cambios['total']
+                self._quitar_auxiliares()
+                self._poner_auxiliares()
+            self._mostrar_cambios()
+
+        return self._en_segundo_plano(trabajo, aplicar)
+
+    def refrescar(self, ids):
+        """Vuelve a leer los productos `ids` y actualiza solo sus cards."""
+        with self._lock:
+            ids = [pid for pid in ids if pid in self.cards]
+        if not ids:
+            return
+
+        def aplicar(productos):
+            with self._lock:
+                for producto_id in ids:
+                    producto = productos.get(producto_id)
+                    if producto is None:
+                        self._quitar(producto_id)
+                    else:
+                        self._actualizar(producto)
+            self._mostrar_cambios()
+
+        return self._en_segundo_plano(lambda: self.stock_manager.obtener_productos(ids), aplicar)
+
+    def aplicar_stock(self, stock_por_id):
+        """Aplica {producto_id: stock} ya conocido (por ejemplo, el resultado
+        de una venta) sin consultar la base."""
+        cambiadas = []
+        with self._lock:
+            for producto_id, stock in stock_por_id.items():
+                card = self.cards.get(producto_id)
+                if card is None:
+                    continue
+                producto = self.productos[producto_id]
+                producto.stock = stock
+                self.actualizar_card(card, producto)
+                cambiadas.append(card)
+        for card in cambiadas:
+            actualizar_control(card)
+
+
+class BusquedaDiferida:
+    """Búsqueda mientras se escribe, fuera del hilo de la interfaz.
+
+    `solicitar(texto)` reemplaza el pedido pendiente y reinicia la espera;
+    la consulta corre en un único hilo de trabajo recién cuando el usuario
+    deja de escribir `espera` segundos. `mostrar(texto, resultados)` solo
+    recibe la respuesta al último texto (en el hilo de `en_interfaz`): lo
+    que llega de una consulta vieja se descarta. Los resultados se cachean por texto durante `ttl` segundos.
+    """
+
+    def __init__(self, buscar, mostrar, espera=0.25, capacidad_cache=128, ttl=30):
+        self.buscar = buscar
+        self.mostrar = mostrar
+        self.espera = espera
+        self.cache = CacheProductos(capacidad=capacidad_cache, ttl=ttl)
+
+        self._condicion = threading.Condition()
+        self._pendiente = None
+        self._generacion = 0
+        self._hilo = None
+
+    def solicitar(self, texto, inmediato=False):
+        texto = (texto or '').strip()
+        with self._condicion:
+            self._generacion += 1
+            if not texto:
+                self._pendiente = None
+            else:
+                vence = time.monotonic() + (0 if inmediato else self.espera)
+                self._pendiente = (self._generacion, texto, vence)
+                self._iniciar_hilo()
+                self._condicion.notify()
+        if not texto:
+            en_interfaz(self.mostrar, '', [])
+
+    def cancelar(self):
+        """Descarta el pedido pendiente y la consulta en curso."""
+        with self._condicion:
+            self._generacion += 1
+            self._pendiente = None
+
+    def _iniciar_hilo(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._trabajar, daemon=True)
+            self._hilo.start()
+
+    def _siguiente_pedido(self):
+        with self._condicion:
+            while True:
+                if self._pendiente is None:
+                    self._condicion.wait()
+                    continue
+                generacion, texto, vence = self._pendiente
+                restante = vence - time.monotonic()
+                if restante > 0:
+                    # Un pedido nuevo durante la espera lo reemplaza
+                    self._condicion.wait(restante)
+                    continue
+                self._pendiente = None
+                return generacion, texto
+
+    def _vigente(self, generacion):
+        with self._condicion:
+            return generacion == self._generacion
+
+    def _trabajar(self):
+        while True:
+            generacion, texto = self._siguiente_pedido()
+            try:
+                with conexion_de_hilo():
+                    resultados = self.cache.obtener(texto, self.buscar)
+            except Exception as ex:
+                print(f"⚠️ Error en la búsqueda: {ex}")
+                resultados = []
+            if self._vigente(generacion):
+                en_interfaz(self.mostrar, texto, resultados)
+
+
+class TareasVista:
+    """Puente entre los handlers de una vista y el EjecutorTareas compartido.
+
+    `ejecutar(trabajo, al_terminar, al_fallar)` corre `trabajo()` fuera del
+    hilo de la interfaz y muestra `barra` mientras haya tareas de la vista en
+    curso. Los callbacks solo modifican controles y corren de a uno en el
+    hilo de `en_interfaz`; al volver se hace un único page.update() con
+    todos los cambios (incluida la barra).
+    """
+
+    def __init__(self, page, ejecutor):
+        self.page = page
+        self.ejecutor = ejecutor
+        self.barra = ft.ProgressBar(visible=False)
+        self._en_curso = 0
+        self._lock = threading.Lock()
+
+    def _cambiar_en_curso(self, delta):
+        with self._lock:
+            self._en_curso += delta
+            self.barra.visible = self._en_curso > 0
+
+    def ejecutar(self, trabajo, al_terminar=None, al_fallar=None, bloquear=None):
+        """`bloquear` es un control (por ejemplo el botón que disparó el
+        handler) que queda deshabilitado hasta que termina la tarea."""
+        self._cambiar_en_curso(1)
+        actualizar_control(self.barra)
+        if bloquear is not None:
+            bloquear.disabled = True
+            actualizar_control(bloquear)
+
+        def liberar():
+            self._cambiar_en_curso(-1)
+            if bloquear is not None:
+                bloquear.disabled = False
+
+        def terminar(resultado):
+            try:
+                liberar()
+                if al_terminar:
+                    al_terminar(resultado)
+            finally:
+                self.page.update()
+
+        def fallar(error):
+            try:
+                liberar()
+                if al_fallar:
+                    al_fallar(error)
+                else:
+                    print(f"❌ Error en tarea de la vista: {error}")
+            finally:
+                self.page.update()
+
+        return self.ejecutor.enviar(trabajo,
+                                    al_terminar=lambda resultado: en_interfaz(terminar, resultado),
+                                    al_fallar=lambda error: en_interfaz(fallar, error))
+
+
+class PanelStockBajo(Observador):
+    """Panel de reposición: productos por debajo de su stock mínimo.
+
+    `cargar()` trae los más urgentes con productos_bajo_minimo (consulta
+    indexada). Después el panel se mantiene solo con las alertas de
+    alertas_stock: una alerta de stock bajo agrega o actualiza una fila y
+    una de reposición la quita, sin volver a consultar. Las alertas llegan
+    desde el hilo que hizo la escritura y se aplican con `en_interfaz`.
+    """
+
+    def __init__(self, stock_manager, limite=50):
+        self.stock_manager = stock_manager
+        self.limite = limite
+        self.filas = {}
+        self.claves = {}
+        self.orden = []
+        self.total = 0
+        self._lock = threading.Lock()
+
+        self.txt_total = ft.Text("", color=ft.Colors.GREY)
+        self.txt_vacio = ft.Text("Ningún producto por debajo del mínimo", color=ft.Colors.GREY)
+        self.vista = ft.ListView(spacing=2, padding=5, controls=[self.txt_vacio])
+
+    def cargar(self):
+        self.mostrar(self.consultar())
+
+    def consultar(self):
+        return self.stock_manager.productos_bajo_minimo(self.limite)
+
+    def mostrar(self, resultado):
+        with self._lock:
+            self.filas.clear()
+            self.claves.clear()
+            self.orden.clear()
+            self.vista.controls.clear()
+            for producto in resultado['elementos']:
+                self._poner(producto.id, producto.nombre, producto.stock, producto.stock_minimo)
+            self.total = resultado['total']
+            self._actualizar_resumen()
+        actualizar_control(self.vista)
+        actualizar_control(self.txt_total)
+
+    def actualizar(self, sujeto, alerta):
+        # Llega en el hilo de la escritura: se aplica en el de la interfaz
+        en_interfaz(self.aplicar_alerta, alerta)
+
+    def aplicar_alerta(self, alerta):
+        with self._lock:
+            existente = alerta.producto_id in self.filas
+            if alerta.tipo == alerta.BAJO_MINIMO:
+                if not existente:
+                    self.total += 1
+                self._quitar(alerta.producto_id)
+                self._poner(alerta.producto_id, alerta.nombre, alerta.stock, alerta.stock_minimo)
+            else:
+                self.total = max(self.total - 1, 0)
+                self._quitar(alerta.producto_id)
+            self._actualizar_resumen()
+        actualizar_control(self.vista)
+        actualizar_control(self.txt_total)
+
+    def _poner(self, producto_id, nombre, stock, stock_minimo):
+        # Orden por urgencia: stock - stock_minimo, como el índice
+        clave = (stock - stock_minimo, producto_id)
+        if self.txt_vacio in self.vista.controls:
+            self.vista.controls.remove(self.txt_vacio)
+        fila = ft.ListTile(
+            dense=True,
+            leading=ft.Icon(ft.Icons.WARNING_AMBER, color=ft.Colors.ORANGE),
+            title=ft.Text(f"ID: {producto_id} - {nombre}"),
+            subtitle=ft.Text(f"Stock {stock} de mínimo {stock_minimo} · reponer {stock_minimo - stock}"),
+        )
+        posicion = bisect.bisect_left(self.orden, clave)
+        self.vista.controls.insert(posicion, fila)
+        self.orden.insert(posicion, clave)
+        self.filas[producto_id] = fila
+        self.claves[producto_id] = clave
+
+    def _quitar(self, producto_id):
+        fila = self.filas.pop(producto_id, None)
+        if fila is not None:
+            clave = self.claves.pop(producto_id)
+            del self.orden[bisect.bisect_left(self.orden, clave)]
+            self.vista.controls.remove(fila)
+
+    def _actualizar_resumen(self):
+        if not self.filas and self.txt_vacio not in self.vista.controls:
+            self.vista.controls.append(self.txt_vacio)
+        self.txt_total.value = f"{self.total} productos" if self.total else ""
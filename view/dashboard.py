@@ -0,0 +1,184 @@
+import flet as ft
+import datetime
+import time
+from model.resumen_ventas import ResumenVentas
+from services.ejecutor import EjecutorTareas
+from view.componentes import TareasVista
+
+
+class VistaDashboard:
+    """Reportes de ventas. Lee solo las tablas de resumen diario, nunca el
+    detalle de las ventas."""
+
+    RANGOS = {
+        "1": "Hoy",
+        "7": "Últimos 7 días",
+        "30": "Últimos 30 días",
+        "90": "Últimos 90 días",
+    }
+
+    def __init__(self, page: ft.Page, ejecutor=None):
+        self.page = page
+        self.resumen = ResumenVentas()
+        self.tareas = TareasVista(page, ejecutor or EjecutorTareas())
+
+        self.dd_rango = ft.Dropdown(
+            label="Período",
+            width=220,
+            value="7",
+            options=[ft.dropdown.Option(clave, texto) for clave, texto in self.RANGOS.items()],
+            on_change=lambda e: self.cargar_reportes(),
+        )
+        self.btn_actualizar = ft.IconButton(
+            icon=ft.Icons.REFRESH,
+            tooltip="Actualizar",
+            on_click=lambda e: self.cargar_reportes(),
+        )
+        self.txt_consulta = ft.Text("", size=12, color=ft.Colors.GREY)
+
+        self.txt_ingresos = ft.Text("$0.00", style=ft.TextThemeStyle.HEADLINE_SMALL, weight=ft.FontWeight.BOLD)
+        self.txt_ventas = ft.Text("0", style=ft.TextThemeStyle.HEADLINE_SMALL, weight=ft.FontWeight.BOLD)
+        self.txt_ticket = ft.Text("$0.00", style=ft.TextThemeStyle.HEADLINE_SMALL, weight=ft.FontWeight.BOLD)
+        self.txt_unidades = ft.Text("0", style=ft.TextThemeStyle.HEADLINE_SMALL, weight=ft.FontWeight.BOLD)
+
+        self.tabla_dias = self.crear_tabla(["Fecha", "Ventas", "Importe"])
+        self.tabla_productos = self.crear_tabla(["ID", "Producto", "Unidades", "Importe"])
+        self.tabla_categorias = self.crear_tabla(["Categoría", "Unidades", "Importe"])
+        self.tabla_vendedores = self.crear_tabla(["Vendedor", "Ventas", "Importe"])
+
+    def crear_tabla(self, columnas):
+        return ft.DataTable(
+            columns=[ft.DataColumn(ft.Text(c, weight=ft.FontWeight.BOLD)) for c in columnas],
+            rows=[],
+        )
+
+    def crear_indicador(self, titulo, texto, icono, color):
+        return ft.Card(
+            content=ft.Container(
+                content=ft.Row([
+                    ft.Icon(icono, color=color, size=32),
+                    ft.Column([
+                        ft.Text(titulo, color=ft.Colors.GREY),
+                        texto,
+                    ], spacing=2),
+                ]),
+                padding=15,
+                width=220,
+            )
+        )
+
+    def crear_seccion(self, titulo, tabla):
+        return ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Text(titulo,
+                           style=ft.TextThemeStyle.TITLE_MEDIUM,
+                           weight=ft.FontWeight.BOLD),
+                    ft.Container(
+                        content=ft.Column([tabla], scroll=ft.ScrollMode.AUTO),
+                        height=250,
+                    ),
+                ]),
+                padding=20,
+            )
+        )
+
+    @staticmethod
+    def llenar_tabla(tabla, filas):
+        tabla.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(str(valor))) for valor in fila])
+            for fila in filas
+        ]
+
+    def rango_fechas(self):
+        hasta = datetime.date.today()
+        dias = int(self.dd_rango.value or "7")
+        return hasta - datetime.timedelta(days=dias - 1), hasta
+
+    def cargar_reportes(self):
+        """Consulta todos los reportes del período en una sola tarea y los
+        muestra juntos con un único page.update()."""
+        desde, hasta = self.rango_fechas()
+
+        def trabajo():
+            inicio = time.perf_counter()
+            datos = {
+                'totales': self.resumen.totales(desde, hasta),
+                'dias': self.resumen.por_dia(desde, hasta),
+                'productos': self.resumen.top_productos(desde, hasta),
+                'categorias': self.resumen.por_categoria(desde, hasta),
+                'vendedores': self.resumen.por_vendedor(desde, hasta),
+            }
+            datos['ms'] = (time.perf_counter() - inicio) * 1000
+            return datos
+
+        def al_fallar(ex):
+            self.txt_consulta.value = f"❌ Error al cargar los reportes: {ex}"
+
+        self.tareas.ejecutar(trabajo, self.mostrar_reportes, al_fallar, bloquear=self.btn_actualizar)
+
+    def mostrar_reportes(self, datos):
+        totales = datos['totales']
+        self.txt_ingresos.value = f"${totales['importe']:.2f}"
+        self.txt_ventas.value = str(totales['ventas'])
+        self.txt_ticket.value = f"${totales['ticket_promedio']:.2f}"
+        self.txt_unidades.value = str(totales['unidades'])
+
+        self.llenar_tabla(self.tabla_dias, [
+            (fecha, ventas, f"${importe:.2f}") for fecha, ventas, importe in datos['dias']
+        ])
+        self.llenar_tabla(self.tabla_productos, [
+            (producto_id, nombre, unidades, f"${importe:.2f}")
+            for producto_id, nombre, unidades, importe in datos['productos']
+        ])
+        self.llenar_tabla(self.tabla_categorias, [
+            (categoria, unidades, f"${importe:.2f}") for categoria, unidades, importe in datos['categorias']
+        ])
+        self.llenar_tabla(self.tabla_vendedores, [
+            (vendedor, ventas, f"${importe:.2f}") for vendedor, ventas, importe in datos['vendedores']
+        ])
+
+        desde, hasta = self.rango_fechas()
+        self.txt_consulta.value = f"{desde} a {hasta} · consultado en {datos['ms']:.1f} ms"
+
+    def inicializar_dashboard(self):
+        titulo = ft.Text("Reportes de Ventas",
+                        style=ft.TextThemeStyle.HEADLINE_MEDIUM,
+                        weight=ft.FontWeight.BOLD)
+
+        filtros = ft.Row([
+            self.dd_rango,
+            self.btn_actualizar,
+            self.txt_consulta,
+        ], vertical_alignment=ft.CrossAxisAlignment.CENTER)
+
+        indicadores = ft.Row([
+            self.crear_indicador("Ingresos", self.txt_ingresos, ft.Icons.ATTACH_MONEY, ft.Colors.GREEN),
+            self.crear_indicador("Ventas", self.txt_ventas, ft.Icons.RECEIPT_LONG, ft.Colors.BLUE),
+            self.crear_indicador("Ticket promedio", self.txt_ticket, ft.Icons.SHOPPING_BAG, ft.Colors.PURPLE),
+            self.crear_indicador("Unidades", self.txt_unidades, ft.Icons.INVENTORY_2, ft.Colors.ORANGE),
+        ], wrap=True)
+
+        main_content = ft.Column([
+            titulo,
+            self.tareas.barra,
+            filtros,
+            indicadores,
+            ft.Row([
+                ft.Container(self.crear_seccion("Productos más vendidos", self.tabla_productos), width=600),
+                ft.Container(self.crear_seccion("Ventas por día", self.tabla_dias), width=400),
+            ], wrap=True),
+            ft.Row([
+                ft.Container(self.crear_seccion("Por categoría", self.tabla_categorias), width=500),
+                ft.Container(self.crear_seccion("Por vendedor", self.tabla_vendedores), width=500),
+            ], wrap=True),
+        ], spacing=20, scroll=ft.ScrollMode.AUTO)
+
+        self.contenido = main_content
+        self.page.add(main_content)
+        self.cargar_reportes()
+
+    def al_volver(self):
+        """Los resúmenes se actualizan con cada venta: basta con volver a
+        consultar el período elegido."""
+        self.cargar_reportes()
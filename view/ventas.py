@@ -1,52 +1,51 @@
 import flet as ft
-from model.modelo import StockManager, Producto
-from peewee import *
+from model.modelo import StockManager, VentasManager, StockInsuficiente
+from model.carrito import Carrito
+from model.exportacion_ventas import FORMATOS as FORMATOS_EXPORTACION
+from peewee import DoesNotExist
 import datetime
-from decimal import Decimal
-from services.logger.integracion_logger import LogObservadorConServidor, ConsolaObservadorConServidor, log_venta_servidor, log_error_servidor
-from model.modelo import db
-
-class Venta(Model):
-    numero_venta = CharField(unique=True)
-    fecha = DateTimeField(default=datetime.datetime.now)
-    cliente = CharField()
-    total = DecimalField(max_digits=10, decimal_places=2)
-    vendedor = CharField()
-    
-    
-    class Meta:
-        database = db
-
-class DetalleVenta(Model):
-    venta = ForeignKeyField(Venta, backref='detalles')
-    producto = ForeignKeyField(Producto)
-    cantidad = IntegerField()
-    precio_unitario = DecimalField(max_digits=10, decimal_places=2)
-    subtotal = DecimalField(max_digits=10, decimal_places=2)
-    
-    class Meta:
-        database = db
-
-from model.modelo import db
-db.create_tables([Venta, DetalleVenta], safe=True)
+import os
+import threading
+from decimal import Decimal, InvalidOperation
+from services.ejecutor import EjecutorTareas
+from services.exportaciones import GestorExportaciones, TrabajoExportacion
+from view.componentes import ListaProductos, BusquedaDiferida, TareasVista, actualizar_control, en_interfaz
+from services.logger.integracion_logger import log_venta_servidor, log_error_servidor
 
 class VistaVentas:
-    def __init__(self, page: ft.Page): 
+    def __init__(self, page: ft.Page, ejecutor=None): 
         self.page = page
         self.stock_manager = StockManager()
+        self.ventas_manager = VentasManager()
+        self.tareas = TareasVista(page, ejecutor or EjecutorTareas())
         self.page.scroll = ft.ScrollMode.AUTO
         self.page.auto_scroll = True
         
-        self.carrito_items = []
-        self.total_venta = 0.0
+        # Carrito con clave por (producto, precio); la lista de la pantalla
+        # se actualiza con sus cambios, fila por fila
+        self.carrito = Carrito()
+        self.filas_carrito = {}
+        self.carritos_estacionados = []
         
         self.txt_cliente = ft.TextField(label="Nombre del Cliente", width=300)
         self.txt_vendedor = ft.TextField(label="Vendedor", width=300, value="admin")
         
-        self.txt_producto_id = ft.TextField(label="ID del Producto", width=150)
+        self.txt_producto_id = ft.TextField(
+            label="Producto (ID, nombre o SKU)",
+            width=300,
+            on_submit=self.seleccionar_primera_sugerencia
+        )
         self.txt_cantidad_venta = ft.TextField(label="Cantidad", width=150)
         self.txt_precio_override = ft.TextField(label="Precio (opcional)", width=150)
         
+        # Búsqueda mientras se escribe: las sugerencias alimentan al carrito
+        self.producto_seleccionado = None
+        self.sugerencias = ft.Column(spacing=0, visible=False)
+        self.buscador = BusquedaDiferida(
+            lambda texto: self.stock_manager.sugerir_productos(texto, limite=8),
+            self.mostrar_sugerencias
+        )
+        
         self.info_producto = ft.Container(
             content=ft.Text("Seleccione un producto", color=ft.Colors.GREY),
             padding=10,
@@ -56,13 +55,52 @@ class VistaVentas:
         )
         
         self.carrito_list = ft.ListView(expand=True, spacing=5, padding=10)
+        self.txt_carrito_vacio = ft.Text("El carrito está vacío", 
+                                         color=ft.Colors.GREY,
+                                         style=ft.TextThemeStyle.BODY_LARGE)
+        self.dd_estacionados = ft.Dropdown(label="Carritos estacionados", width=300, options=[])
         
         self.txt_total = ft.Text("Total: $0.00", 
                                 style=ft.TextThemeStyle.HEADLINE_SMALL,
                                 weight=ft.FontWeight.BOLD,
                                 color=ft.Colors.GREEN)
         
-        self.productos_disponibles = ft.ListView(expand=True, spacing=5, padding=10)
+        # Lista con clave por producto: tras una venta solo se tocan las
+        # cards de los productos vendidos
+        self.lista_disponibles = ListaProductos(
+            self.stock_manager,
+            self.crear_card_disponible,
+            self.actualizar_card_disponible,
+            mensaje_vacio="No hay productos disponibles",
+            tareas=self.tareas,
+            expand=True, spacing=5, padding=10
+        )
+        self.productos_disponibles = self.lista_disponibles.vista
+        
+        # Paginación por keyset del historial
+        self.tamanio_pagina = 50
+        self.filtros_historial = {'cliente': None, 'fecha': None}
+        self.cursores_historial = [None]
+        self.siguiente_historial = None
+        self.total_historial = 0
+        # Cada pedido de página numera una consulta: solo se muestra la última
+        self.consulta_historial = 0
+        self.pagina_pendiente = False
+        self.espera_filtros = 0.3
+        self.timer_filtros = None
+        self.txt_pagina_ventas = ft.Text("", color=ft.Colors.GREY)
+        self.btn_pagina_anterior = ft.IconButton(
+            icon=ft.Icons.CHEVRON_LEFT,
+            tooltip="Ventas más recientes",
+            on_click=self.pagina_anterior_ventas,
+            disabled=True
+        )
+        self.btn_pagina_siguiente = ft.IconButton(
+            icon=ft.Icons.CHEVRON_RIGHT,
+            tooltip="Ventas anteriores",
+            on_click=self.pagina_siguiente_ventas,
+            disabled=True
+        )
         
         # Tabla de historial de ventas
         self.tabla_ventas = ft.DataTable(
@@ -93,6 +131,13 @@ class VistaVentas:
             on_change=self.filtrar_ventas
         )
         
+        # Exportaciones en segundo plano: una fila con barra de avance por trabajo
+        self.exportaciones = GestorExportaciones(ventas_manager=self.ventas_manager)
+        self.filas_exportacion = {}
+        self.panel_exportaciones = ft.Column(spacing=5, visible=False)
+        
+        self.snackbar = ft.SnackBar(content=ft.Text(""), duration=3000)
+        
         self.mensaje_container = ft.Container(
             content=ft.Text("", color=ft.Colors.GREEN),
             padding=10,
@@ -100,220 +145,406 @@ class VistaVentas:
             visible=False
         )
     
-    def mostrar_snackbar(self, mensaje, es_error=False):
+    def mostrar_snackbar(self, mensaje, es_error=False, actualizar=True):
         color = ft.Colors.RED if es_error else ft.Colors.GREEN
         
-        snackbar = ft.SnackBar(
-            content=ft.Text(mensaje, color=ft.Colors.WHITE),
-            bgcolor=color,
-            duration=3000,
+        # Una sola SnackBar reutilizada: no se acumulan controles en overlay
+        self.snackbar.content = ft.Text(mensaje, color=ft.Colors.WHITE)
+        self.snackbar.bgcolor = color
+        if self.snackbar not in self.page.overlay:
+            self.page.overlay.append(self.snackbar)
+        self.snackbar.open = True
+        if actualizar:
+            self.page.update()
+    
+    def ver_detalle_venta(self, venta_id):
+        def trabajo():
+            # Venta, líneas y nombres de producto en una sola consulta
+            return self.ventas_manager.obtener_venta_con_lineas(venta_id)
+        
+        def al_fallar(ex):
+            self.mostrar_dialog("Error", f"Error al cargar detalle: {str(ex)}", True, actualizar=False)
+        
+        self.tareas.ejecutar(trabajo, lambda datos: self.mostrar_detalle_venta(*datos), al_fallar)
+    
+    def mostrar_detalle_venta(self, venta, lineas):
+        detalle_content = ft.Column([
+            ft.Text(f"Venta: {venta.numero_venta}", 
+                   style=ft.TextThemeStyle.HEADLINE_SMALL,
+                   weight=ft.FontWeight.BOLD),
+            ft.Text(f"Fecha: {venta.fecha.strftime('%d/%m/%Y %H:%M')}"),
+            ft.Text(f"Cliente: {venta.cliente}"),
+            ft.Text(f"Vendedor: {venta.vendedor}"),
+            ft.Divider(),
+            ft.Text("Productos:", weight=ft.FontWeight.BOLD),
+        ])
+        
+        total_items = 0
+        for linea in lineas:
+            eliminado = linea.producto is None
+            producto_info = ft.Container(
+                content=ft.Row([
+                    ft.Text(f"• Producto eliminado (ID: {linea.producto_id})" if eliminado
+                            else f"• {linea.producto}",
+                           expand=True, color=ft.Colors.RED if eliminado else None),
+                    ft.Text(f"Cant: {linea.cantidad}"),
+                    ft.Text(f"Precio: ${linea.precio_unitario:.2f}"),
+                    ft.Text(f"Subtotal: ${linea.subtotal:.2f}", 
+                           weight=ft.FontWeight.BOLD),
+                ]),
+                padding=5,
+                bgcolor=ft.Colors.ERROR_CONTAINER if eliminado else ft.Colors.ON_SURFACE_VARIANT,
+                border_radius=5,
+                margin=ft.margin.symmetric(vertical=2)
+            )
+            detalle_content.controls.append(producto_info)
+            total_items += linea.cantidad
+        
+        # Resumen final
+        detalle_content.controls.extend([
+            ft.Divider(),
+            ft.Text(f"Total de items: {total_items}", weight=ft.FontWeight.BOLD),
+            ft.Text(f"TOTAL: ${venta.total:.2f}", 
+                   style=ft.TextThemeStyle.HEADLINE_SMALL,
+                   weight=ft.FontWeight.BOLD,
+                   color=ft.Colors.GREEN),
+        ])
+        
+        def cerrar_detalle(e):
+            dialog.open = False
+            self.page.update()
+        
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Detalle de Venta", color=ft.Colors.BLUE),
+            content=ft.Container(
+                content=detalle_content,
+                width=600,
+                height=400,
+            ),
+            actions=[
+                ft.TextButton("Cerrar", on_click=cerrar_detalle),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
         )
         
-        self.page.overlay.append(snackbar)
-        snackbar.open = True
-        self.page.update()
+        self.page.overlay.append(dialog)
+        dialog.open = True
     
-    def ver_detalle_venta(self, venta_id):
-        try:
-            venta = Venta.get_by_id(venta_id)
-            detalles = DetalleVenta.select().where(DetalleVenta.venta == venta)
-            
-            detalle_content = ft.Column([
-                ft.Text(f"Venta: {venta.numero_venta}", 
-                       style=ft.TextThemeStyle.HEADLINE_SMALL,
-                       weight=ft.FontWeight.BOLD),
-                ft.Text(f"Fecha: {venta.fecha.strftime('%d/%m/%Y %H:%M')}"),
-                ft.Text(f"Cliente: {venta.cliente}"),
-                ft.Text(f"Vendedor: {venta.vendedor}"),
-                ft.Divider(),
-                ft.Text("Productos:", weight=ft.FontWeight.BOLD),
-            ])
-            
-            total_items = 0
-            for detalle in detalles:
-                try:
-                    producto = Producto.get_by_id(detalle.producto)
-                    producto_info = ft.Container(
-                        content=ft.Row([
-                            ft.Text(f"• {producto.nombre}", expand=True),
-                            ft.Text(f"Cant: {detalle.cantidad}"),
-                            ft.Text(f"Precio: ${detalle.precio_unitario:.2f}"),
-                            ft.Text(f"Subtotal: ${detalle.subtotal:.2f}", 
-                                   weight=ft.FontWeight.BOLD),
-                        ]),
-                        padding=5,
-                        bgcolor=ft.Colors.ON_SURFACE_VARIANT,
-                        border_radius=5,
-                        margin=ft.margin.symmetric(vertical=2)
-                    )
-                    detalle_content.controls.append(producto_info)
-                    total_items += detalle.cantidad
-                except:
-                    producto_info = ft.Container(
-                        content=ft.Row([
-                            ft.Text(f"• Producto eliminado (ID: {detalle.producto})", 
-                                   expand=True, color=ft.Colors.RED),
-                            ft.Text(f"Cant: {detalle.cantidad}"),
-                            ft.Text(f"Precio: ${detalle.precio_unitario:.2f}"),
-                            ft.Text(f"Subtotal: ${detalle.subtotal:.2f}", 
-                                   weight=ft.FontWeight.BOLD),
-                        ]),
-                        padding=5,
-                        bgcolor=ft.Colors.ERROR_CONTAINER,
-                        border_radius=5,
-                        margin=ft.margin.symmetric(vertical=2)
+    def crear_fila_venta(self, venta):
+        # data guarda la clave (fecha, id) que usa el keyset del historial
+        return ft.DataRow(
+            data=(venta.fecha, venta.id),
+            cells=[
+                ft.DataCell(ft.Text(venta.numero_venta)),
+                ft.DataCell(ft.Text(venta.fecha.strftime('%d/%m/%Y %H:%M'))),
+                ft.DataCell(ft.Text(venta.cliente)),
+                ft.DataCell(ft.Text(venta.vendedor)),
+                ft.DataCell(ft.Text(f"${venta.total:.2f}", 
+                                  weight=ft.FontWeight.BOLD,
+                                  color=ft.Colors.GREEN)),
+                ft.DataCell(
+                    ft.IconButton(
+                        icon=ft.Icons.VISIBILITY,
+                        tooltip="Ver detalle",
+                        icon_color=ft.Colors.BLUE,
+                        on_click=lambda e, vid=venta.id: self.ver_detalle_venta(vid)
                     )
-                    detalle_content.controls.append(producto_info)
-                    total_items += detalle.cantidad
-            
-            # Resumen final
-            detalle_content.controls.extend([
-                ft.Divider(),
-                ft.Text(f"Total de items: {total_items}", weight=ft.FontWeight.BOLD),
-                ft.Text(f"TOTAL: ${venta.total:.2f}", 
-                       style=ft.TextThemeStyle.HEADLINE_SMALL,
-                       weight=ft.FontWeight.BOLD,
-                       color=ft.Colors.GREEN),
-            ])
-            
-            def cerrar_detalle(e):
-                dialog.open = False
-                self.page.update()
-            
-            dialog = ft.AlertDialog(
-                modal=True,
-                title=ft.Text("Detalle de Venta", color=ft.Colors.BLUE),
-                content=ft.Container(
-                    content=detalle_content,
-                    width=600,
-                    height=400,
                 ),
-                actions=[
-                    ft.TextButton("Cerrar", on_click=cerrar_detalle),
-                ],
-                actions_alignment=ft.MainAxisAlignment.END,
-            )
-            
-            self.page.overlay.append(dialog)
-            dialog.open = True
-            self.page.update()
-            
-        except Exception as ex:
-            self.mostrar_dialog("Error", f"Error al cargar detalle: {str(ex)}", True)
+            ]
+        )
     
     def cargar_historial_ventas(self, filtro_cliente=None, filtro_fecha=None):
-        try:
-            query = Venta.select().order_by(Venta.fecha.desc())
-            
-            if filtro_cliente:
-                query = query.where(Venta.cliente.contains(filtro_cliente))
-            
-            if filtro_fecha:
-                try:
-                    fecha_filtro = datetime.datetime.strptime(filtro_fecha, '%Y-%m-%d').date()
-                    query = query.where(
-                        (Venta.fecha >= fecha_filtro) & 
-                        (Venta.fecha < fecha_filtro + datetime.timedelta(days=1))
-                    )
-                except ValueError:
-                    pass  
-            
-            ventas = query.limit(50) 
-            
-            self.tabla_ventas.rows.clear()
-            
-            for venta in ventas:
-                row = ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(venta.numero_venta)),
-                        ft.DataCell(ft.Text(venta.fecha.strftime('%d/%m/%Y %H:%M'))),
-                        ft.DataCell(ft.Text(venta.cliente)),
-                        ft.DataCell(ft.Text(venta.vendedor)),
-                        ft.DataCell(ft.Text(f"${venta.total:.2f}", 
-                                          weight=ft.FontWeight.BOLD,
-                                          color=ft.Colors.GREEN)),
-                        ft.DataCell(
-                            ft.IconButton(
-                                icon=ft.Icons.VISIBILITY,
-                                tooltip="Ver detalle",
-                                icon_color=ft.Colors.BLUE,
-                                on_click=lambda e, vid=venta.id: self.ver_detalle_venta(vid)
-                            )
-                        ),
-                    ]
-                )
-                self.tabla_ventas.rows.append(row)
-            
-            if not self.tabla_ventas.rows:
-                row = ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text("No hay ventas registradas", 
-                                          color=ft.Colors.GREY)),
-                        ft.DataCell(ft.Text("-")),
-                        ft.DataCell(ft.Text("-")),
-                        ft.DataCell(ft.Text("-")),
-                        ft.DataCell(ft.Text("-")),
-                        ft.DataCell(ft.Text("-")),
-                    ]
-                )
-                self.tabla_ventas.rows.append(row)
-            
-            self.page.update()
-            
-        except Exception as ex:
-            self.mostrar_dialog("Error", f"Error al cargar historial: {str(ex)}", True)
+        fecha_filtro = None
+        if filtro_fecha:
+            try:
+                fecha_filtro = datetime.datetime.strptime(filtro_fecha, '%Y-%m-%d').date()
+            except ValueError:
+                pass  
+        
+        self.filtros_historial = {'cliente': filtro_cliente, 'fecha': fecha_filtro}
+        # Pila de cursores: el último es el inicio de la página visible
+        self.cursores_historial = [None]
+        self.mostrar_pagina_historial()
+    
+    def mostrar_pagina_historial(self):
+        """Consulta la página del cursor actual fuera del hilo de la interfaz.
+        
+        Si mientras tanto se pide otra (un filtro nuevo, otra página), la
+        respuesta de esta se descarta al llegar.
+        """
+        self.consulta_historial += 1
+        consulta = self.consulta_historial
+        cursor = self.cursores_historial[-1]
+        filtros = dict(self.filtros_historial)
+        # Sin navegar hasta tener la página: el keyset depende de ella
+        self.pagina_pendiente = True
+        for boton in (self.btn_pagina_anterior, self.btn_pagina_siguiente):
+            boton.disabled = True
+            actualizar_control(boton)
+        
+        def trabajo():
+            return self.ventas_manager.paginar_ventas(cursor, self.tamanio_pagina, **filtros)
+        
+        def al_terminar(pagina):
+            if consulta == self.consulta_historial:
+                self.pagina_pendiente = False
+                self.aplicar_pagina_historial(pagina)
+        
+        def al_fallar(ex):
+            if consulta == self.consulta_historial:
+                self.pagina_pendiente = False
+                self.actualizar_pie_historial()
+                self.mostrar_dialog("Error", f"Error al cargar historial: {str(ex)}", True, actualizar=False)
+        
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar)
+    
+    def aplicar_pagina_historial(self, pagina):
+        self.siguiente_historial = pagina['siguiente']
+        self.total_historial = pagina['total']
+        
+        self.tabla_ventas.rows.clear()
+        
+        for venta in pagina['elementos']:
+            self.tabla_ventas.rows.append(self.crear_fila_venta(venta))
+        
+        if not self.tabla_ventas.rows:
+            row = ft.DataRow(
+                cells=[
+                    ft.DataCell(ft.Text("No hay ventas registradas", 
+                                      color=ft.Colors.GREY)),
+                    ft.DataCell(ft.Text("-")),
+                    ft.DataCell(ft.Text("-")),
+                    ft.DataCell(ft.Text("-")),
+                    ft.DataCell(ft.Text("-")),
+                    ft.DataCell(ft.Text("-")),
+                ]
+            )
+            self.tabla_ventas.rows.append(row)
+        
+        self.actualizar_pie_historial()
+    
+    def actualizar_pie_historial(self):
+        mostradas = sum(1 for fila in self.tabla_ventas.rows if fila.data is not None)
+        inicio = (len(self.cursores_historial) - 1) * self.tamanio_pagina
+        if mostradas:
+            self.txt_pagina_ventas.value = (
+                f"{inicio + 1}-{inicio + mostradas} de {self.total_historial}")
+        else:
+            self.txt_pagina_ventas.value = f"0 de {self.total_historial}"
+        self.btn_pagina_anterior.disabled = len(self.cursores_historial) == 1
+        self.btn_pagina_siguiente.disabled = self.siguiente_historial is None
+    
+    def venta_cumple_filtros(self, venta):
+        cliente = self.filtros_historial['cliente']
+        fecha = self.filtros_historial['fecha']
+        if cliente and cliente.lower() not in venta.cliente.lower():
+            return False
+        if fecha and venta.fecha.date() != fecha:
+            return False
+        return True
+    
+    def agregar_venta_al_historial(self, venta):
+        """Inserta una venta recién registrada sin volver a consultar la tabla.
+        
+        Solo se agrega la fila si la venta entra en los filtros actuales y se
+        está viendo la primera página; en las demás páginas el keyset no
+        cambia y basta con actualizar el total.
+        """
+        if not self.venta_cumple_filtros(venta):
+            return
+        
+        self.total_historial += 1
+        if len(self.cursores_historial) == 1:
+            filas = self.tabla_ventas.rows
+            if filas and filas[0].data is None:
+                filas.clear()
+            filas.insert(0, self.crear_fila_venta(venta))
+            if len(filas) > self.tamanio_pagina:
+                filas.pop()
+                self.siguiente_historial = filas[-1].data
+            actualizar_control(self.tabla_ventas)
+        
+        self.actualizar_pie_historial()
+        for control in (self.txt_pagina_ventas, self.btn_pagina_anterior, self.btn_pagina_siguiente):
+            actualizar_control(control)
+    
+    def pagina_siguiente_ventas(self, e):
+        if self.siguiente_historial and not self.pagina_pendiente:
+            self.cursores_historial.append(self.siguiente_historial)
+            self.mostrar_pagina_historial()
+    
+    def pagina_anterior_ventas(self, e):
+        if len(self.cursores_historial) > 1 and not self.pagina_pendiente:
+            self.cursores_historial.pop()
+            self.mostrar_pagina_historial()
     
     def filtrar_ventas(self, e):
+        # Se dispara con cada tecla: la consulta sale cuando se deja de escribir
+        if self.timer_filtros is not None:
+            self.timer_filtros.cancel()
+        self.timer_filtros = threading.Timer(self.espera_filtros, en_interfaz, (self.aplicar_filtros,))
+        self.timer_filtros.daemon = True
+        self.timer_filtros.start()
+    
+    def aplicar_filtros(self):
         filtro_cliente = self.txt_filtro_cliente.value.strip() if self.txt_filtro_cliente.value else None
         filtro_fecha = self.txt_filtro_fecha.value.strip() if self.txt_filtro_fecha.value else None
         
         self.cargar_historial_ventas(filtro_cliente, filtro_fecha)
 
     def exportar_ventas(self, e):
-        try:
-            ventas = Venta.select().order_by(Venta.fecha.desc())
-            
-            if not ventas:
-                self.mostrar_snackbar("No hay ventas para exportar", True)
+        """Pide formato, rango de fechas y vendedor y exporta el historial."""
+        dd_formato = ft.Dropdown(
+            label="Formato",
+            width=150,
+            value="txt",
+            options=[ft.dropdown.Option(f) for f in FORMATOS_EXPORTACION],
+        )
+        txt_desde = ft.TextField(label="Desde (YYYY-MM-DD)", width=180)
+        txt_hasta = ft.TextField(label="Hasta (YYYY-MM-DD)", width=180)
+        txt_vendedor = ft.TextField(label="Vendedor", width=180)
+        
+        def cerrar(e):
+            dialog.open = False
+            self.page.update()
+        
+        def confirmar(e):
+            try:
+                desde = datetime.date.fromisoformat(txt_desde.value.strip()) if txt_desde.value else None
+                hasta = datetime.date.fromisoformat(txt_hasta.value.strip()) if txt_hasta.value else None
+            except ValueError:
+                self.mostrar_snackbar("Las fechas deben tener formato YYYY-MM-DD", True)
                 return
-            
-            contenido = "HISTORIAL DE VENTAS\n"
-            contenido += "=" * 50 + "\n\n"
-            
-            total_general = 0
-            for venta in ventas:
-                contenido += f"Venta: {venta.numero_venta}\n"
-                contenido += f"Fecha: {venta.fecha.strftime('%d/%m/%Y %H:%M')}\n"
-                contenido += f"Cliente: {venta.cliente}\n"
-                contenido += f"Vendedor: {venta.vendedor}\n"
-                contenido += f"Total: ${venta.total:.2f}\n"
-                
-                detalles = DetalleVenta.select().where(DetalleVenta.venta == venta)
-                contenido += "Productos:\n"
-                for detalle in detalles:
-                    try:
-                        producto = Producto.get_by_id(detalle.producto)
-                        contenido += f"  - {producto.nombre} x{detalle.cantidad} = ${detalle.subtotal:.2f}\n"
-                    except:
-                        contenido += f"  - Producto eliminado (ID: {detalle.producto}) x{detalle.cantidad} = ${detalle.subtotal:.2f}\n"
-                
-                contenido += "-" * 30 + "\n\n"
-                total_general += float(venta.total)
-            
-            contenido += f"TOTAL GENERAL: ${total_general:.2f}\n"
-            contenido += f"Total de ventas: {len(list(ventas))}\n"
-            
-            nombre_archivo = f"ventas_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            with open(nombre_archivo, 'w', encoding='utf-8') as f:
-                f.write(contenido)
-            
-            self.mostrar_dialog("Exportación Exitosa", 
-                f"Historial exportado a: {nombre_archivo}")
-            
-        except Exception as ex:
-            self.mostrar_dialog("Error", f"Error al exportar: {str(ex)}", True)
+            dialog.open = False
+            self.iniciar_exportacion(dd_formato.value, desde, hasta, (txt_vendedor.value or "").strip() or None)
+        
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Exportar Ventas", color=ft.Colors.TEAL),
+            content=ft.Column([
+                dd_formato,
+                ft.Row([txt_desde, txt_hasta], wrap=True),
+                txt_vendedor,
+            ], tight=True),
+            actions=[
+                ft.TextButton("Cancelar", on_click=cerrar),
+                ft.TextButton("Exportar", on_click=confirmar),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        
+        self.page.overlay.append(dialog)
+        dialog.open = True
+        self.page.update()
+    
+    def iniciar_exportacion(self, formato, desde, hasta, vendedor):
+        """Encola la exportación; la caja sigue libre mientras se escribe."""
+        trabajo = self.exportaciones.iniciar(
+            formato, desde, hasta, vendedor,
+            al_avanzar=lambda t: en_interfaz(self.avanzar_exportacion, t),
+            al_terminar=lambda t: en_interfaz(self.terminar_exportacion, t),
+        )
+        fila = self.crear_fila_exportacion(trabajo)
+        self.filas_exportacion[trabajo.id] = fila
+        self.panel_exportaciones.controls.insert(0, fila)
+        self.panel_exportaciones.visible = True
+        self.page.update()
     
-    def mostrar_dialog(self, titulo, mensaje, es_error=False):
+    def crear_fila_exportacion(self, trabajo):
+        fila = ft.Row([
+            ft.Icon(ft.Icons.DOWNLOAD, color=ft.Colors.TEAL),
+            ft.Text(trabajo.nombre, width=260),
+            ft.ProgressBar(width=200, value=None),
+            ft.Text(str(trabajo), width=220, color=ft.Colors.GREY),
+            ft.IconButton(
+                icon=ft.Icons.CANCEL,
+                icon_color=ft.Colors.RED,
+                tooltip="Cancelar exportación",
+                on_click=lambda e, t=trabajo.id: self.exportaciones.cancelar(t),
+            ),
+        ], vertical_alignment=ft.CrossAxisAlignment.CENTER)
+        return fila
+    
+    def actualizar_fila_exportacion(self, trabajo):
+        fila = self.filas_exportacion.get(trabajo.id)
+        if fila is None:
+            return None
+        _, _, barra, txt_estado, btn_cancelar = fila.controls
+        barra.value = trabajo.progreso
+        txt_estado.value = str(trabajo)
+        if not trabajo.activo:
+            btn_cancelar.visible = False
+            barra.visible = trabajo.estado == TrabajoExportacion.TERMINADO
+            txt_estado.color = ft.Colors.RED if trabajo.estado == TrabajoExportacion.FALLIDO else ft.Colors.GREY
+        return fila
+    
+    def avanzar_exportacion(self, trabajo):
+        """Llega desde el hilo de la exportación vía en_interfaz: solo se envía
+        la fila del trabajo."""
+        fila = self.actualizar_fila_exportacion(trabajo)
+        if fila is not None:
+            actualizar_control(fila)
+    
+    def terminar_exportacion(self, trabajo):
+        self.actualizar_fila_exportacion(trabajo)
+        if trabajo.estado == TrabajoExportacion.TERMINADO:
+            if trabajo.resumen['ventas']:
+                self.mostrar_snackbar(
+                    f"{trabajo.resumen['ventas']} ventas exportadas a: {trabajo.archivo}", actualizar=False)
+            else:
+                self.mostrar_snackbar("No hay ventas para exportar", True, actualizar=False)
+        elif trabajo.estado == TrabajoExportacion.FALLIDO:
+            self.mostrar_dialog("Error", f"Error al exportar: {trabajo.error}", True, actualizar=False)
+        self.page.update()
+    
+    def ver_exportaciones(self, e):
+        """Lista las exportaciones guardadas en la carpeta configurada."""
+        archivos = self.exportaciones.archivos()
+        
+        def cerrar(e):
+            dialog.open = False
+            self.page.update()
+        
+        if archivos:
+            filas = [
+                ft.DataRow(cells=[
+                    ft.DataCell(ft.Text(nombre)),
+                    ft.DataCell(ft.Text(fecha.strftime('%d/%m/%Y %H:%M'))),
+                    ft.DataCell(ft.Text(f"{tamanio / 1024:.1f} KB")),
+                ])
+                for nombre, _, tamanio, fecha in archivos
+            ]
+            listado = ft.Column([
+                ft.DataTable(
+                    columns=[
+                        ft.DataColumn(ft.Text("Archivo", weight=ft.FontWeight.BOLD)),
+                        ft.DataColumn(ft.Text("Fecha", weight=ft.FontWeight.BOLD)),
+                        ft.DataColumn(ft.Text("Tamaño", weight=ft.FontWeight.BOLD)),
+                    ],
+                    rows=filas,
+                ),
+            ], scroll=ft.ScrollMode.AUTO, height=300)
+        else:
+            listado = ft.Text("Todavía no hay exportaciones", color=ft.Colors.GREY)
+        
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Exportaciones", color=ft.Colors.TEAL),
+            content=ft.Column([
+                ft.Text(f"Carpeta: {os.path.abspath(self.exportaciones.directorio)}", size=12, color=ft.Colors.GREY),
+                ft.Text(f"Se conservan las {self.exportaciones.conservar} más recientes", size=12, color=ft.Colors.GREY),
+                listado,
+            ], tight=True),
+            actions=[ft.TextButton("Cerrar", on_click=cerrar)],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        
+        self.page.overlay.append(dialog)
+        dialog.open = True
+        self.page.update()
+    
+    def mostrar_dialog(self, titulo, mensaje, es_error=False, actualizar=True):
         color = ft.Colors.RED if es_error else ft.Colors.GREEN
         
         def cerrar_dialog(e):
@@ -332,169 +563,268 @@ class VistaVentas:
         
         self.page.overlay.append(dialog)
         dialog.open = True
-        self.page.update()
+        if actualizar:
+            self.page.update()
     
-    def buscar_producto(self, e):
-        if not self.txt_producto_id.value:
+    def buscar_producto(self, e, inmediato=False):
+        # Cualquier cambio en el texto invalida el producto elegido
+        self.producto_seleccionado = None
+        if self.info_producto.visible:
             self.info_producto.visible = False
-            self.page.update()
+            actualizar_control(self.info_producto)
+        self.buscador.solicitar(self.txt_producto_id.value, inmediato)
+    
+    def mostrar_sugerencias(self, texto, productos):
+        if texto != (self.txt_producto_id.value or "").strip():
             return
         
-        try:
-            producto_id = int(self.txt_producto_id.value)
-            producto = Producto.get_by_id(producto_id)
-            
-            stock_color = ft.Colors.RED if producto.stock < 5 else ft.Colors.GREEN
-            
-            self.info_producto.content = ft.Column([
-                ft.Text(f"Producto: {producto.nombre}", weight=ft.FontWeight.BOLD),
-                ft.Text(f"Descripción: {producto.descripcion}"),
-                ft.Text(f"Precio: ${producto.precio}"),
-                ft.Text(f"Stock disponible: {producto.stock}", color=stock_color),
-                ft.Text(f"Categoría: {producto.categoria}"),
-            ])
-            self.info_producto.visible = True
-            
-            if not self.txt_precio_override.value:
-                self.txt_precio_override.value = str(producto.precio)
-            
-            self.page.update()
-            
-        except ValueError:
-            self.mostrar_snackbar("El ID debe ser un número válido", True)
-        except:
-            self.info_producto.content = ft.Text("Producto no encontrado", color=ft.Colors.RED)
+        self.sugerencias.controls = [
+            ft.ListTile(
+                leading=ft.Icon(ft.Icons.INVENTORY_2, color=ft.Colors.BLUE),
+                title=ft.Text(f"{producto.nombre}"),
+                subtitle=ft.Text(
+                    f"ID {producto.id}"
+                    + (f" · SKU {producto.sku}" if producto.sku else "")
+                    + f" · ${producto.precio} · Stock: {producto.stock}"),
+                dense=True,
+                data=producto.id,
+                on_click=lambda e, pid=producto.id: self.seleccionar_producto(pid)
+            )
+            for producto in productos
+        ]
+        if texto and not productos:
+            self.sugerencias.controls.append(
+                ft.Text("Sin coincidencias", color=ft.Colors.GREY))
+        self.sugerencias.visible = bool(texto)
+        actualizar_control(self.sugerencias)
+    
+    def seleccionar_primera_sugerencia(self, e):
+        for control in self.sugerencias.controls:
+            if isinstance(control, ft.ListTile):
+                self.seleccionar_producto(control.data)
+                return
+        self.buscar_producto(e, inmediato=True)
+    
+    def seleccionar_producto(self, producto_id):
+        self.buscador.cancelar()
+        self.sugerencias.visible = False
+        actualizar_control(self.sugerencias)
+        
+        def trabajo():
+            # Se muestra el stock: se lee de la base, no de la cache (las
+            # sugerencias pueden tener un stock de hasta `ttl` segundos)
+            return self.stock_manager.obtener_producto(producto_id, exacto=True)
+        
+        def al_terminar(producto):
+            self.producto_seleccionado = producto.id
+            self.txt_producto_id.value = f"{producto.id} - {producto.nombre}"
+            self.mostrar_info_producto(producto)
+            self.txt_cantidad_venta.focus()
+        
+        def al_fallar(ex):
+            self.producto_seleccionado = None
+            if isinstance(ex, DoesNotExist):
+                self.info_producto.content = ft.Text("Producto no encontrado", color=ft.Colors.RED)
+            else:
+                self.info_producto.content = ft.Text(f"Error al leer el producto: {str(ex)}", color=ft.Colors.RED)
             self.info_producto.visible = True
-            self.page.update()
+        
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar)
+    
+    def mostrar_info_producto(self, producto):
+        stock_color = ft.Colors.RED if producto.stock < producto.stock_minimo else ft.Colors.GREEN
+        
+        self.info_producto.content = ft.Column([
+            ft.Text(f"Producto: {producto.nombre}", weight=ft.FontWeight.BOLD),
+            ft.Text(f"Descripción: {producto.descripcion}"),
+            ft.Text(f"Precio: ${producto.precio}"),
+            ft.Text(f"Stock disponible: {producto.stock}", color=stock_color),
+            ft.Text(f"Categoría: {producto.categoria}"),
+        ])
+        self.info_producto.visible = True
+        
+        if not self.txt_precio_override.value:
+            self.txt_precio_override.value = str(producto.precio)
 
     def agregar_al_carrito(self, e):
         try:
-            if not self.txt_producto_id.value:
-                self.mostrar_snackbar("Debe ingresar un ID de producto", True)
+            texto_producto = (self.txt_producto_id.value or "").strip()
+            if self.producto_seleccionado is None and not texto_producto.isdigit():
+                self.mostrar_snackbar("Seleccione un producto de la lista o ingrese su ID", True)
                 return
             
             if not self.txt_cantidad_venta.value:
                 self.mostrar_snackbar("Debe ingresar una cantidad", True)
                 return
             
-            producto_id = int(self.txt_producto_id.value)
+            producto_id = self.producto_seleccionado or int(texto_producto)
             cantidad = int(self.txt_cantidad_venta.value)
             
             if cantidad <= 0:
                 self.mostrar_snackbar("La cantidad debe ser mayor a 0", True)
                 return
             
-            # Verificar que el producto existe
-            producto = Producto.get_by_id(producto_id)
+            # Precio (usar override si está especificado, sino el del producto)
+            precio = Decimal(self.txt_precio_override.value.strip()) if self.txt_precio_override.value else None
             
+            if precio is not None and precio < 0:
+                self.mostrar_snackbar("El precio no puede ser negativo", True)
+                return
+        except (ValueError, InvalidOperation):
+            self.mostrar_snackbar("Valores numéricos inválidos", True)
+            return
+        
+        def trabajo():
+            # Stock de la base para no aceptar lo que registrar_venta va a
+            # rechazar (igual este vuelve a controlarlo al confirmar)
+            return self.stock_manager.obtener_producto(producto_id, exacto=True)
+        
+        def al_terminar(producto):
             # Verificar stock disponible
-            cantidad_total_carrito = sum(item['cantidad'] for item in self.carrito_items 
-                                       if item['producto_id'] == producto_id)
+            cantidad_total_carrito = self.carrito.cantidad_de(producto_id)
             
             if cantidad + cantidad_total_carrito > producto.stock:
                 self.mostrar_snackbar(
                     f"Stock insuficiente. Disponible: {producto.stock}, "
-                    f"en carrito: {cantidad_total_carrito}", True)
+                    f"en carrito: {cantidad_total_carrito}", True, actualizar=False)
                 return
             
-            # Precio (usar override si está especificado, sino el del producto)
-            precio = float(self.txt_precio_override.value) if self.txt_precio_override.value else float(producto.precio)
-            
-            if precio < 0:
-                self.mostrar_snackbar("El precio no puede ser negativo", True)
-                return
-            
-            producto_existente = None
-            for item in self.carrito_items:
-                if item['producto_id'] == producto_id and item['precio_unitario'] == precio:
-                    producto_existente = item
-                    break
-            
-            if producto_existente:
-                producto_existente['cantidad'] += cantidad
-                producto_existente['subtotal'] = producto_existente['cantidad'] * producto_existente['precio_unitario']
-            else:
-                item = {
-                    'producto_id': producto_id,
-                    'nombre': producto.nombre,
-                    'cantidad': cantidad,
-                    'precio_unitario': precio,
-                    'subtotal': cantidad * precio
-                }
-                self.carrito_items.append(item)
+            self.carrito.agregar(producto_id, producto.nombre, cantidad,
+                                 producto.precio if precio is None else precio)
             
             self.txt_producto_id.value = ""
             self.txt_cantidad_venta.value = ""
             self.txt_precio_override.value = ""
             self.info_producto.visible = False
+            self.producto_seleccionado = None
+            self.sugerencias.visible = False
             
-            self.actualizar_carrito()
-            self.calcular_total()
-            
-            self.mostrar_snackbar(f"Producto agregado al carrito")
+            self.actualizar_carrito(actualizar=False)
             
-        except ValueError as ve:
-            self.mostrar_snackbar("Valores numéricos inválidos", True)
-        except Exception as ex:
-            self.mostrar_dialog("Error", f"El producto ingresado es inexistente, porfavor ingrese otro", True)
+            self.mostrar_snackbar(f"Producto agregado al carrito", actualizar=False)
+        
+        def al_fallar(ex):
+            self.mostrar_dialog("Error", f"El producto ingresado es inexistente, porfavor ingrese otro", True,
+                                actualizar=False)
+        
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar, bloquear=e.control if e else None)
     
-    def quitar_del_carrito(self, index):
-        if 0 <= index < len(self.carrito_items):
-            producto_nombre = self.carrito_items[index]['nombre']
-            self.carrito_items.pop(index)
+    def quitar_del_carrito(self, clave):
+        linea = self.carrito.quitar(clave)
+        if linea is not None:
             self.actualizar_carrito()
-            self.calcular_total()
-            self.mostrar_snackbar(f"Producto '{producto_nombre}' quitado del carrito")
+            self.mostrar_snackbar(f"Producto '{linea.nombre}' quitado del carrito")
     
-    def actualizar_carrito(self):
-        self.carrito_list.controls.clear()
+    def crear_fila_carrito(self, linea):
+        txt_cantidad = ft.Text()
+        txt_subtotal = ft.Text(color=ft.Colors.GREEN, weight=ft.FontWeight.BOLD)
+        card = ft.Card(
+            content=ft.Container(
+                content=ft.Row([
+                    ft.Column([
+                        ft.Text(f"{linea.nombre}", weight=ft.FontWeight.BOLD),
+                        txt_cantidad,
+                        txt_subtotal,
+                    ], expand=True),
+                    ft.IconButton(
+                        icon=ft.Icons.DELETE,
+                        tooltip="Quitar del carrito",
+                        icon_color=ft.Colors.RED,
+                        on_click=lambda e, clave=linea.clave: self.quitar_del_carrito(clave)
+                    ),
+                ]),
+                padding=10,
+            ),
+            data={'cantidad': txt_cantidad, 'subtotal': txt_subtotal}
+        )
+        self.actualizar_fila_carrito(card, linea)
+        return card
+    
+    def actualizar_fila_carrito(self, card, linea):
+        card.data['cantidad'].value = f"Cantidad: {linea.cantidad} × ${linea.precio_unitario:.2f}"
+        card.data['subtotal'].value = f"Subtotal: ${linea.subtotal:.2f}"
+    
+    def actualizar_carrito(self, actualizar=True):
+        """Aplica a la lista solo los cambios pendientes del carrito."""
+        controles = self.carrito_list.controls
+        for accion, clave, linea in self.carrito.tomar_cambios():
+            if accion == 'alta':
+                card = self.crear_fila_carrito(linea)
+                self.filas_carrito[clave] = card
+                controles.append(card)
+            elif accion == 'cambio':
+                self.actualizar_fila_carrito(self.filas_carrito[clave], linea)
+            elif accion == 'baja':
+                controles.remove(self.filas_carrito.pop(clave))
+            else:
+                self.filas_carrito.clear()
+                controles.clear()
         
-        if not self.carrito_items:
-            self.carrito_list.controls.append(
-                ft.Text("El carrito está vacío", 
-                       color=ft.Colors.GREY,
-                       style=ft.TextThemeStyle.BODY_LARGE)
-            )
-        else:
-            for i, item in enumerate(self.carrito_items):
-                card = ft.Card(
-                    content=ft.Container(
-                        content=ft.Row([
-                            ft.Column([
-                                ft.Text(f"{item['nombre']}", weight=ft.FontWeight.BOLD),
-                                ft.Text(f"Cantidad: {item['cantidad']} × ${item['precio_unitario']:.2f}"),
-                                ft.Text(f"Subtotal: ${item['subtotal']:.2f}", 
-                                        color=ft.Colors.GREEN,
-                                        weight=ft.FontWeight.BOLD),
-                            ], expand=True),
-                            ft.IconButton(
-                                icon=ft.Icons.DELETE,
-                                tooltip="Quitar del carrito",
-                                icon_color=ft.Colors.RED,
-                                on_click=lambda e, idx=i: self.quitar_del_carrito(idx)
-                            ),
-                        ]),
-                        padding=10,
-                    )
-                )
-                self.carrito_list.controls.append(card)
+        if not self.filas_carrito and self.txt_carrito_vacio not in controles:
+            controles.append(self.txt_carrito_vacio)
+        elif self.filas_carrito and self.txt_carrito_vacio in controles:
+            controles.remove(self.txt_carrito_vacio)
         
-        self.page.update()
+        self.calcular_total()
+        if actualizar:
+            self.page.update()
     
     def calcular_total(self):
-        self.total_venta = sum(item['subtotal'] for item in self.carrito_items)
-        self.txt_total.value = f"Total: ${self.total_venta:.2f}"
-        self.page.update()
+        # El carrito lleva el total al día: no hace falta sumar las líneas
+        self.txt_total.value = f"Total: ${self.carrito.total:.2f}"
+    
+    def estacionar_carrito(self, e):
+        if not len(self.carrito):
+            self.mostrar_snackbar("El carrito está vacío", True)
+            return
+        
+        cliente = self.txt_cliente.value or "Sin nombre"
+        self.carritos_estacionados.append({
+            'cliente': cliente,
+            'fecha': datetime.datetime.now().strftime('%H:%M:%S'),
+            'carrito': self.carrito.a_dict(),
+        })
+        self.actualizar_estacionados()
+        self.carrito.vaciar()
+        self.txt_cliente.value = ""
+        self.actualizar_carrito(actualizar=False)
+        self.mostrar_snackbar(f"Carrito de '{cliente}' estacionado")
+    
+    def retomar_carrito(self, e):
+        if self.dd_estacionados.value is None:
+            self.mostrar_snackbar("Seleccione un carrito estacionado", True)
+            return
+        if len(self.carrito):
+            self.mostrar_snackbar("Estacione o procese el carrito actual antes de retomar otro", True)
+            return
+        
+        estacionado = self.carritos_estacionados.pop(int(self.dd_estacionados.value))
+        self.carrito = Carrito.desde_dict(estacionado['carrito'])
+        self.txt_cliente.value = "" if estacionado['cliente'] == "Sin nombre" else estacionado['cliente']
+        self.filas_carrito.clear()
+        self.carrito_list.controls.clear()
+        self.actualizar_estacionados()
+        self.actualizar_carrito(actualizar=False)
+        self.mostrar_snackbar(f"Carrito de '{estacionado['cliente']}' retomado")
+    
+    def actualizar_estacionados(self):
+        self.dd_estacionados.value = None
+        self.dd_estacionados.options = [
+            ft.dropdown.Option(
+                str(i),
+                f"{c['cliente']} · {len(c['carrito']['lineas'])} líneas · {c['fecha']}"
+            )
+            for i, c in enumerate(self.carritos_estacionados)
+        ]
     
     def limpiar_carrito(self, e):
-        if not self.carrito_items:
+        if not len(self.carrito):
             self.mostrar_snackbar("El carrito ya está vacío", True)
             return
         
         def confirmar_limpiar(e):
-            self.carrito_items.clear()
-            self.actualizar_carrito()
-            self.calcular_total()
+            self.carrito.vaciar()
+            self.actualizar_carrito(actualizar=False)
             self.mostrar_snackbar("Carrito limpiado")
             dialog.open = False
             self.page.update()
@@ -519,127 +849,111 @@ class VistaVentas:
         self.page.update()
     
     def procesar_venta(self, e):
-        try:
-            if not self.carrito_items:
-                self.mostrar_snackbar("El carrito está vacío", True)
-                return
-            
-            if not self.txt_cliente.value:
-                self.mostrar_snackbar("Debe ingresar el nombre del cliente", True)
-                return
-            
-            if not self.txt_vendedor.value:
-                self.mostrar_snackbar("Debe ingresar el nombre del vendedor", True)
-                return
-            
-            for item in self.carrito_items:
-                producto = Producto.get_by_id(item['producto_id'])
-                if producto.stock < item['cantidad']:
-                    self.mostrar_snackbar(
-                        f"Stock insuficiente para {producto.nombre}. "
-                        f"Disponible: {producto.stock}, Requerido: {item['cantidad']}", True)
-                    return
-            
-            # Generar número de venta único
-            numero_venta = f"V{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            # Crear la venta
-            venta = Venta.create(
-                numero_venta=numero_venta,
-                cliente=self.txt_cliente.value,
-                total=self.total_venta,
-                vendedor=self.txt_vendedor.value
+        if not len(self.carrito):
+            self.mostrar_snackbar("El carrito está vacío", True)
+            return
+        
+        if not self.txt_cliente.value:
+            self.mostrar_snackbar("Debe ingresar el nombre del cliente", True)
+            return
+        
+        if not self.txt_vendedor.value:
+            self.mostrar_snackbar("Debe ingresar el nombre del vendedor", True)
+            return
+        
+        # Copia de lo que se vende: el carrito puede cambiar mientras corre
+        cliente = self.txt_cliente.value
+        vendedor = self.txt_vendedor.value
+        items = self.carrito.items()
+        total = self.carrito.total
+        
+        def trabajo():
+            venta = self.stock_manager.registrar_venta(
+                cliente=cliente,
+                vendedor=vendedor,
+                items=items
             )
             
-            for item in self.carrito_items:
-                DetalleVenta.create(
-                    venta=venta,
-                    producto=item['producto_id'],
-                    cantidad=item['cantidad'],
-                    precio_unitario=item['precio_unitario'],
-                    subtotal=item['subtotal']
-                )
-                
-                self.stock_manager.actualizar_stock(
-                    producto_id=item['producto_id'],
-                    cantidad=item['cantidad'],
-                    usuario=self.txt_vendedor.value,
-                    tipo='salida'
-                )
-            
             try:
                 log_venta_servidor(
-                    numero_venta=numero_venta,
-                    cliente=self.txt_cliente.value,
-                    vendedor=self.txt_vendedor.value,
-                    total=self.total_venta,
-                    productos=self.carrito_items
+                    numero_venta=venta.numero_venta,
+                    cliente=cliente,
+                    vendedor=vendedor,
+                    total=total,
+                    productos=items
                 )
             except Exception as log_error:
                 print(f"⚠️ Error en logging de venta: {log_error}")
             
+            return venta
+        
+        def al_terminar(venta):
             self.mostrar_dialog("Venta Procesada", 
-                f"Venta {numero_venta} procesada exitosamente\n"
-                f"Cliente: {self.txt_cliente.value}\n"
-                f"Total: ${self.total_venta:.2f}\n"
-                f"Vendedor: {self.txt_vendedor.value}")
+                f"Venta {venta.numero_venta} procesada exitosamente\n"
+                f"Cliente: {cliente}\n"
+                f"Total: ${total:.2f}\n"
+                f"Vendedor: {vendedor}", actualizar=False)
             
             self.limpiar_formulario_venta()
             
-            self.cargar_productos_disponibles()
+            # Las sugerencias cacheadas muestran stock: quedan viejas
+            self.buscador.cache.limpiar()
+            self.lista_disponibles.aplicar_stock(venta.stock_resultante)
             
-            self.cargar_historial_ventas()
-            
-        except Exception as ex:
-            log_error_servidor(str(ex), "procesar_venta", self.txt_vendedor.value)
-            self.mostrar_dialog("Error", f"Error al procesar venta: {str(ex)}", True)
+            self.agregar_venta_al_historial(venta)
+        
+        def al_fallar(ex):
+            if isinstance(ex, StockInsuficiente):
+                faltante = ex.faltantes[0]
+                if faltante['disponible'] is None:
+                    self.mostrar_snackbar(f"El producto {faltante['nombre']} ya no existe", True, actualizar=False)
+                else:
+                    self.mostrar_snackbar(
+                        f"Stock insuficiente para {faltante['nombre']}. "
+                        f"Disponible: {faltante['disponible']}, Requerido: {faltante['requerido']}", True,
+                        actualizar=False)
+                return
+            log_error_servidor(str(ex), "procesar_venta", vendedor)
+            self.mostrar_dialog("Error", f"Error al procesar venta: {str(ex)}", True, actualizar=False)
+        
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar, bloquear=e.control if e else None)
     
     def limpiar_formulario_venta(self):
         self.txt_cliente.value = ""
         self.txt_vendedor.value = "admin"
-        self.carrito_items.clear()
-        self.actualizar_carrito()
-        self.calcular_total()
-        self.page.update()
+        self.carrito.vaciar()
+        self.actualizar_carrito(actualizar=False)
     
-    def cargar_productos_disponibles(self):
-        self.productos_disponibles.controls.clear()
+    def crear_card_disponible(self, producto):
+        textos = {
+            'titulo': ft.Text(weight=ft.FontWeight.BOLD),
+            'precio': ft.Text(),
+            'stock': ft.Text(weight=ft.FontWeight.BOLD),
+            'categoria': ft.Text(),
+        }
+        contenedor = ft.Container(
+            content=ft.Column(list(textos.values())),
+            padding=10,
+        )
         
-        try:
-            productos = self.stock_manager.listar_productos()
-            
-            if not productos:
-                self.productos_disponibles.controls.append(
-                    ft.Text("No hay productos disponibles", 
-                           color=ft.Colors.GREY,
-                           style=ft.TextThemeStyle.BODY_LARGE)
-                )
-            else:
-                for producto in productos:
-                    stock_color = ft.Colors.RED if producto.stock < 5 else ft.Colors.GREEN
-                    disponible = producto.stock > 0
-                    
-                    card = ft.Card(
-                        content=ft.Container(
-                            content=ft.Column([
-                                ft.Text(f"ID: {producto.id} - {producto.nombre}", 
-                                        weight=ft.FontWeight.BOLD),
-                                ft.Text(f"Precio: ${producto.precio}"),
-                                ft.Text(f"Stock: {producto.stock}", 
-                                        color=stock_color,
-                                        weight=ft.FontWeight.BOLD),
-                                ft.Text(f"Categoría: {producto.categoria}"),
-                            ]),
-                            padding=10,
-                            bgcolor=ft.Colors.ON_SURFACE_VARIANT if not disponible else None,
-                        )
-                    )
-                    self.productos_disponibles.controls.append(card)
-                    
-        except Exception as ex:
-            self.mostrar_dialog("Error", f"Error al cargar productos: {str(ex)}", True)
+        card = ft.Card(content=contenedor, data=textos)
+        self.actualizar_card_disponible(card, producto)
+        return card
+    
+    def actualizar_card_disponible(self, card, producto):
+        textos = card.data
+        textos['titulo'].value = f"ID: {producto.id} - {producto.nombre}"
+        textos['precio'].value = f"Precio: ${producto.precio}"
+        textos['stock'].value = f"Stock: {producto.stock}"
+        textos['stock'].color = ft.Colors.RED if producto.stock < producto.stock_minimo else ft.Colors.GREEN
+        textos['categoria'].value = f"Categoría: {producto.categoria}"
+        card.content.bgcolor = ft.Colors.ON_SURFACE_VARIANT if producto.stock <= 0 else None
+    
+    def cargar_productos_disponibles(self):
+        def al_fallar(ex):
+            self.mostrar_dialog("Error", f"Error al cargar productos: {str(ex)}", True, actualizar=False)
         
-        self.page.update()
+        self.lista_disponibles.cargar(al_fallar)
     
     def inicializar_ventas(self):
         titulo = ft.Text("Sistema de Ventas", 
@@ -672,10 +986,11 @@ class VistaVentas:
                         ft.ElevatedButton(
                             "Buscar",
                             icon=ft.Icons.SEARCH,
-                            on_click=self.buscar_producto,
+                            on_click=lambda e: self.buscar_producto(e, inmediato=True),
                             style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE, color=ft.Colors.WHITE)
                         ),
                     ], wrap=True),
+                    self.sugerencias,
                     self.info_producto,
                     ft.Row([
                         ft.ElevatedButton(
@@ -710,6 +1025,19 @@ class VistaVentas:
                         content=self.carrito_list,
                         height=200,
                     ),
+                    ft.Row([
+                        ft.TextButton(
+                            "Estacionar",
+                            icon=ft.Icons.PAUSE_CIRCLE_OUTLINE,
+                            on_click=self.estacionar_carrito,
+                        ),
+                        self.dd_estacionados,
+                        ft.TextButton(
+                            "Retomar",
+                            icon=ft.Icons.PLAY_CIRCLE_OUTLINE,
+                            on_click=self.retomar_carrito,
+                        ),
+                    ], wrap=True),
                     ft.ElevatedButton(
                         "Procesar Venta",
                         icon=ft.Icons.POINT_OF_SALE,
@@ -750,16 +1078,24 @@ class VistaVentas:
                         ft.Text("Historial de Ventas", 
                                style=ft.TextThemeStyle.HEADLINE_SMALL,
                                weight=ft.FontWeight.BOLD),
-                        ft.ElevatedButton(
-                            "Exportar",
-                            icon=ft.Icons.DOWNLOAD,
-                            on_click=self.exportar_ventas,
-                            style=ft.ButtonStyle(
-                                bgcolor=ft.Colors.TEAL,
-                                color=ft.Colors.WHITE
-                            )
-                        ),
+                        ft.Row([
+                            ft.IconButton(
+                                icon=ft.Icons.FOLDER_OPEN,
+                                tooltip="Exportaciones anteriores",
+                                on_click=self.ver_exportaciones,
+                            ),
+                            ft.ElevatedButton(
+                                "Exportar",
+                                icon=ft.Icons.DOWNLOAD,
+                                on_click=self.exportar_ventas,
+                                style=ft.ButtonStyle(
+                                    bgcolor=ft.Colors.TEAL,
+                                    color=ft.Colors.WHITE
+                                )
+                            ),
+                        ]),
                     ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                    self.panel_exportaciones,
                     ft.Row([
                         self.txt_filtro_cliente,
                         self.txt_filtro_fecha,
@@ -780,6 +1116,11 @@ class VistaVentas:
                         height=300,
                         padding=10,
                     ),
+                    ft.Row([
+                        self.btn_pagina_anterior,
+                        self.txt_pagina_ventas,
+                        self.btn_pagina_siguiente,
+                    ], alignment=ft.MainAxisAlignment.CENTER),
                 ]),
                 padding=20,
             )
@@ -787,6 +1128,7 @@ class VistaVentas:
         
         main_content = ft.Column([
             titulo,
+            self.tareas.barra,
             self.mensaje_container,
             form_cliente,
             form_productos,
@@ -797,6 +1139,7 @@ class VistaVentas:
             historial_card,
         ], spacing=20, scroll=ft.ScrollMode.AUTO)
         
+        self.contenido = main_content
         self.page.add(main_content)
         
         self.cargar_productos_disponibles()
@@ -804,11 +1147,18 @@ class VistaVentas:
         self.cargar_historial_ventas()
         
         self.actualizar_carrito()
-        self.calcular_total()
         
         self.txt_producto_id.on_change = self.buscar_producto
     
+    def al_volver(self):
+        """La pantalla se vuelve a mostrar: actualiza solo los productos que
+        cambiaron en Gestión de Stock mientras estaba oculta."""
+        self.buscador.cache.limpiar()
+        self.lista_disponibles.sincronizar()
+    
     def limpiar_filtros(self):
+        if self.timer_filtros is not None:
+            self.timer_filtros.cancel()
         self.txt_filtro_cliente.value = ""
         self.txt_filtro_fecha.value = ""
         self.cargar_historial_ventas()
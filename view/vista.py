@@ -1,12 +1,17 @@
 import flet as ft
-from model.modelo import StockManager, Producto
-from model.observers.observador import LogObservador, ConsolaObservador
-from services.logger.integracion_logger import LogObservadorConServidor, ConsolaObservadorConServidor, log_venta_servidor, log_error_servidor
+from peewee import DoesNotExist
+from model.modelo import StockManager, StockInsuficiente, STOCK_MINIMO_PREDETERMINADO, alertas_stock
+from services.ejecutor import EjecutorTareas
+from view.componentes import ListaProductos, TareasVista, PanelStockBajo
+from services.logger.integracion_logger import LogObservadorConServidor, ConsolaObservadorConServidor, log_error_servidor
 
 class VistaStock:
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, ejecutor=None):
         self.page = page
         self.stock_manager = StockManager()
+        # El trabajo bloqueante (base, archivos de log, servidor de logs) va
+        # al ejecutor compartido del controlador
+        self.tareas = TareasVista(page, ejecutor or EjecutorTareas())
         self.page.scroll = ft.ScrollMode.AUTO
         self.page.auto_scroll = True
         
@@ -18,6 +23,8 @@ class VistaStock:
         self.txt_descripcion = ft.TextField(label="Descripción", width=250)
         self.txt_precio = ft.TextField(label="Precio", width=200)
         self.txt_stock = ft.TextField(label="Stock inicial", width=200)
+        self.txt_stock_minimo = ft.TextField(label="Stock mínimo", width=200,
+                                             value=str(STOCK_MINIMO_PREDETERMINADO))
         self.dropdown_categoria = ft.Dropdown(
             label="Categoría",
             width=200,
@@ -43,7 +50,21 @@ class VistaStock:
             ],
             value="entrada"
         )
+        self.txt_nuevo_minimo = ft.TextField(label="Nuevo stock mínimo", width=150)
 
+        # Controles para movimientos en lote (pegar o cargar archivo)
+        self.txt_lote = ft.TextField(
+            label="Movimientos en lote (una línea por producto: ID, cantidad, tipo)",
+            hint_text="15, 40, entrada\n22, 3, salida",
+            multiline=True,
+            min_lines=4,
+            max_lines=10,
+            width=520
+        )
+        self.selector_archivo_lote = ft.FilePicker(on_result=self.archivo_lote_seleccionado)
+
+        self.snackbar = ft.SnackBar(content=ft.Text(""), duration=3000)
+        
         self.mensaje_container = ft.Container(
             content=ft.Text("", color=ft.Colors.GREEN),
             padding=10,
@@ -51,7 +72,21 @@ class VistaStock:
             visible=False
         )
 
-        self.productos_list = ft.ListView(expand=True, spacing=10, padding=20)
+        # Lista con clave por producto: los cambios tocan solo su card
+        self.lista_productos = ListaProductos(
+            self.stock_manager,
+            self.crear_card_producto,
+            self.actualizar_card_producto,
+            mensaje_vacio="No hay productos registrados",
+            tareas=self.tareas,
+            expand=True, spacing=10, padding=20
+        )
+        self.productos_list = self.lista_productos.vista
+
+        # Panel de reposición: se carga una vez y después lo mantienen las
+        # alertas que emite StockManager al cruzar el mínimo
+        self.panel_stock_bajo = PanelStockBajo(self.stock_manager)
+        alertas_stock.agregar_observador(self.panel_stock_bajo)
         
     def mostrar_mensaje(self, mensaje, es_error=False):
         color = ft.Colors.RED if es_error else ft.Colors.GREEN
@@ -69,20 +104,19 @@ class VistaStock:
         import threading
         threading.Thread(target=ocultar_mensaje, daemon=True).start()
     
-    def mostrar_snackbar(self, mensaje, es_error=False):
+    def mostrar_snackbar(self, mensaje, es_error=False, actualizar=True):
         color = ft.Colors.RED if es_error else ft.Colors.GREEN
         
-        snackbar = ft.SnackBar(
-            content=ft.Text(mensaje, color=ft.Colors.WHITE),
-            bgcolor=color,
-            duration=3000,
-        )
-        
-        self.page.overlay.append(snackbar)
-        snackbar.open = True
-        self.page.update()
+        # Una sola SnackBar reutilizada: no se acumulan controles en overlay
+        self.snackbar.content = ft.Text(mensaje, color=ft.Colors.WHITE)
+        self.snackbar.bgcolor = color
+        if self.snackbar not in self.page.overlay:
+            self.page.overlay.append(self.snackbar)
+        self.snackbar.open = True
+        if actualizar:
+            self.page.update()
 
-    def mostrar_dialog(self, titulo, mensaje, es_error=False):
+    def mostrar_dialog(self, titulo, mensaje, es_error=False, actualizar=True):
         color = ft.Colors.RED if es_error else ft.Colors.GREEN
         
         def cerrar_dialog(e):
@@ -101,49 +135,55 @@ class VistaStock:
         
         self.page.overlay.append(dialog)
         dialog.open = True
-        self.page.update()
+        if actualizar:
+            self.page.update()
 
     def agregar_producto(self, e):
+        if not self.txt_nombre.value:
+            self.mostrar_snackbar("El nombre del producto es obligatorio", True)
+            return
+        
+        if not self.txt_precio.value:
+            self.mostrar_snackbar("El precio es obligatorio", True)
+            return
+        
+        if not self.txt_stock.value:
+            self.mostrar_snackbar("El stock inicial es obligatorio", True)
+            return
+            
+        if not self.dropdown_categoria.value:
+            self.mostrar_snackbar("Debe seleccionar una categoría", True)
+            return
+        
         try:
-            if not self.txt_nombre.value:
-                self.mostrar_snackbar("El nombre del producto es obligatorio", True)
-                return
+            precio = float(self.txt_precio.value)
+            stock = int(self.txt_stock.value)
+            stock_minimo = int(self.txt_stock_minimo.value or STOCK_MINIMO_PREDETERMINADO)
             
-            if not self.txt_precio.value:
-                self.mostrar_snackbar("El precio es obligatorio", True)
+            if precio < 0:
+                self.mostrar_snackbar("El precio no puede ser negativo", True)
                 return
             
-            if not self.txt_stock.value:
-                self.mostrar_snackbar("El stock inicial es obligatorio", True)
-                return
-                
-            if not self.dropdown_categoria.value:
-                self.mostrar_snackbar("Debe seleccionar una categoría", True)
+            if stock < 0 or stock_minimo < 0:
+                self.mostrar_snackbar("El stock no puede ser negativo", True)
                 return
-            
-            try:
-                precio = float(self.txt_precio.value)
-                stock = int(self.txt_stock.value)
-                
-                if precio < 0:
-                    self.mostrar_snackbar("El precio no puede ser negativo", True)
-                    return
                 
-                if stock < 0:
-                    self.mostrar_snackbar("El stock no puede ser negativo", True)
-                    return
-                    
-            except ValueError:
-                self.mostrar_snackbar("Precio y stock deben ser valores numéricos válidos", True)
-                return
-            
-            # Crear el producto
+        except ValueError:
+            self.mostrar_snackbar("Precio y stock deben ser valores numéricos válidos", True)
+            return
+        
+        nombre = self.txt_nombre.value
+        descripcion = self.txt_descripcion.value or ""
+        categoria = self.dropdown_categoria.value
+        
+        def trabajo():
             producto = self.stock_manager.agregar_producto(
-                nombre=self.txt_nombre.value,
-                descripcion=self.txt_descripcion.value or "",
+                nombre=nombre,
+                descripcion=descripcion,
                 precio=precio,
                 stock=stock,
-                categoria=self.dropdown_categoria.value
+                categoria=categoria,
+                stock_minimo=stock_minimo
             )
             
             try:
@@ -157,6 +197,7 @@ class VistaStock:
                         "nombre": producto.nombre,
                         "precio": float(producto.precio),
                         "stock_inicial": producto.stock,
+                        "stock_minimo": producto.stock_minimo,
                         "categoria": producto.categoria,
                         "descripcion": producto.descripcion
                     },
@@ -167,48 +208,54 @@ class VistaStock:
             
             producto.agregar_observador(self.log_observador)
             producto.agregar_observador(self.consola_observador)
-            
-            self.mostrar_snackbar(f"Producto '{self.txt_nombre.value}' agregado exitosamente")
-            
+            return producto
+        
+        def al_terminar(producto):
             self.limpiar_formulario()
-            
-            self.cargar_productos()
-            
-        except Exception as ex:
+            self.lista_productos.actualizar(producto)
+            self.mostrar_snackbar(f"Producto '{producto.nombre}' agregado exitosamente", actualizar=False)
+        
+        def al_fallar(ex):
             log_error_servidor(str(ex), "agregar_producto", "admin")
-            self.mostrar_dialog("Error", f"Error al agregar producto: {str(ex)}", True)
+            self.mostrar_dialog("Error", f"Error al agregar producto: {str(ex)}", True, actualizar=False)
+        
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar, bloquear=e.control if e else None)
 
     def actualizar_stock_producto(self, e):
+        if not self.txt_producto_id.value:
+            self.mostrar_snackbar("El ID del producto es obligatorio", True)
+            return
+        
+        if not self.txt_cantidad.value:
+            self.mostrar_snackbar("La cantidad es obligatoria", True)
+            return
+            
+        if not self.txt_usuario.value:
+            self.mostrar_snackbar("El usuario es obligatorio", True)
+            return
+        
         try:
-            if not self.txt_producto_id.value:
-                self.mostrar_snackbar("El ID del producto es obligatorio", True)
-                return
+            producto_id = int(self.txt_producto_id.value)
+            cantidad = int(self.txt_cantidad.value)
             
-            if not self.txt_cantidad.value:
-                self.mostrar_snackbar("La cantidad es obligatoria", True)
-                return
-                
-            if not self.txt_usuario.value:
-                self.mostrar_snackbar("El usuario es obligatorio", True)
+            if cantidad < 0:
+                self.mostrar_snackbar("La cantidad no puede ser negativa", True)
                 return
-            
-            try:
-                producto_id = int(self.txt_producto_id.value)
-                cantidad = int(self.txt_cantidad.value)
                 
-                if cantidad < 0:
-                    self.mostrar_snackbar("La cantidad no puede ser negativa", True)
-                    return
-                    
-            except ValueError:
-                self.mostrar_snackbar("ID del producto y cantidad deben ser números enteros", True)
-                return
-            
+        except ValueError:
+            self.mostrar_snackbar("ID del producto y cantidad deben ser números enteros", True)
+            return
+        
+        usuario = self.txt_usuario.value
+        tipo = self.dropdown_tipo.value
+        producto = None
+        
+        def trabajo():
+            nonlocal producto
             try:
-                producto = Producto.get_by_id(producto_id)
-            except:
-                self.mostrar_snackbar(f"No se encontró un producto con ID {producto_id}", True)
-                return
+                producto = self.stock_manager.obtener_producto(producto_id, exacto=True)
+            except DoesNotExist:
+                return None
             
             if not hasattr(producto, '_observadores'):
                 producto._observadores = []
@@ -217,11 +264,11 @@ class VistaStock:
             if self.consola_observador not in producto._observadores:
                 producto.agregar_observador(self.consola_observador)
             
-            self.stock_manager.actualizar_stock(
+            actualizado = self.stock_manager.actualizar_stock(
                 producto_id=producto_id,
                 cantidad=cantidad,
-                usuario=self.txt_usuario.value,
-                tipo=self.dropdown_tipo.value
+                usuario=usuario,
+                tipo=tipo
             )
             
             try:
@@ -229,53 +276,201 @@ class VistaStock:
                 logger = LoggerCliente()
                 logger.log_operacion_stock(
                     operacion="ACTUALIZAR_STOCK",
-                    usuario=self.txt_usuario.value,
+                    usuario=usuario,
                     detalles={
                         "producto_id": producto_id,
                         "producto_nombre": producto.nombre,
                         "cantidad": cantidad,
-                        "tipo_movimiento": self.dropdown_tipo.value,
-                        "stock_anterior": producto.stock - (cantidad if self.dropdown_tipo.value == "entrada" else -cantidad),
-                        "stock_nuevo": producto.stock
+                        "tipo_movimiento": tipo,
+                        "stock_anterior": producto.stock,
+                        "stock_nuevo": actualizado.stock
                     },
                     nivel="INFO"
                 )
             except Exception as log_error:
                 print(f"⚠️ Error en logging remoto: {log_error}")
             
-            tipo_texto = "entrada" if self.dropdown_tipo.value == "entrada" else "salida"
-            self.mostrar_snackbar(
-                f"Stock actualizado: {tipo_texto} de {cantidad} unidades para '{producto.nombre}'"
-            )
+            return actualizado
+        
+        def al_terminar(actualizado):
+            if actualizado is None:
+                self.mostrar_snackbar(f"No se encontró un producto con ID {producto_id}", True, actualizar=False)
+                return
             
             self.txt_producto_id.value = ""
             self.txt_cantidad.value = ""
+            self.lista_productos.actualizar(actualizado)
             
-            self.cargar_productos()
-            
-        except ValueError as ve:
-            if "Stock insuficiente" in str(ve):
+            tipo_texto = "entrada" if tipo == "entrada" else "salida"
+            self.mostrar_snackbar(
+                f"Stock actualizado: {tipo_texto} de {cantidad} unidades para '{actualizado.nombre}'",
+                actualizar=False
+            )
+        
+        def al_fallar(ex):
+            if isinstance(ex, ValueError) and "Stock insuficiente" in str(ex):
                 self.mostrar_dialog("Stock Insuficiente", 
                     f"No hay suficiente stock para realizar esta operación.\n"
-                    f"Stock actual: {producto.stock} unidades", True)
+                    f"Stock actual: {producto.stock} unidades", True, actualizar=False)
+            elif isinstance(ex, ValueError):
+                self.mostrar_dialog("Error de Validación", str(ex), True, actualizar=False)
             else:
-                self.mostrar_dialog("Error de Validación", str(ve), True)
-        except Exception as ex:
-            log_error_servidor(str(ex), "actualizar_stock", self.txt_usuario.value)
-            self.mostrar_dialog("Error", f"Error al actualizar stock: {str(ex)}", True)
+                log_error_servidor(str(ex), "actualizar_stock", usuario)
+                self.mostrar_dialog("Error", f"Error al actualizar stock: {str(ex)}", True, actualizar=False)
+        
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar, bloquear=e.control if e else None)
     
+    def fijar_stock_minimo(self, e):
+        try:
+            producto_id = int(self.txt_producto_id.value)
+            stock_minimo = int(self.txt_nuevo_minimo.value)
+        except (TypeError, ValueError):
+            self.mostrar_snackbar("Ingrese el ID del producto y el nuevo stock mínimo como números enteros", True)
+            return
+
+        if stock_minimo < 0:
+            self.mostrar_snackbar("El stock mínimo no puede ser negativo", True)
+            return
+
+        def trabajo():
+            try:
+                return self.stock_manager.actualizar_stock_minimo(producto_id, stock_minimo)
+            except DoesNotExist:
+                return None
+
+        def al_terminar(producto):
+            if producto is None:
+                self.mostrar_snackbar(f"No se encontró un producto con ID {producto_id}", True, actualizar=False)
+                return
+            self.txt_nuevo_minimo.value = ""
+            self.lista_productos.actualizar(producto)
+            self.mostrar_snackbar(
+                f"Stock mínimo de '{producto.nombre}' fijado en {producto.stock_minimo}", actualizar=False)
+
+        def al_fallar(ex):
+            log_error_servidor(str(ex), "actualizar_stock_minimo", self.txt_usuario.value or "admin")
+            self.mostrar_dialog("Error", f"Error al fijar el stock mínimo: {str(ex)}", True, actualizar=False)
+
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar, bloquear=e.control if e else None)
+
+    def parsear_lote(self, texto):
+        movimientos = []
+        errores = []
+        for numero, linea in enumerate(texto.splitlines(), start=1):
+            linea = linea.strip()
+            if not linea or linea.startswith('#'):
+                continue
+            partes = [p.strip() for p in linea.replace(';', ',').replace('\t', ',').split(',')]
+            # Se ignora una fila de encabezado (ej: "id,cantidad,tipo")
+            if numero == 1 and not partes[0].isdigit():
+                continue
+            try:
+                producto_id = int(partes[0])
+                cantidad = int(partes[1])
+                tipo = (partes[2] if len(partes) > 2 and partes[2] else "entrada").lower()
+                if tipo not in ("entrada", "salida"):
+                    raise ValueError
+                if cantidad < 0:
+                    raise ValueError
+            except (ValueError, IndexError):
+                errores.append(f"Línea {numero}: '{linea}'")
+                continue
+            movimientos.append({'producto_id': producto_id, 'cantidad': cantidad, 'tipo': tipo})
+        return movimientos, errores
+
+    def aplicar_lote_stock(self, e):
+        if not self.txt_lote.value or not self.txt_lote.value.strip():
+            self.mostrar_snackbar("Pegue o cargue los movimientos del lote", True)
+            return
+
+        if not self.txt_usuario.value:
+            self.mostrar_snackbar("El usuario es obligatorio", True)
+            return
+
+        movimientos, errores = self.parsear_lote(self.txt_lote.value)
+        if errores:
+            self.mostrar_dialog("Lote con errores",
+                "Corrija las siguientes líneas (formato: ID, cantidad, tipo):\n" + "\n".join(errores[:20]),
+                True)
+            return
+
+        usuario = self.txt_usuario.value
+
+        def trabajo():
+            cantidad_productos = self.stock_manager.actualizar_stock_lote(movimientos, usuario)
+
+            try:
+                from services.logger.cliente_log import LoggerCliente
+                logger = LoggerCliente()
+                logger.log_operacion_stock(
+                    operacion="ACTUALIZAR_STOCK_LOTE",
+                    usuario=usuario,
+                    detalles={
+                        "movimientos": len(movimientos),
+                        "productos": cantidad_productos
+                    },
+                    nivel="INFO"
+                )
+            except Exception as log_error:
+                print(f"⚠️ Error en logging remoto: {log_error}")
+
+            return cantidad_productos
+
+        def al_terminar(cantidad_productos):
+            self.txt_lote.value = ""
+            self.lista_productos.refrescar({m['producto_id'] for m in movimientos})
+            self.mostrar_snackbar(
+                f"Lote aplicado: {len(movimientos)} movimientos en {cantidad_productos} productos",
+                actualizar=False)
+
+        def al_fallar(ex):
+            if isinstance(ex, StockInsuficiente):
+                lineas = []
+                for f in ex.faltantes:
+                    if f['disponible'] is None:
+                        lineas.append(f"• {f['nombre']}: producto inexistente")
+                    else:
+                        lineas.append(f"• {f['nombre']}: stock {f['disponible']}, salida neta {f['requerido']}")
+                self.mostrar_dialog("Lote rechazado",
+                    "No se aplicó ningún movimiento:\n" + "\n".join(lineas), True, actualizar=False)
+            elif isinstance(ex, ValueError):
+                self.mostrar_dialog("Error de Validación", str(ex), True, actualizar=False)
+            else:
+                log_error_servidor(str(ex), "actualizar_stock_lote", usuario)
+                self.mostrar_dialog("Error", f"Error al aplicar el lote: {str(ex)}", True, actualizar=False)
+
+        self.tareas.ejecutar(trabajo, al_terminar, al_fallar, bloquear=e.control if e else None)
+
+    def archivo_lote_seleccionado(self, e):
+        if not e.files:
+            return
+
+        ruta = e.files[0].path
+        if not ruta:
+            self.mostrar_snackbar("No se pudo leer el archivo seleccionado", True)
+            return
+
+        try:
+            with open(ruta, 'r', encoding='utf-8-sig') as archivo:
+                self.txt_lote.value = archivo.read()
+            self.page.update()
+        except Exception as ex:
+            self.mostrar_dialog("Error", f"Error al leer el archivo: {str(ex)}", True)
+
     def eliminar_producto(self, producto_id):
         def confirmar_eliminacion(e):
-            try:
-                self.stock_manager.eliminar_producto(producto_id)
-                self.mostrar_snackbar("Producto eliminado exitosamente")
-                self.cargar_productos()
-                dialog.open = False
-                self.page.update()
-            except Exception as ex:
-                self.mostrar_dialog("Error", f"Error al eliminar producto: {str(ex)}", True)
-                dialog.open = False
-                self.page.update()
+            dialog.open = False
+            self.page.update()
+            
+            def al_terminar(resultado):
+                self.lista_productos.quitar(producto_id)
+                self.mostrar_snackbar("Producto eliminado exitosamente", actualizar=False)
+            
+            def al_fallar(ex):
+                self.mostrar_dialog("Error", f"Error al eliminar producto: {str(ex)}", True, actualizar=False)
+            
+            self.tareas.ejecutar(
+                lambda: self.stock_manager.eliminar_producto(producto_id), al_terminar, al_fallar)
         
         def cancelar_eliminacion(e):
             dialog.open = False
@@ -302,57 +497,60 @@ class VistaStock:
         self.txt_descripcion.value = ""
         self.txt_precio.value = ""
         self.txt_stock.value = ""
+        self.txt_stock_minimo.value = str(STOCK_MINIMO_PREDETERMINADO)
         self.dropdown_categoria.value = None
-        self.page.update()
     
-    def cargar_productos(self):
-        self.productos_list.controls.clear()
+    def crear_card_producto(self, producto):
+        txt_titulo = ft.Text(weight=ft.FontWeight.BOLD)
+        txt_detalle = ft.Text()
+        txt_precio = ft.Text(style=ft.TextThemeStyle.BODY_MEDIUM)
+        txt_stock = ft.Text(weight=ft.FontWeight.BOLD)
         
-        try:
-            productos = self.stock_manager.listar_productos()
-            
-            if not productos:
-                self.productos_list.controls.append(
-                    ft.Text("No hay productos registrados", 
-                           style=ft.TextThemeStyle.BODY_LARGE,
-                           color=ft.Colors.GREY)
-                )
-            else:
-                for producto in productos:
-                    stock_color = ft.Colors.RED if producto.stock < 5 else ft.Colors.GREEN
-                    
-                    card = ft.Card(
-                        content=ft.Container(
-                            content=ft.Column([
-                                ft.ListTile(
-                                    leading=ft.Icon(ft.Icons.INVENTORY, color=ft.Colors.BLUE),
-                                    title=ft.Text(f"ID: {producto.id} - {producto.nombre}", weight=ft.FontWeight.BOLD),
-                                    subtitle=ft.Text(f"Categoría: {producto.categoria}\n"
-                                                   f"Descripción: {producto.descripcion}"),
-                                ),
-                                ft.Row([
-                                    ft.Text(f"Precio: ${producto.precio}", 
-                                           style=ft.TextThemeStyle.BODY_MEDIUM),
-                                    ft.Text(f"Stock: {producto.stock}", 
-                                           color=stock_color,
-                                           weight=ft.FontWeight.BOLD),
-                                    ft.IconButton(
-                                        icon=ft.Icons.DELETE,
-                                        tooltip="Eliminar producto",
-                                        icon_color=ft.Colors.RED,
-                                        on_click=lambda e, pid=producto.id: self.eliminar_producto(pid)
-                                    ),
-                                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                            ]),
-                            padding=10,
-                        )
-                    )
-                    self.productos_list.controls.append(card)
-                    
-        except Exception as ex:
-            self.mostrar_dialog("Error", f"Error al cargar productos: {str(ex)}", True)
+        card = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.ListTile(
+                        leading=ft.Icon(ft.Icons.INVENTORY, color=ft.Colors.BLUE),
+                        title=txt_titulo,
+                        subtitle=txt_detalle,
+                    ),
+                    ft.Row([
+                        txt_precio,
+                        txt_stock,
+                        ft.IconButton(
+                            icon=ft.Icons.DELETE,
+                            tooltip="Eliminar producto",
+                            icon_color=ft.Colors.RED,
+                            on_click=lambda e, pid=producto.id: self.eliminar_producto(pid)
+                        ),
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                ]),
+                padding=10,
+            ),
+            data={
+                'titulo': txt_titulo,
+                'detalle': txt_detalle,
+                'precio': txt_precio,
+                'stock': txt_stock,
+            }
+        )
+        self.actualizar_card_producto(card, producto)
+        return card
+    
+    def actualizar_card_producto(self, card, producto):
+        textos = card.data
+        textos['titulo'].value = f"ID: {producto.id} - {producto.nombre}"
+        textos['detalle'].value = (f"Categoría: {producto.categoria}\n"
+                                   f"Descripción: {producto.descripcion}")
+        textos['precio'].value = f"Precio: ${producto.precio}"
+        textos['stock'].value = f"Stock: {producto.stock} (mín. {producto.stock_minimo})"
+        textos['stock'].color = ft.Colors.RED if producto.stock < producto.stock_minimo else ft.Colors.GREEN
+    
+    def cargar_productos(self):
+        def al_fallar(ex):
+            self.mostrar_dialog("Error", f"Error al cargar productos: {str(ex)}", True, actualizar=False)
         
-        self.page.update()
+        self.lista_productos.cargar(al_fallar)
     
     def inicializar_formulario(self):
         titulo = ft.Text("Sistema de Gestión", 
@@ -373,6 +571,7 @@ class VistaStock:
                     ft.Row([
                         self.txt_precio, 
                         self.txt_stock, 
+                        self.txt_stock_minimo,
                         self.dropdown_categoria
                     ], wrap=True),
                     ft.ElevatedButton(
@@ -402,26 +601,75 @@ class VistaStock:
                         self.txt_usuario, 
                         self.dropdown_tipo
                     ], wrap=True),
-                    ft.ElevatedButton(
-                        "Actualizar Stock",
-                        icon=ft.Icons.UPDATE,
-                        on_click=self.actualizar_stock_producto,
-                        style=ft.ButtonStyle(
-                            bgcolor=ft.Colors.BLUE,
-                            color=ft.Colors.WHITE
-                        )
-                    ),
+                    ft.Row([
+                        ft.ElevatedButton(
+                            "Actualizar Stock",
+                            icon=ft.Icons.UPDATE,
+                            on_click=self.actualizar_stock_producto,
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.BLUE,
+                                color=ft.Colors.WHITE
+                            )
+                        ),
+                        self.txt_nuevo_minimo,
+                        ft.ElevatedButton(
+                            "Fijar Mínimo",
+                            icon=ft.Icons.TUNE,
+                            on_click=self.fijar_stock_minimo,
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.BLUE_GREY,
+                                color=ft.Colors.WHITE
+                            )
+                        ),
+                    ], wrap=True),
                 ]),
                 padding=20,
             )
         )
         
-        productos_card = ft.Card(
+        # Movimientos en lote: recepción de mercadería y ajustes masivos
+        form_lote = ft.Card(
             content=ft.Container(
                 content=ft.Column([
-                    ft.Text("Lista de Productos", 
+                    ft.Text("Movimientos en Lote", 
                            style=ft.TextThemeStyle.HEADLINE_SMALL,
                            weight=ft.FontWeight.BOLD),
+                    self.txt_lote,
+                    ft.Row([
+                        ft.ElevatedButton(
+                            "Cargar Archivo",
+                            icon=ft.Icons.UPLOAD_FILE,
+                            on_click=lambda e: self.selector_archivo_lote.pick_files(
+                                allowed_extensions=["csv", "txt"]),
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.BLUE_GREY,
+                                color=ft.Colors.WHITE
+                            )
+                        ),
+                        ft.ElevatedButton(
+                            "Aplicar Lote",
+                            icon=ft.Icons.PLAYLIST_ADD_CHECK,
+                            on_click=self.aplicar_lote_stock,
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.BLUE,
+                                color=ft.Colors.WHITE
+                            )
+                        ),
+                    ]),
+                ]),
+                padding=20,
+            )
+        )
+        
+        productos_card = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([
+                        ft.Text("Lista de Productos", 
+                               style=ft.TextThemeStyle.HEADLINE_SMALL,
+                               weight=ft.FontWeight.BOLD),
+                        self.lista_productos.txt_resumen,
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                     ft.Container(
                         content=self.productos_list,
                         height=300,
@@ -431,14 +679,46 @@ class VistaStock:
             )
         )
         
+        stock_bajo_card = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([
+                        ft.Text("Stock Bajo el Mínimo", 
+                               style=ft.TextThemeStyle.HEADLINE_SMALL,
+                               weight=ft.FontWeight.BOLD),
+                        self.panel_stock_bajo.txt_total,
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                    ft.Container(
+                        content=self.panel_stock_bajo.vista,
+                        height=200,
+                    )
+                ]),
+                padding=20,
+            )
+        )
+        
         main_content = ft.Column([
             titulo,
+            self.tareas.barra,
             self.mensaje_container,  
             form_agregar,  
             form_stock,
+            form_lote,
+            stock_bajo_card,
             productos_card,
         ], spacing=20, scroll=ft.ScrollMode.AUTO)
         
+        if self.selector_archivo_lote not in self.page.overlay:
+            self.page.overlay.append(self.selector_archivo_lote)
+        self.contenido = main_content
         self.page.add(main_content)
         
-        self.cargar_productos()
\ No newline at end of file
+        self.cargar_productos()
+        self.tareas.ejecutar(self.panel_stock_bajo.consultar, self.panel_stock_bajo.mostrar)
+    
+    def al_volver(self):
+        """La pantalla se vuelve a mostrar: trae solo los productos que
+        cambiaron mientras estaba oculta (por ejemplo, por ventas) y relee
+        el panel de stock bajo, que es una consulta indexada."""
+        self.lista_productos.sincronizar()
+        self.tareas.ejecutar(self.panel_stock_bajo.consultar, self.panel_stock_bajo.mostrar)
\ No newline at end of file